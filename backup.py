@@ -0,0 +1,398 @@
+"""
+Онлайн-бекапи SQLite без зупинки бота.
+
+Знімок робиться через sqlite3.Connection.backup маленькими порціями
+сторінок з паузою між ними, всередині однієї read-транзакції на джерелі:
+у WAL-режимі це стабільний зріз, який не блокує записи планувальника
+й обробників і не перезапускається через їхні зміни.
+
+Готовий знімок стискається gzip, поруч кладеться .sha256 (формат
+sha256sum), старі знімки понад BACKUP_KEEP видаляються.
+
+CLI:
+    python backup.py create
+    python backup.py list
+    python backup.py restore backups/bot-20250101-030000.db.gz [--db bot.db]
+    python backup.py bench [--size-mb 1024] [--seconds 10] [--rate 50]
+
+З DB_SHARDS > 1 create знімає кожен шард окремим архівом.
+"""
+import argparse
+import gzip
+import hashlib
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from config import (
+    DB_PATH,
+    BACKUP_DIR,
+    BACKUP_KEEP,
+    BACKUP_PAGES_PER_STEP,
+    BACKUP_STEP_PAUSE,
+)
+from db import shard_paths
+
+BACKUP_SUFFIX = ".db.gz"
+CHUNK_SIZE = 1024 * 1024
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _checksum_path(path: str) -> str:
+    return path + ".sha256"
+
+
+def _db_stem(db_path: str) -> str:
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def list_backups(backup_dir: str = BACKUP_DIR, stem: str | None = None) -> list[str]:
+    """
+    Знімки від найновішого до найстарішого (ім'я містить час, тож
+    лексикографічний порядок = хронологічний). stem — лише знімки
+    одного файлу БД (для шардів: bot, bot.shard1, ...).
+    """
+    if not os.path.isdir(backup_dir):
+        return []
+    prefix = f"{stem}-" if stem else ""
+    names = sorted(
+        (
+            n for n in os.listdir(backup_dir)
+            if n.endswith(BACKUP_SUFFIX) and n.startswith(prefix)
+        ),
+        reverse=True,
+    )
+    return [os.path.join(backup_dir, n) for n in names]
+
+
+def prune_backups(
+    backup_dir: str = BACKUP_DIR, keep: int = BACKUP_KEEP, stem: str | None = None
+) -> list[str]:
+    removed = []
+    for path in list_backups(backup_dir, stem)[keep:]:
+        for p in (path, _checksum_path(path)):
+            if os.path.exists(p):
+                os.remove(p)
+        removed.append(path)
+    return removed
+
+
+def snapshot_database(
+    dest_path: str,
+    db_path: str = DB_PATH,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    pause: float = BACKUP_STEP_PAUSE,
+) -> None:
+    """
+    Копіює живу БД у dest_path через backup API: по `pages` сторінок
+    за крок, з паузою `pause` секунд між кроками.
+    """
+    # sleep= у Connection.backup спрацьовує лише на SQLITE_BUSY/LOCKED,
+    # тож паузу між кроками робить progress, що викликається після кожного
+    def step_pause(status, remaining, total):
+        if remaining and pause > 0:
+            time.sleep(pause)
+
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(dest_path)
+    try:
+        src.isolation_level = None
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        src.backup(dst, pages=pages, progress=step_pause)
+        src.execute("COMMIT")
+    finally:
+        dst.close()
+        src.close()
+
+
+def create_backup(
+    backup_dir: str = BACKUP_DIR,
+    db_path: str = DB_PATH,
+    keep: int = BACKUP_KEEP,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    pause: float = BACKUP_STEP_PAUSE,
+) -> str:
+    """
+    Знімок → gzip → .sha256 → ротація. Повертає шлях до архіву.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    stem = _db_stem(db_path)
+    archive_path = os.path.join(backup_dir, f"{stem}-{stamp}{BACKUP_SUFFIX}")
+
+    fd, raw_path = tempfile.mkstemp(dir=backup_dir, suffix=".db.part")
+    os.close(fd)
+    try:
+        snapshot_database(raw_path, db_path, pages, pause)
+
+        check = sqlite3.connect(raw_path)
+        try:
+            result = check.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            check.close()
+        if result != "ok":
+            raise RuntimeError(f"Знімок не пройшов quick_check: {result}")
+
+        part_path = archive_path + ".part"
+        with open(raw_path, "rb") as src, gzip.open(part_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        os.replace(part_path, archive_path)
+    finally:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+    with open(_checksum_path(archive_path), "w", encoding="utf-8") as f:
+        f.write(f"{_sha256_file(archive_path)}  {os.path.basename(archive_path)}\n")
+
+    prune_backups(backup_dir, keep, stem)
+    return archive_path
+
+
+def verify_backup(archive_path: str) -> bool:
+    checksum_path = _checksum_path(archive_path)
+    if not os.path.exists(checksum_path):
+        return False
+    with open(checksum_path, encoding="utf-8") as f:
+        expected = f.read().split()[0]
+    return _sha256_file(archive_path) == expected
+
+
+def restore_backup(archive_path: str, db_path: str = DB_PATH) -> None:
+    """
+    Відновлює БД зі знімка. Запускати при зупиненому боті.
+    Перевіряє контрольну суму й integrity_check до того, як чіпати db_path.
+    """
+    if not verify_backup(archive_path):
+        raise ValueError(f"Контрольна сума не збігається: {archive_path}")
+
+    target_dir = os.path.dirname(os.path.abspath(db_path))
+    fd, raw_path = tempfile.mkstemp(dir=target_dir, suffix=".restore")
+    os.close(fd)
+    try:
+        with gzip.open(archive_path, "rb") as src, open(raw_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+        src = sqlite3.connect(raw_path)
+        dst = sqlite3.connect(db_path)
+        try:
+            result = src.execute("PRAGMA integrity_check").fetchone()[0]
+            if result != "ok":
+                raise ValueError(f"Знімок пошкоджений: {result}")
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+    finally:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+
+# ======================== БЕНЧМАРК ============================
+#
+# Затримка обробників і тіків планувальника, поки йде бекап великої БД.
+# Генерується тимчасова БД розміру --size-mb зі справжньою схемою (FTS,
+# індекси, WAL), далі той самий потік навантаження двічі: без бекапу
+# (--seconds) і поки create_backup знімає та стискає цю БД.
+#   * обробник — список подій випадкового користувача, додати й видалити
+#     подію, з темпом --rate за секунду;
+#   * тік — get_events_to_notify + mark_notified; раз на секунду замість
+#     хвилини, а симульований час іде на хвилину за тік.
+
+_BENCH_USERS = 10_000
+# Секунд між подіями в БД: ~6 нагадувань на тік
+_BENCH_EVENT_STEP = 10
+_BENCH_BATCH = 50_000
+_BENCH_TITLES = ("Зустріч з командою", "ДР мами", "Стоматолог", "Оплатити інтернет")
+_BENCH_START = datetime(2030, 1, 1)
+
+
+def _bench_populate(size_mb: int) -> int:
+    """Події в поточну БД (db.DB_PATH), поки файл не виросте до size_mb."""
+    import db
+
+    conn = db.get_connection()
+    conn.executemany(
+        "INSERT INTO users (bot_id, tg_id, username) VALUES (?, ?, 'bench')",
+        ((db.DEFAULT_BOT_ID, tg_id) for tg_id in range(1, _BENCH_USERS + 1)),
+    )
+    start = db.to_epoch(_BENCH_START)
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    rows = 0
+    while conn.execute("PRAGMA page_count").fetchone()[0] * page_size < size_mb * 2**20:
+        conn.executemany(
+            """
+            INSERT INTO events (
+                user_id, title, type, category, event_datetime,
+                remind_before_minutes, repeat_yearly, created_at
+            )
+            VALUES (?, ?, 'meeting', 'work', ?, 0, 0, ?)
+            """,
+            (
+                (i % _BENCH_USERS + 1, f"{_BENCH_TITLES[i % len(_BENCH_TITLES)]} {i}",
+                 start + i * _BENCH_EVENT_STEP, start)
+                for i in range(rows, rows + _BENCH_BATCH)
+            ),
+        )
+        conn.commit()
+        rows += _BENCH_BATCH
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return rows
+
+
+def _bench_load(stop: threading.Event, rate: float, tick_from: datetime) -> dict[str, list[float]]:
+    """Обробники й тіки в окремих потоках до stop; затримки в секундах."""
+    import db
+
+    latencies: dict[str, list[float]] = {"обробник": [], "тік": []}
+
+    def handlers():
+        rng = random.Random(1)
+        next_at = time.perf_counter()
+        while not stop.is_set():
+            user_id = rng.randint(1, _BENCH_USERS)
+            started = time.perf_counter()
+            db.get_user_events(user_id)
+            event_id = db.add_event(user_id, "bench", "meeting", "work", _BENCH_START)
+            db.delete_event(user_id, event_id)
+            latencies["обробник"].append(time.perf_counter() - started)
+            next_at += 1 / rate
+            stop.wait(max(0.0, next_at - time.perf_counter()))
+
+    def ticks():
+        now = tick_from
+        while not stop.is_set():
+            started = time.perf_counter()
+            for item in db.get_events_to_notify(now):
+                db.mark_notified(item.row.id, item.kind, False)
+            latencies["тік"].append(time.perf_counter() - started)
+            now += timedelta(minutes=1)
+            stop.wait(1.0)
+
+    threads = [threading.Thread(target=fn, daemon=True) for fn in (handlers, ticks)]
+    for t in threads:
+        t.start()
+    stop.wait()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def _bench_report(label: str, latencies: dict[str, list[float]]) -> None:
+    print(label)
+    for name, values in latencies.items():
+        values = sorted(values)
+        if not values:
+            print(f"  {name:<10}{0:>7}")
+            continue
+        p50 = values[len(values) // 2] * 1000
+        p99 = values[max(0, int(len(values) * 0.99) - 1)] * 1000
+        print(f"  {name:<10}{len(values):>7}{p50:>9.1f}{p99:>9.1f}{values[-1] * 1000:>9.1f}")
+
+
+def bench(size_mb: int, seconds: float, rate: float, pages: int, pauses: list[float]) -> None:
+    import db
+
+    tmp_dir = tempfile.mkdtemp(prefix="backup-bench-")
+    path = os.path.join(tmp_dir, "bench.db")
+    # Методи db працюють із шардом поточного DB_PATH — на час бенчмарку
+    # це тимчасова БД
+    saved_path = db.DB_PATH
+    db.DB_PATH = path
+    try:
+        started = time.perf_counter()
+        db.init_db()
+        rows = _bench_populate(size_mb)
+        print(f"БД: {os.path.getsize(path) / 2**20:.0f} МБ, {rows} подій "
+              f"(створення {time.perf_counter() - started:.0f} с)")
+        conn = sqlite3.connect(path)
+        steps = -(-conn.execute("PRAGMA page_count").fetchone()[0] // pages)
+        conn.close()
+        print(f"Бекап: по {pages} сторінок, {steps} кроків; обробників {rate:g}/с, тік раз на 1 с")
+        print(f"  {'':<10}{'к-сть':>7}{'p50 мс':>9}{'p99 мс':>9}{'макс мс':>9}")
+
+        stop = threading.Event()
+        timer = threading.Timer(seconds, stop.set)
+        timer.start()
+        _bench_report("без бекапу", _bench_load(stop, rate, _BENCH_START))
+
+        for i, pause in enumerate(pauses, 1):
+            stop = threading.Event()
+            result = {}
+
+            def run_backup():
+                backup_started = time.perf_counter()
+                try:
+                    result["archive"] = create_backup(os.path.join(tmp_dir, "backups"), path, 1, pages, pause)
+                finally:
+                    result["seconds"] = time.perf_counter() - backup_started
+                    stop.set()
+
+            threading.Thread(target=run_backup, daemon=True).start()
+            # Тіки — далі за часом, щоб не впертися в уже позначені події
+            latencies = _bench_load(stop, rate, _BENCH_START + timedelta(days=i))
+            _bench_report(
+                f"пауза {pause * 1000:g} мс: бекап {result['seconds']:.1f} с "
+                f"(з них паузи ≥ {(steps - 1) * pause:.1f} с)",
+                latencies,
+            )
+            if "archive" in result:
+                print(f"  архів {os.path.getsize(result['archive']) / 2**20:.0f} МБ")
+    finally:
+        db.DB_PATH = saved_path
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Бекапи bot.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("create", help="зробити знімок зараз")
+    sub.add_parser("list", help="показати знімки")
+    p_restore = sub.add_parser("restore", help="відновити БД зі знімка")
+    p_restore.add_argument("archive")
+    p_restore.add_argument("--db", default=DB_PATH, help="файл БД (шард), який відновлюємо")
+    p_bench = sub.add_parser("bench", help="затримка обробників і тіків під час бекапу великої БД")
+    p_bench.add_argument("--size-mb", type=int, default=1024, help="розмір тимчасової БД")
+    p_bench.add_argument("--seconds", type=float, default=10, help="тривалість проміжку без бекапу")
+    p_bench.add_argument("--rate", type=float, default=50, help="обробників за секунду")
+    p_bench.add_argument("--pages", type=int, default=BACKUP_PAGES_PER_STEP)
+    p_bench.add_argument(
+        "--pause", default=f"0,{BACKUP_STEP_PAUSE:g}", help="пауза між кроками, с, через кому"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "create":
+        for db_path in shard_paths():
+            print(create_backup(db_path=db_path))
+    elif args.command == "list":
+        for path in list_backups():
+            status = "ok" if verify_backup(path) else "BAD CHECKSUM"
+            print(f"{path}\t{os.path.getsize(path)}\t{status}")
+    elif args.command == "restore":
+        try:
+            restore_backup(args.archive, args.db)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"Відновлено {args.db} з {args.archive}")
+    elif args.command == "bench":
+        bench(args.size_mb, args.seconds, args.rate, args.pages, [float(p) for p in args.pause.split(",")])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
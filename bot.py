@@ -1,16 +1,21 @@
 import asyncio
+import logging
 import io
 import json
 import csv
 import re
+from collections import Counter
+from html import escape
 from datetime import datetime, date, time, timedelta
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot, Dispatcher, F
-from aiogram.filters import CommandStart, Command
+from aiogram.filters import CommandStart, Command, CommandObject
 from aiogram.types import (
     Message,
     ReplyKeyboardRemove,
+    ReplyKeyboardMarkup,
+    KeyboardButton,
     InlineKeyboardMarkup,
     InlineKeyboardButton,
     CallbackQuery,
@@ -18,29 +23,82 @@ from aiogram.types import (
 )
     # якщо раптом немає ParseMode/StatesGroup/FSMContext — перевір, що aiogram 3.x
 from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramNotFound
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 
-from config import BOT_TOKEN
+from config import (
+    BOT_TOKENS,
+    REMINDER_COALESCE_SECONDS,
+    MAINTENANCE_INTERVAL_SECONDS,
+    MAINTENANCE_BUDGET_SECONDS,
+    BACKUP_INTERVAL_SECONDS,
+    SCHEDULER_WORKERS,
+    DB_BACKEND,
+    UPDATE_WORKERS,
+    UPDATE_QUEUE_SIZE,
+    UPDATE_STATS_INTERVAL_SECONDS,
+    ADMIN_IDS,
+    DELIVERY_TICK_BUDGET_SECONDS,
+)
 from db import (
     init_db,
     get_or_create_user,
     add_event,
     get_user_events,
+    iter_user_events,
     get_user_events_by_category,
     get_user_birthdays,
     get_user_birthdays_by_category,
     delete_event,
+    delete_events,
+    delete_events_in_category,
+    move_events_category,
+    shift_events,
     get_events_to_notify,
     mark_notified,
     get_event_by_id,
     update_event_title,
     update_event_datetime_and_reset,
     update_event_remind_before,
-    delete_event_by_id,
     get_user_timezone,
+    get_user_locale,
+    set_user_locale,
     set_user_timezone,
+    deactivate_user,
+    reactivate_user,
+    search_user_events,
+    archive_events,
+    get_user_archived_events,
+    iter_user_archived_events,
+    run_maintenance,
+    record_deliveries,
+    snooze_event,
+    delete_snooze,
+    shard_paths,
+    use_shard,
+    use_bot,
+    current_shard,
+    from_epoch,
+    to_epoch_ms,
+    EventRecord,
 )
+from backup import create_backup
+from middlewares import BotMiddleware, ShardMiddleware, ThrottleMiddleware
+from pipeline import UpdatePipeline
+from httpsession import create_bot
+from clock import utcnow, sleep as clock_sleep
+from dtparse import parse_datetime, parse_date, parse_time
+from tzindex import match_timezones
+from tzlocate import grid_timezone_at, timezone_suggestions
+from logsetup import setup_logging, set_level
+from deliverystats import delivery_stats, format_report
+from i18n import LOCALE_NAMES, SOURCE_LOCALE, catalog, resolve_locale, tr
+from deliveryqueue import pending_reminders, snooze_queue, load_snoozes, reminder_priority, is_deferrable
+
+log = logging.getLogger("bot")
+scheduler_log = logging.getLogger("bot.scheduler")
+
 
 # ======================== TZ + НАЛАШТУВАННЯ ============================
 
@@ -49,6 +107,13 @@ UTC = ZoneInfo("UTC")
 
 SUPPORT_LINK = "https://t.me/mykhailodominov"   # заміни на свій @username
 
+SEARCH_PAGE_SIZE = 8
+HISTORY_LIMIT = 30
+LOCALE_CACHE_MAX = 100_000
+# Скільки ID можна видалити одним повідомленням ("12, 15, 20-30")
+BULK_IDS_MAX = 500
+BULK_SHIFT_MAX_DAYS = 3660
+
 
 def get_tzinfo_for_user(user_id: int) -> ZoneInfo:
     tz_str = get_user_timezone(user_id) or DEFAULT_TZ
@@ -58,6 +123,33 @@ def get_tzinfo_for_user(user_id: int) -> ZoneInfo:
         return ZoneInfo(DEFAULT_TZ)
 
 
+# Мова користувача: (шард, user_id) → locale. Міняється лише через
+# set_locale_for_user, яка оновлює і кеш
+_locale_cache: dict[tuple[int, int], str] = {}
+
+
+def get_locale_for_user(user_id: int) -> str:
+    key = (current_shard(), user_id)
+    locale = _locale_cache.get(key)
+    if locale is None:
+        locale = resolve_locale(get_user_locale(user_id))
+        if len(_locale_cache) >= LOCALE_CACHE_MAX:
+            _locale_cache.clear()
+        _locale_cache[key] = locale
+    return locale
+
+
+def set_locale_for_user(user_id: int, locale: str) -> None:
+    set_user_locale(user_id, locale)
+    _locale_cache[(current_shard(), user_id)] = locale
+
+
+def category_label(locale: str, category: str | None) -> str:
+    messages = catalog(locale)
+    template = messages.get(f"category.{category or 'other'}") or messages["category.other"]
+    return template()
+
+
 def local_to_utc(dt_local: datetime, tz: ZoneInfo) -> datetime:
     """
     Отримує локальний datetime (naive) + tz → повертає UTC (naive),
@@ -73,11 +165,10 @@ def utc_to_local(dt_utc: datetime, tz: ZoneInfo) -> datetime:
     return dt_utc.replace(tzinfo=UTC).astimezone(tz).replace(tzinfo=None)
 
 
+# Для діалогів, ще не перенесених у каталог
 CATEGORY_LABELS = {
-    "family": "👨‍👩‍👧 Сім'я",
-    "friends": "👥 Друзі",
-    "work": "💼 Робота",
-    "other": "📌 Інше",
+    key: category_label(SOURCE_LOCALE, key)
+    for key in ("family", "friends", "work", "other")
 }
 
 
@@ -89,8 +180,10 @@ def main_menu_kb() -> InlineKeyboardMarkup:
             [InlineKeyboardButton(text="➕ Додати подію", callback_data="menu_add")],
             [InlineKeyboardButton(text="📋 Мої події", callback_data="menu_list")],
             [InlineKeyboardButton(text="🎂 Мої дні народження", callback_data="menu_birthdays")],
+            [InlineKeyboardButton(text="🗄 Історія", callback_data="menu_history")],
             [InlineKeyboardButton(text="✏️ Редагувати подію", callback_data="menu_edit")],
             [InlineKeyboardButton(text="🗑 Видалити подію", callback_data="menu_delete")],
+            [InlineKeyboardButton(text="📦 Масові дії", callback_data="menu_bulk")],
             [InlineKeyboardButton(text="🌍 Часовий пояс", callback_data="menu_tz")],
             [InlineKeyboardButton(text="🆘 Допомога", url=SUPPORT_LINK)],
         ]
@@ -148,6 +241,28 @@ def bday_filter_kb() -> InlineKeyboardMarkup:
     )
 
 
+def bulk_menu_kb() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="🗑 Видалити всі в категорії", callback_data="bulk:del")],
+            [InlineKeyboardButton(text="🔀 Перенести в іншу категорію", callback_data="bulk:move")],
+            [InlineKeyboardButton(text="⏩ Зсунути всі події на N днів", callback_data="bulk:shift")],
+        ]
+    )
+
+
+def bulk_category_kb(prefix: str, exclude: str | None = None) -> InlineKeyboardMarkup:
+    """Категорії для масової дії: callback_data = prefix + категорія."""
+    buttons = [
+        InlineKeyboardButton(text=label, callback_data=f"{prefix}{key}")
+        for key, label in CATEGORY_LABELS.items()
+        if key != exclude
+    ]
+    rows = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+    rows.append([InlineKeyboardButton(text="✖️ Скасувати", callback_data="bulk:cancel")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
 def edit_fields_kb(event_type: str) -> InlineKeyboardMarkup:
     if event_type == "birthday":
         rows = [
@@ -273,6 +388,81 @@ def timezone_kb() -> InlineKeyboardMarkup:
     )
 
 
+def share_location_kb() -> ReplyKeyboardMarkup:
+    return ReplyKeyboardMarkup(
+        keyboard=[[KeyboardButton(text="📍 Надіслати локацію", request_location=True)]],
+        resize_keyboard=True,
+        one_time_keyboard=True,
+    )
+
+
+def tz_matches_kb(keys: list[str]) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text=key, callback_data=f"tz:{key}")] for key in keys]
+    )
+
+
+# Кнопки відкладення під нагадуванням: код у callback_data → зсув;
+# підписи — snooze.<код> у каталозі
+SNOOZE_OPTIONS = (
+    ("10m", timedelta(minutes=10)),
+    ("1h", timedelta(hours=1)),
+    ("1d", timedelta(days=1)),
+)
+SNOOZE_DELTAS = dict(SNOOZE_OPTIONS)
+# У дайджесті — рядок кнопок на подію, але не більше стількох
+SNOOZE_KB_MAX_EVENTS = 5
+
+
+def snooze_kb(items, locale: str) -> InlineKeyboardMarkup:
+    messages = catalog(locale)
+    rows = []
+    seen = set()
+    for item in items:
+        row = item["row"]
+        if row["id"] in seen:
+            continue
+        seen.add(row["id"])
+        buttons = [
+            InlineKeyboardButton(text=messages[f"snooze.{code}"](), callback_data=f"snz:{row['id']}:{code}")
+            for code, _ in SNOOZE_OPTIONS
+        ]
+        if len(items) > 1:
+            title = row["title"] if len(row["title"]) <= 20 else row["title"][:19] + "…"
+            buttons[0].text = f"{title} {buttons[0].text}"
+        rows.append(buttons)
+        if len(rows) >= SNOOZE_KB_MAX_EVENTS:
+            break
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def search_results_kb(rows, offset: int, has_more: bool) -> InlineKeyboardMarkup:
+    """
+    Під кожним знайденим ID — кнопки, що ведуть одразу в редагування
+    чи видалення, плюс навігація сторінками.
+    """
+    kb_rows = [
+        [
+            InlineKeyboardButton(text=f"✏️ {e['id']}", callback_data=f"srch_edit:{e['id']}"),
+            InlineKeyboardButton(text=f"🗑 {e['id']}", callback_data=f"srch_del:{e['id']}"),
+        ]
+        for e in rows
+    ]
+
+    nav = []
+    if offset > 0:
+        prev_offset = max(offset - SEARCH_PAGE_SIZE, 0)
+        nav.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=f"srch_page:{prev_offset}"))
+    if has_more:
+        nav.append(
+            InlineKeyboardButton(text="Далі ➡️", callback_data=f"srch_page:{offset + SEARCH_PAGE_SIZE}")
+        )
+    if nav:
+        kb_rows.append(nav)
+
+    return InlineKeyboardMarkup(inline_keyboard=kb_rows)
+
+
 # ======================== FSM ============================
 
 class AddEvent(StatesGroup):
@@ -294,47 +484,12 @@ class DeleteEvent(StatesGroup):
     choose_id = State()
 
 
-class SetTimezone(StatesGroup):
-    waiting = State()
-
-
-# ======================== ХЕЛПЕРИ ПАРСИНГУ ============================
-
-def parse_datetime_full(text: str):
-    raw = text.strip()
-    raw = raw.replace("/", "-").replace(".", "-")
-    raw = re.sub(r"\s+", " ", raw)
-
-    for fmt in ("%Y-%m-%d %H:%M", "%d-%m-%Y %H:%M"):
-        try:
-            return datetime.strptime(raw, fmt)
-        except ValueError:
-            continue
-    return None
-
-
-def parse_birthdate(text: str):
-    raw = text.strip()
-    raw = raw.replace("/", "-").replace(".", "-")
-    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
-        try:
-            return datetime.strptime(raw, fmt).date()
-        except ValueError:
-            continue
-    return None
-
+class BulkShift(StatesGroup):
+    days = State()
 
-def parse_time_str(text: str):
-    raw = text.strip()
-    raw = raw.replace(".", ":").replace(",", ":")
 
-    if ":" not in raw and raw.isdigit() and len(raw) == 4:
-        raw = raw[:2] + ":" + raw[2:]
-
-    try:
-        return datetime.strptime(raw, "%H:%M").time()
-    except ValueError:
-        return None
+class SetTimezone(StatesGroup):
+    waiting = State()
 
 
 # ======================== /start, /help, /timezone, /birthdays, /export ============================
@@ -342,6 +497,11 @@ def parse_time_str(text: str):
 async def cmd_start(message: Message, state: FSMContext):
     await state.clear()
     user_id = get_or_create_user(message.from_user.id, message.from_user.username)
+    if reactivate_user(user_id):
+        delivery_counters["users_reactivated"] += 1
+    # Мову ще не обрано — беремо з клієнта Telegram (або DEFAULT_LOCALE)
+    if get_user_locale(user_id) is None:
+        set_locale_for_user(user_id, resolve_locale(message.from_user.language_code))
     tz_str = get_user_timezone(user_id) or DEFAULT_TZ
 
     text = (
@@ -367,7 +527,11 @@ async def cmd_help(message: Message, state: FSMContext):
         "/start — головне меню\n"
         "/birthdays — список днів народження\n"
         "/export — експорт усіх подій\n"
+        "/history — події, що вже минули\n"
+        "/bulk — масові дії з подіями\n"
+        "/search &lt;текст&gt; — пошук подій за назвою\n"
         "/timezone — налаштування часового поясу\n"
+        "/language — мова нагадувань / language\n"
         "/help — ця підказка"
     )
     await message.answer(text, parse_mode=ParseMode.HTML, reply_markup=main_menu_kb())
@@ -417,9 +581,11 @@ async def tz_select_callback(callback: CallbackQuery, state: FSMContext):
     if callback.data == "tz:manual":
         await state.set_state(SetTimezone.waiting)
         await callback.message.answer(
-            "Введи назву свого часового поясу, наприклад:\n"
-            "<code>Europe/Tallinn</code>, <code>Europe/Kyiv</code>, <code>Europe/Warsaw</code>.",
+            "Введи назву свого часового поясу або міста, наприклад:\n"
+            "<code>Europe/Tallinn</code>, <code>Київ</code>, <code>Warsaw</code>, <code>UTC+2</code>.\n"
+            "Або просто надішли локацію — визначу пояс сам.",
             parse_mode=ParseMode.HTML,
+            reply_markup=share_location_kb(),
         )
         return
 
@@ -434,6 +600,7 @@ async def tz_select_callback(callback: CallbackQuery, state: FSMContext):
         return
 
     set_user_timezone(user_id, tz_str)
+    await state.clear()
     now_local = datetime.now(tzinfo)
 
     await callback.message.answer(
@@ -445,17 +612,26 @@ async def tz_select_callback(callback: CallbackQuery, state: FSMContext):
 
 
 async def tz_manual_set(message: Message, state: FSMContext):
-    tz_str = message.text.strip()
-    try:
-        tzinfo = ZoneInfo(tz_str)
-    except Exception:
+    matches, exact = match_timezones(message.text or "")
+    if not matches:
         await message.answer(
             "Не вдалося розпізнати цей час. пояс.\n"
-            "Приклад: <code>Europe/Tallinn</code>, <code>Europe/Kyiv</code>.",
+            "Приклад: <code>Europe/Tallinn</code>, <code>Київ</code>, <code>UTC+2</code>.",
             parse_mode=ParseMode.HTML,
         )
         return
 
+    if not exact:
+        # Стан лишаємо: можна натиснути кнопку або ввести точніше
+        await message.answer(
+            "Можливо, ти мав(-ла) на увазі один із цих поясів?",
+            reply_markup=tz_matches_kb(matches),
+        )
+        return
+
+    tz_str = matches[0]
+    tzinfo = ZoneInfo(tz_str)
+
     user_id = get_or_create_user(message.from_user.id, message.from_user.username)
     set_user_timezone(user_id, tz_str)
     await state.clear()
@@ -469,6 +645,56 @@ async def tz_manual_set(message: Message, state: FSMContext):
     )
 
 
+def tz_suggestions_kb(zones: list[str]) -> InlineKeyboardMarkup:
+    """Варіанти поясу за локацією: підпис — поточний час у поясі, щоб обрати за годинником."""
+    now_utc = utcnow()
+    rows = [
+        [InlineKeyboardButton(
+            text=f"🕐 {utc_to_local(now_utc, ZoneInfo(zone)):%H:%M} · {zone}",
+            callback_data=f"tz:{zone}",
+        )]
+        for zone in zones
+    ]
+    rows.append([InlineKeyboardButton(text="⌨️ Інший (ввести вручну)", callback_data="tz:manual")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+async def tz_location_set(message: Message, state: FSMContext):
+    loc = message.location
+    tz_str = grid_timezone_at(loc.latitude, loc.longitude)
+    if not tz_str:
+        # Без сітки кордонів найближче місто — лише здогад (біля кордону
+        # часто з сусідньої країни), тож нічого не зберігаємо: хай обере
+        zones = timezone_suggestions(loc.latitude, loc.longitude)
+        if not zones:
+            await message.answer(
+                "Не вдалося визначити пояс за цією локацією 😕 Введи його назву вручну.",
+                reply_markup=ReplyKeyboardRemove(),
+            )
+            return
+        await message.answer(
+            "📍 Точно визначити пояс за локацією не вийшло. "
+            "Обери той, де годинник показує твій час:",
+            reply_markup=ReplyKeyboardRemove(),
+        )
+        await message.answer("Варіанти поруч:", reply_markup=tz_suggestions_kb(zones))
+        return
+
+    user_id = get_or_create_user(message.from_user.id, message.from_user.username)
+    set_user_timezone(user_id, tz_str)
+    if await state.get_state() == SetTimezone.waiting.state:
+        await state.clear()
+
+    now_local = datetime.now(ZoneInfo(tz_str))
+    await message.answer(
+        f"📍 Часовий пояс за локацією: <b>{tz_str}</b>\n"
+        f"Зараз у тебе: <b>{now_local.strftime('%Y-%m-%d %H:%M')}</b>",
+        parse_mode=ParseMode.HTML,
+        reply_markup=ReplyKeyboardRemove(),
+    )
+    await message.answer("Обери дію нижче:", reply_markup=main_menu_kb())
+
+
 # ======================== ДОДАВАННЯ ПОДІЇ ============================
 
 async def menu_add_callback(callback: CallbackQuery, state: FSMContext):
@@ -546,7 +772,9 @@ async def add_event_category_callback(callback: CallbackQuery, state: FSMContext
             "Оберіть дату і час події з варіантів нижче або введи вручну.\n\n"
             "Приклад ручного вводу:\n"
             "<code>2025-11-22 18:00</code>\n"
-            "або <code>22.11.2025 18:00</code> чи <code>22-11-2025 18:00</code>.",
+            "або <code>22.11.2025 18:00</code> чи <code>22-11-2025 18:00</code>.\n"
+            "Можна й словами: <code>завтра о 18</code>, <code>в п'ятницю о 10</code>, "
+            "<code>через 2 години</code>.",
             parse_mode=ParseMode.HTML,
             reply_markup=build_preset_datetime_kb(user_tzinfo),
         )
@@ -562,7 +790,7 @@ async def add_event_datetime(message: Message, state: FSMContext):
 
     # ДР
     if event_type == "birthday":
-        bdate = parse_birthdate(message.text)
+        bdate = parse_date(message.text, utc_to_local(utcnow(), user_tzinfo).date())
         if not bdate:
             await message.answer(
                 "Невірний формат дати. Спробуй ще раз.\n"
@@ -580,12 +808,13 @@ async def add_event_datetime(message: Message, state: FSMContext):
         return
 
     # Звичайні події: локальний datetime → UTC
-    dt_local = parse_datetime_full(message.text)
+    now_local = datetime.now(user_tzinfo).replace(tzinfo=None)
+    dt_local = parse_datetime(message.text, now_local)
     if not dt_local:
         await message.answer(
             "Не можу розібрати дату і час 😕\n"
             "Спробуй у форматі <code>2025-11-22 18:00</code>\n"
-            "або <code>22.11.2025 18:00</code>.",
+            "або <code>22.11.2025 18:00</code> чи <code>завтра о 18</code>.",
             parse_mode=ParseMode.HTML,
         )
         return
@@ -644,7 +873,7 @@ async def bday_date_confirm_callback(callback: CallbackQuery, state: FSMContext)
 # ---------- Час для ДР + підтвердження ----------
 
 async def add_birthday_time(message: Message, state: FSMContext):
-    t = parse_time_str(message.text)
+    t = parse_time(message.text)
     if not t:
         await message.answer(
             "Невірний формат часу. Спробуй у форматі <code>09:00</code> або <code>9:00</code>.",
@@ -853,53 +1082,53 @@ async def remind_preset_callback(callback: CallbackQuery, state: FSMContext):
 
 # ======================== СПИСКИ ПОДІЙ ============================
 
-async def render_events(message: Message, events, header: str):
-    user_id = get_or_create_user(message.from_user.id, message.from_user.username)
+async def render_events(message: Message, user_id: int, events, header: str):
     tzinfo = get_tzinfo_for_user(user_id)
+    locale = get_locale_for_user(user_id)
+    messages = catalog(locale)
 
     if not events:
-        await message.answer("Немає подій за цим фільтром.", reply_markup=main_menu_kb())
+        await message.answer(messages["list.events_empty"](), reply_markup=main_menu_kb())
         return
 
-    text = f"{header}\n\n"
+    item = messages["list.event_item"]
+    parts = [f"{header}\n\n"]
     for idx, e in enumerate(events, start=1):
-        dt_utc = datetime.fromisoformat(e["event_datetime"])
-        dt_local = utc_to_local(dt_utc, tzinfo)
-        cat = e["category"] if e["category"] else "other"
-        text += (
-            f"{idx}) <b>{e['title']}</b>\n"
-            f"ID: <code>{e['id']}</code>\n"
-            f"{dt_local.strftime('%Y-%m-%d %H:%M')}\n"
-            f"Тип: {e['type']}\n"
-            f"Категорія: {CATEGORY_LABELS.get(cat, '📌 Інше')}\n\n"
-        )
-
-    text += "👉 Для редагування/видалення використовуй саме ID.\n"
+        parts.append(item(
+            idx=idx,
+            title=e["title"],
+            id=e["id"],
+            dt=utc_to_local(from_epoch(e["event_datetime"]), tzinfo),
+            type=e["type"],
+            category=category_label(locale, e["category"]),
+        ))
+    parts.append(messages["list.events_footer"]())
+    text = "".join(parts)
 
     await message.answer(text, parse_mode=ParseMode.HTML, reply_markup=main_menu_kb())
 
 
-async def render_birthdays(message: Message, events, header: str):
-    user_id = get_or_create_user(message.from_user.id, message.from_user.username)
+async def render_birthdays(message: Message, user_id: int, events, header: str):
     tzinfo = get_tzinfo_for_user(user_id)
+    locale = get_locale_for_user(user_id)
+    messages = catalog(locale)
 
     if not events:
-        await message.answer("Немає днів народження за цим фільтром 🎂", reply_markup=main_menu_kb())
+        await message.answer(messages["list.birthdays_empty"](), reply_markup=main_menu_kb())
         return
 
-    text = f"{header}\n\n"
+    item = messages["list.birthday_item"]
+    parts = [f"{header}\n\n"]
     for idx, e in enumerate(events, start=1):
-        dt_utc = datetime.fromisoformat(e["event_datetime"])
-        dt_local = utc_to_local(dt_utc, tzinfo)
-        cat = e["category"] if e["category"] else "other"
-        text += (
-            f"{idx}) <b>{e['title']}</b>\n"
-            f"ID: <code>{e['id']}</code>\n"
-            f"Наступна дата: {dt_local.strftime('%Y-%m-%d')} о {dt_local.strftime('%H:%M')}\n"
-            f"Категорія: {CATEGORY_LABELS.get(cat, '📌 Інше')}\n\n"
-        )
-
-    text += "👉 Щоб відредагувати або видалити ДР — використовуй ID.\n"
+        parts.append(item(
+            idx=idx,
+            title=e["title"],
+            id=e["id"],
+            dt=utc_to_local(from_epoch(e["event_datetime"]), tzinfo),
+            category=category_label(locale, e["category"]),
+        ))
+    parts.append(messages["list.birthdays_footer"]())
+    text = "".join(parts)
 
     await message.answer(text, parse_mode=ParseMode.HTML, reply_markup=main_menu_kb())
 
@@ -919,14 +1148,15 @@ async def list_filter_callback(callback: CallbackQuery):
     cb = callback.data
     key = cb.split("_", 2)[2]
 
+    locale = get_locale_for_user(user_id)
     if key == "all":
         events = get_user_events(user_id)
-        header = "📋 <b>Список усіх подій:</b>"
+        header = tr(locale, "list.events_all")
     else:
         events = get_user_events_by_category(user_id, key)
-        header = f"📋 <b>Події — {CATEGORY_LABELS.get(key, 'Категорія')}:</b>"
+        header = tr(locale, "list.events_category", category=category_label(locale, key))
 
-    await render_events(callback.message, events, header)
+    await render_events(callback.message, user_id, events, header)
 
 
 async def menu_birthdays_callback(callback: CallbackQuery):
@@ -944,14 +1174,51 @@ async def birthdays_filter_callback(callback: CallbackQuery):
     cb = callback.data
     key = cb.split("_", 2)[2]
 
+    locale = get_locale_for_user(user_id)
     if key == "all":
         events = get_user_birthdays(user_id)
-        header = "🎂 <b>Усі дні народження:</b>"
+        header = tr(locale, "list.birthdays_all")
     else:
         events = get_user_birthdays_by_category(user_id, key)
-        header = f"🎂 <b>Дні народження — {CATEGORY_LABELS.get(key, 'Категорія')}:</b>"
+        header = tr(locale, "list.birthdays_category", category=category_label(locale, key))
+
+    await render_birthdays(callback.message, user_id, events, header)
+
+
+# ======================== ІСТОРІЯ ============================
+
+async def render_history(message: Message, user_id: int):
+    events = get_user_archived_events(user_id, limit=HISTORY_LIMIT)
+    locale = get_locale_for_user(user_id)
+    messages = catalog(locale)
+
+    if not events:
+        await message.answer(messages["history.empty"](), reply_markup=main_menu_kb())
+        return
+
+    tzinfo = get_tzinfo_for_user(user_id)
+    item = messages["history.item"]
+    parts = [messages["history.header"](count=len(events))]
+    for e in events:
+        parts.append(item(
+            title=e["title"],
+            dt=utc_to_local(from_epoch(e["event_datetime"]), tzinfo),
+            category=category_label(locale, e["category"]),
+        ))
+    text = "".join(parts)
+
+    await message.answer(text, parse_mode=ParseMode.HTML, reply_markup=main_menu_kb())
 
-    await render_birthdays(callback.message, events, header)
+
+async def cmd_history(message: Message, state: FSMContext):
+    user_id = get_or_create_user(message.from_user.id, message.from_user.username)
+    await render_history(message, user_id)
+
+
+async def menu_history_callback(callback: CallbackQuery):
+    await callback.answer()
+    user_id = get_or_create_user(callback.from_user.id, callback.from_user.username)
+    await render_history(callback.message, user_id)
 
 
 # ======================== EXPORT ============================
@@ -960,15 +1227,8 @@ async def export_csv_callback(callback: CallbackQuery):
     await callback.answer()
 
     user_id = get_or_create_user(callback.from_user.id, callback.from_user.username)
-    events = get_user_events(user_id)
-
-    if not events:
-        await callback.message.answer(
-            "У тебе поки немає подій для експорту.",
-            reply_markup=main_menu_kb()
-        )
-        return
 
+    # Події пишуться в CSV просто з курсора, без проміжного списку
     output = io.StringIO()
     writer = csv.writer(output)
 
@@ -980,18 +1240,43 @@ async def export_csv_callback(callback: CallbackQuery):
         "event_datetime_utc",
         "remind_before_minutes",
         "repeat_yearly",
+        "archived",
     ])
 
-    for e in events:
+    count = 0
+    for e in iter_user_events(user_id):
         writer.writerow([
-            e["id"],
-            e["title"],
-            e["type"],
-            e["category"],
-            e["event_datetime"],
-            e["remind_before_minutes"],
-            e["repeat_yearly"],
+            e.id,
+            e.title,
+            e.type,
+            e.category,
+            e.event_dt.isoformat(),
+            e.remind_before_minutes,
+            e.repeat_yearly,
+            0,
         ])
+        count += 1
+
+    for e in iter_user_archived_events(user_id):
+        writer.writerow([
+            e.id,
+            e.title,
+            e.type,
+            e.category,
+            e.event_dt.isoformat(),
+            e.remind_before_minutes,
+            0,
+            1,
+        ])
+        count += 1
+
+    if not count:
+        output.close()
+        await callback.message.answer(
+            "У тебе поки немає подій для експорту.",
+            reply_markup=main_menu_kb()
+        )
+        return
 
     csv_data = output.getvalue().encode("utf-8")
     output.close()
@@ -1011,27 +1296,39 @@ async def export_json_callback(callback: CallbackQuery):
     await callback.answer()
 
     user_id = get_or_create_user(callback.from_user.id, callback.from_user.username)
-    events = get_user_events(user_id)
 
-    if not events:
+    data = []
+    for e in iter_user_events(user_id):
+        data.append({
+            "id": e.id,
+            "title": e.title,
+            "type": e.type,
+            "category": e.category,
+            "event_datetime_utc": e.event_dt.isoformat(),
+            "remind_before_minutes": e.remind_before_minutes,
+            "repeat_yearly": bool(e.repeat_yearly),
+            "archived": False,
+        })
+
+    for e in iter_user_archived_events(user_id):
+        data.append({
+            "id": e.id,
+            "title": e.title,
+            "type": e.type,
+            "category": e.category,
+            "event_datetime_utc": e.event_dt.isoformat(),
+            "remind_before_minutes": e.remind_before_minutes,
+            "repeat_yearly": False,
+            "archived": True,
+        })
+
+    if not data:
         await callback.message.answer(
             "У тебе поки немає подій для експорту.",
             reply_markup=main_menu_kb()
         )
         return
 
-    data = []
-    for e in events:
-        data.append({
-            "id": e["id"],
-            "title": e["title"],
-            "type": e["type"],
-            "category": e["category"],
-            "event_datetime_utc": e["event_datetime"],
-            "remind_before_minutes": e["remind_before_minutes"],
-            "repeat_yearly": bool(e["repeat_yearly"]),
-        })
-
     json_str = json.dumps(data, ensure_ascii=False, indent=2)
     json_bytes = json_str.encode("utf-8")
 
@@ -1058,9 +1355,9 @@ async def menu_delete_callback(callback: CallbackQuery, state: FSMContext):
         await callback.message.answer("Немає подій для видалення.", reply_markup=main_menu_kb())
         return
 
-    text = "Введи ID події для видалення:\n\n"
+    text = "Введи ID події для видалення (можна кілька: 12, 15, 20-30):\n\n"
     for e in events:
-        dt_utc = datetime.fromisoformat(e["event_datetime"])
+        dt_utc = from_epoch(e["event_datetime"])
         dt_local = utc_to_local(dt_utc, tzinfo)
         text += f"ID {e['id']}: {e['title']} ({dt_local.strftime('%Y-%m-%d %H:%M')})\n"
 
@@ -1068,22 +1365,172 @@ async def menu_delete_callback(callback: CallbackQuery, state: FSMContext):
     await callback.message.answer(text, reply_markup=ReplyKeyboardRemove())
 
 
+def parse_id_list(text: str) -> list[int] | None:
+    """
+    "12, 15, 20-30" → [12, 15, 20, ..., 30] без повторів, у порядку
+    введення. None — якщо формат не той або ID більше за BULK_IDS_MAX.
+    """
+    ids = {}
+    for part in re.split(r"[,\s]+", text.strip()):
+        if not part:
+            continue
+        lo, sep, hi = part.partition("-")
+        if not lo.isdigit() or (sep and not hi.isdigit()):
+            return None
+        lo = int(lo)
+        hi = int(hi) if sep else lo
+        if hi < lo or len(ids) + (hi - lo + 1) > BULK_IDS_MAX:
+            return None
+        ids.update(dict.fromkeys(range(lo, hi + 1)))
+    return list(ids) or None
+
+
 async def delete_event_process(message: Message, state: FSMContext):
-    raw = message.text.strip()
-    if not raw.isdigit():
-        await message.answer("Введи числовий ID.")
+    event_ids = parse_id_list(message.text or "")
+    if event_ids is None:
+        await message.answer(
+            f"Введи числовий ID або кілька через кому, з діапазонами: 12, 15, 20-30 "
+            f"(до {BULK_IDS_MAX} за раз)."
+        )
         return
 
-    event_id = int(raw)
     user_id = get_or_create_user(message.from_user.id, message.from_user.username)
 
-    ok = delete_event(user_id, event_id)
+    if len(event_ids) == 1:
+        ok = delete_event(user_id, event_ids[0])
+        await state.clear()
+        if ok:
+            await message.answer("Подію видалено ✅", reply_markup=main_menu_kb())
+        else:
+            await message.answer("Подію не знайдено ❌", reply_markup=main_menu_kb())
+        return
+
+    deleted = delete_events(user_id, event_ids)
     await state.clear()
 
-    if ok:
-        await message.answer("Подію видалено ✅", reply_markup=main_menu_kb())
-    else:
-        await message.answer("Подію не знайдено ❌", reply_markup=main_menu_kb())
+    text = f"Видалено подій: {deleted} з {len(event_ids)} вказаних ID ✅"
+    if deleted < len(event_ids):
+        text += f"\nНе знайдено: {len(event_ids) - deleted}"
+    await message.answer(text, reply_markup=main_menu_kb())
+
+
+# ======================== МАСОВІ ДІЇ ============================
+#
+# Кожна дія — один виклик db і одна транзакція, а не цикл по подіях.
+
+async def cmd_bulk(message: Message, state: FSMContext):
+    await state.clear()
+    await message.answer("Що зробити з подіями?", reply_markup=bulk_menu_kb())
+
+
+async def menu_bulk_callback(callback: CallbackQuery, state: FSMContext):
+    await callback.answer()
+    await state.clear()
+    await callback.message.answer("Що зробити з подіями?", reply_markup=bulk_menu_kb())
+
+
+async def bulk_callback(callback: CallbackQuery, state: FSMContext):
+    """
+    bulk:del → bulk:del:<кат> → bulk:delok:<кат>
+    bulk:move → bulk:from:<кат> → bulk:to:<з>:<до>
+    bulk:shift → кількість днів повідомленням (BulkShift.days)
+    """
+    await callback.answer()
+    parts = callback.data.split(":")
+    action = parts[1]
+    user_id = get_or_create_user(callback.from_user.id, callback.from_user.username)
+
+    if action == "cancel":
+        await state.clear()
+        await callback.message.answer("Скасовано.", reply_markup=main_menu_kb())
+        return
+
+    if action == "del" and len(parts) == 2:
+        await callback.message.answer(
+            "З якої категорії видалити всі події?",
+            reply_markup=bulk_category_kb("bulk:del:"),
+        )
+        return
+
+    if action == "del":
+        category = parts[2]
+        count = len(get_user_events_by_category(user_id, category))
+        if not count:
+            await callback.message.answer(
+                f"У категорії {CATEGORY_LABELS.get(category, category)} немає подій.",
+                reply_markup=main_menu_kb(),
+            )
+            return
+        await callback.message.answer(
+            f"Видалити всі події категорії {CATEGORY_LABELS.get(category, category)} ({count})?",
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
+                InlineKeyboardButton(text=f"🗑 Так, видалити {count}", callback_data=f"bulk:delok:{category}"),
+                InlineKeyboardButton(text="✖️ Ні", callback_data="bulk:cancel"),
+            ]]),
+        )
+        return
+
+    if action == "delok":
+        category = parts[2]
+        deleted = delete_events_in_category(user_id, category)
+        await callback.message.answer(
+            f"Видалено подій з категорії {CATEGORY_LABELS.get(category, category)}: {deleted} ✅",
+            reply_markup=main_menu_kb(),
+        )
+        return
+
+    if action == "move":
+        await callback.message.answer(
+            "З якої категорії перенести події?",
+            reply_markup=bulk_category_kb("bulk:from:"),
+        )
+        return
+
+    if action == "from":
+        from_category = parts[2]
+        await callback.message.answer(
+            f"Куди перенести події з {CATEGORY_LABELS.get(from_category, from_category)}?",
+            reply_markup=bulk_category_kb(f"bulk:to:{from_category}:", exclude=from_category),
+        )
+        return
+
+    if action == "to":
+        from_category, to_category = parts[2], parts[3]
+        moved = move_events_category(user_id, from_category, to_category)
+        await callback.message.answer(
+            f"Перенесено подій: {moved} "
+            f"({CATEGORY_LABELS.get(from_category, from_category)} → "
+            f"{CATEGORY_LABELS.get(to_category, to_category)}) ✅",
+            reply_markup=main_menu_kb(),
+        )
+        return
+
+    if action == "shift":
+        await state.set_state(BulkShift.days)
+        await callback.message.answer(
+            "На скільки днів зсунути всі події? Наприклад, 7 або -3.\n"
+            "Нагадування прийдуть знову вже за новими датами.",
+            reply_markup=ReplyKeyboardRemove(),
+        )
+
+
+async def bulk_shift_days(message: Message, state: FSMContext):
+    raw = (message.text or "").strip()
+    try:
+        days = int(raw)
+    except ValueError:
+        days = 0
+    if not days or abs(days) > BULK_SHIFT_MAX_DAYS:
+        await message.answer(f"Введи ціле число днів, не нуль, від -{BULK_SHIFT_MAX_DAYS} до {BULK_SHIFT_MAX_DAYS}.")
+        return
+
+    user_id = get_or_create_user(message.from_user.id, message.from_user.username)
+    shifted = shift_events(user_id, days, get_tzinfo_for_user(user_id))
+    await state.clear()
+    await message.answer(
+        f"Зсунуто подій: {shifted} на {days:+d} дн. ✅",
+        reply_markup=main_menu_kb(),
+    )
 
 
 # ======================== РЕДАГУВАННЯ ============================
@@ -1100,7 +1547,7 @@ async def menu_edit_callback(callback: CallbackQuery, state: FSMContext):
 
     text = "Введи ID події, яку хочеш змінити:\n\n"
     for e in events:
-        dt_utc = datetime.fromisoformat(e["event_datetime"])
+        dt_utc = from_epoch(e["event_datetime"])
         dt_local = utc_to_local(dt_utc, tzinfo)
         cat = e["category"] if e["category"] else "other"
         text += (
@@ -1113,26 +1560,17 @@ async def menu_edit_callback(callback: CallbackQuery, state: FSMContext):
     await callback.message.answer(text, reply_markup=ReplyKeyboardRemove())
 
 
-async def edit_event_choose_id(message: Message, state: FSMContext):
-    raw = message.text.strip()
-    if not raw.isdigit():
-        await message.answer("Введи числовий ID події.")
-        return
-
-    event_id = int(raw)
-    user_id = get_or_create_user(message.from_user.id, message.from_user.username)
+async def start_edit_event(message: Message, state: FSMContext, user_id: int, event_id: int) -> bool:
     row = get_event_by_id(user_id, event_id)
-
     if not row:
-        await message.answer("Подію з таким ID не знайдено. Спробуй ще раз.")
-        return
+        return False
 
     event_type = row["type"]
     await state.update_data(edit_event_id=event_id, edit_event_type=event_type)
     await state.set_state(EditEvent.choose_field)
 
     tzinfo = get_tzinfo_for_user(user_id)
-    dt_utc = datetime.fromisoformat(row["event_datetime"])
+    dt_utc = from_epoch(row["event_datetime"])
     dt_local = utc_to_local(dt_utc, tzinfo)
 
     await message.answer(
@@ -1143,6 +1581,20 @@ async def edit_event_choose_id(message: Message, state: FSMContext):
         parse_mode=ParseMode.HTML,
         reply_markup=edit_fields_kb(event_type),
     )
+    return True
+
+
+async def edit_event_choose_id(message: Message, state: FSMContext):
+    raw = message.text.strip()
+    if not raw.isdigit():
+        await message.answer("Введи числовий ID події.")
+        return
+
+    event_id = int(raw)
+    user_id = get_or_create_user(message.from_user.id, message.from_user.username)
+
+    if not await start_edit_event(message, state, user_id, event_id):
+        await message.answer("Подію з таким ID не знайдено. Спробуй ще раз.")
 
 
 async def edit_event_choose_field_callback(callback: CallbackQuery, state: FSMContext):
@@ -1229,11 +1681,11 @@ async def edit_event_new_value(message: Message, state: FSMContext):
         return
 
     if event_type == "birthday":
-        existing_dt_utc = datetime.fromisoformat(row["event_datetime"])
+        existing_dt_utc = from_epoch(row["event_datetime"])
         existing_dt_local = utc_to_local(existing_dt_utc, user_tzinfo)
 
         if field == "birthdate":
-            bdate = parse_birthdate(message.text)
+            bdate = parse_date(message.text, utc_to_local(utcnow(), user_tzinfo).date())
             if not bdate:
                 await message.answer(
                     "Невірний формат. Спробуй так: <code>1999-05-10</code> або <code>10.05.1999</code>.",
@@ -1257,7 +1709,7 @@ async def edit_event_new_value(message: Message, state: FSMContext):
             return
 
         if field == "bday_time":
-            t = parse_time_str(message.text)
+            t = parse_time(message.text)
             if not t:
                 await message.answer(
                     "Невірний формат. Має бути <code>09:00</code>.",
@@ -1280,11 +1732,13 @@ async def edit_event_new_value(message: Message, state: FSMContext):
 
     else:
         if field == "datetime":
-            dt_local = parse_datetime_full(message.text)
+            now_local = datetime.now(user_tzinfo).replace(tzinfo=None)
+            dt_local = parse_datetime(message.text, now_local)
             if not dt_local:
                 await message.answer(
                     "Невірний формат. Спробуй так:\n"
-                    "<code>2025-12-31 18:00</code> або <code>31.12.2025 18:00</code>.",
+                    "<code>2025-12-31 18:00</code>, <code>31.12.2025 18:00</code> "
+                    "або <code>завтра о 18</code>.",
                     parse_mode=ParseMode.HTML,
                 )
                 return
@@ -1324,77 +1778,508 @@ async def edit_event_new_value(message: Message, state: FSMContext):
     await message.answer("Зміни збережено ✅", reply_markup=main_menu_kb())
 
 
+# ======================== ПОШУК ============================
+
+async def render_search_page(
+    message: Message, user_id: int, query: str, offset: int, edit: bool = False
+):
+    rows, has_more = search_user_events(user_id, query, SEARCH_PAGE_SIZE, offset)
+
+    if not rows:
+        text = f"🔎 За запитом «{escape(query)}» нічого не знайдено."
+        if edit:
+            await message.edit_text(text)
+        else:
+            await message.answer(text, reply_markup=main_menu_kb())
+        return
+
+    tzinfo = get_tzinfo_for_user(user_id)
+    text = f"🔎 <b>Результати для «{escape(query)}»:</b>\n\n"
+    for idx, e in enumerate(rows, start=offset + 1):
+        dt_local = utc_to_local(from_epoch(e["event_datetime"]), tzinfo)
+        text += (
+            f"{idx}) <b>{e['title']}</b>\n"
+            f"ID: <code>{e['id']}</code> · {dt_local.strftime('%Y-%m-%d %H:%M')}\n\n"
+        )
+
+    kb = search_results_kb(rows, offset, has_more)
+    if edit:
+        await message.edit_text(text, parse_mode=ParseMode.HTML, reply_markup=kb)
+    else:
+        await message.answer(text, parse_mode=ParseMode.HTML, reply_markup=kb)
+
+
+async def cmd_search(message: Message, state: FSMContext, command: CommandObject):
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer(
+            "Напиши, що шукати, наприклад:\n<code>/search мама</code>",
+            parse_mode=ParseMode.HTML,
+        )
+        return
+
+    user_id = get_or_create_user(message.from_user.id, message.from_user.username)
+    await state.update_data(search_query=query)
+    await render_search_page(message, user_id, query, 0)
+
+
+async def search_page_callback(callback: CallbackQuery, state: FSMContext):
+    await callback.answer()
+    data = await state.get_data()
+    query = data.get("search_query")
+    if not query:
+        await callback.message.answer("Пошук застарів, повтори /search 🙂")
+        return
+
+    _, raw_offset = callback.data.split(":", 1)
+    user_id = get_or_create_user(callback.from_user.id, callback.from_user.username)
+    await render_search_page(callback.message, user_id, query, int(raw_offset), edit=True)
+
+
+async def search_edit_callback(callback: CallbackQuery, state: FSMContext):
+    await callback.answer()
+    _, raw_id = callback.data.split(":", 1)
+    user_id = get_or_create_user(callback.from_user.id, callback.from_user.username)
+
+    if not await start_edit_event(callback.message, state, user_id, int(raw_id)):
+        await callback.message.answer("Подію не знайдено ❌", reply_markup=main_menu_kb())
+
+
+async def search_delete_callback(callback: CallbackQuery, state: FSMContext):
+    await callback.answer()
+    _, raw_id = callback.data.split(":", 1)
+    user_id = get_or_create_user(callback.from_user.id, callback.from_user.username)
+
+    if delete_event(user_id, int(raw_id)):
+        await callback.message.answer(f"Подію {raw_id} видалено ✅", reply_markup=main_menu_kb())
+    else:
+        await callback.message.answer("Подію не знайдено ❌", reply_markup=main_menu_kb())
+
+
 # ======================== Нагадувач ============================
 
-async def reminder_loop(bot: Bot):
+MAX_MESSAGE_LEN = 4096
+
+
+def tg_len(text: str) -> int:
+    # Telegram рахує довжину в UTF-16 code units (емодзі — це 2)
+    return len(text.encode("utf-16-le")) // 2
+
+
+# Шаблон каталогу для (ДР?, kind) нагадування
+_BIRTHDAY_REMINDER_KEYS = {
+    "30d": "reminder.bday_30d",
+    "7d": "reminder.bday_7d",
+    "1d": "reminder.bday_1d",
+}
+
+
+def reminder_text(row: EventRecord, kind: str) -> str:
+    messages = catalog(row["locale"])
+    title = row["title"]
+
+    if kind != "snooze" and row["type"] == "birthday":
+        return messages[_BIRTHDAY_REMINDER_KEYS.get(kind, "reminder.bday_today")](title=title)
+
+    tz_str = row["timezone"] or DEFAULT_TZ
+    try:
+        user_tzinfo = ZoneInfo(tz_str)
+    except Exception:
+        user_tzinfo = ZoneInfo(DEFAULT_TZ)
+    event_dt_local = utc_to_local(row.event_dt, user_tzinfo)
+
+    if kind == "snooze":
+        return messages["reminder.snooze"](title=title, dt=event_dt_local)
+    if kind == "before":
+        return messages["reminder.before"](title=title, dt=event_dt_local)
+    return messages["reminder.main"](title=title, dt=event_dt_local)
+
+
+def group_reminders(items, now_utc: datetime) -> dict[tuple[int, int], list]:
+    """
+    Групує нагадування по (bot_id, tg_id). Користувачі, в яких у цьому
+    тіку немає жодного нагадування, що вже настало (лише ранні з вікна
+    злиття), пропускаються — їх нагадування прийдуть у свій тік.
+    """
+    groups: dict[tuple[int, int], list] = {}
+    for item in items:
+        row = item["row"]
+        groups.setdefault((row["bot_id"], row["tg_id"]), []).append(item)
+
+    return {
+        key: user_items
+        for key, user_items in groups.items()
+        if any(item["fire_at"] <= now_utc for item in user_items)
+    }
+
+
+def build_digest_parts(user_items) -> list[tuple[str, list]]:
+    """
+    Одне нагадування — як є. Кілька — один дайджест, порізаний на
+    повідомлення не довші за MAX_MESSAGE_LEN. Кожне повідомлення — разом
+    з нагадуваннями, що в нього потрапили.
+    """
+    texts = [reminder_text(item["row"], item["kind"]) for item in user_items]
+    if len(texts) == 1:
+        return [(texts[0], list(user_items))]
+
+    parts = []
+    current = tr(user_items[0]["row"]["locale"], "reminder.digest_header", count=len(texts))
+    current_items = []
+    for item, text in zip(user_items, texts):
+        if tg_len(current) + 2 + tg_len(text) > MAX_MESSAGE_LEN:
+            parts.append((current, current_items))
+            current, current_items = text, [item]
+        else:
+            current += "\n\n" + text
+            current_items.append(item)
+    parts.append((current, current_items))
+    return parts
+
+
+def build_digest_texts(user_items) -> list[str]:
+    return [text for text, _ in build_digest_parts(user_items)]
+
+
+# Лічильники доставки від старту процесу. parked_events — події
+# недосяжних користувачів, які планувальник більше не вибирає і не шле
+delivery_counters: Counter = Counter()
+
+# Фрагменти описів помилок Bot API, після яких писати в чат марно
+PERMANENT_ERROR_MARKERS = ("chat not found", "user is deactivated", "bot was blocked", "peer_id_invalid")
+
+
+def is_permanent_delivery_error(e: Exception) -> bool:
+    if isinstance(e, (TelegramForbiddenError, TelegramNotFound)):
+        return True
+    if isinstance(e, TelegramBadRequest):
+        message = str(e).lower()
+        return any(marker in message for marker in PERMANENT_ERROR_MARKERS)
+    return False
+
+
+def finish_reminder(item, fired_ids: list[int]) -> None:
+    """
+    ДР і попередні нагадування лише позначаємо; разова подія, що настала,
+    йде у fired_ids — наприкінці тіку її пачкою перенесе в архів.
+    """
+    row = item["row"]
+    kind = item["kind"]
+
+    if kind == "snooze":
+        delete_snooze(row["user_id"], row["id"], item["fire_at"])
+        return
+
+    if row["type"] == "birthday" or kind == "before":
+        mark_notified(row["id"], kind, bool(row["repeat_yearly"]))
+        return
+
+    fired_ids.append(row["id"])
+
+
+# Шард → подія воркера планувальника, який його проходить (у кожного
+# воркера своя). Піднята, поки воркер чекає наступного тіку — у цей
+# проміжок і запускається обслуговування шарду.
+scheduler_idle: dict[int, asyncio.Event] = {}
+
+
+async def reminder_tick(bots: dict[int, Bot], since_utc: datetime | None = None) -> datetime:
+    """
+    Один прохід планувальника по поточному шарду для всіх ботів
+    (bots: bot_id → Bot). since_utc — now попереднього тіку цього шарду:
+    вибираються нагадування з fire_at у (since_utc, now]. Повертає now
+    цього тіку — межу вікна для наступного.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    shard = current_shard()
+    now_utc = utcnow()
+    fired_ids: list[int] = []
+    deliveries: list[tuple] = []
+
+    # Відкладені користувачем і з попередніх тіків + свіжі; те саме
+    # нагадування могло потрапити в обидва списки, якщо тік прийшов
+    # раніше за хвилину
+    queued, expired = pending_reminders.take(shard, now_utc)
+    queued = snooze_queue.take_due(shard, now_utc) + queued
+    seen = {(item["row"]["id"], item["kind"]) for item in queued}
+    events = queued + [
+        item for item in get_events_to_notify(now_utc, REMINDER_COALESCE_SECONDS, since_utc)
+        if (item["row"]["id"], item["kind"]) not in seen
+    ]
+    shed = expired
+
+    groups = sorted(
+        group_reminders(events, now_utc).items(),
+        key=lambda g: (min(reminder_priority(item) for item in g[1]), min(item["fire_at"] for item in g[1])),
+    )
+    deferred = 0
+    for (bot_id, tg_id), user_items in groups:
+        # Групи впорядковані за пріоритетом: коли бюджет вичерпано, решта —
+        # лише нетермінові нагадування, їх переносимо на наступні тіки
+        if loop.time() - started > DELIVERY_TICK_BUDGET_SECONDS and all(map(is_deferrable, user_items)):
+            for item in user_items:
+                if pending_reminders.push(shard, item):
+                    deferred += 1
+                else:
+                    shed.append(item)
+            continue
+
+        context = {
+            "bot_id": bot_id,
+            "tg_id": tg_id,
+            "user_id": user_items[0]["row"]["user_id"],
+            "event_ids": [item["row"]["id"] for item in user_items],
+            "kinds": [item["kind"] for item in user_items],
+        }
+        bot = bots.get(bot_id)
+        if bot is None:
+            # Токен прибрали з BOT_TOKENS — дані лишаються, але слати нічим
+            delivery_counters["no_bot"] += 1
+            scheduler_log.warning("Немає токена для бота", extra=context)
+            continue
+
+        dequeued = utcnow()
+        parts = build_digest_parts(user_items)
+        delivered, failed = [], []
+        for i, (text, part_items) in enumerate(parts):
+            # Кнопки відкладення — під останнім повідомленням дайджесту
+            markup = snooze_kb(user_items, user_items[0]["row"]["locale"]) if i == len(parts) - 1 else None
+            try:
+                await bot.send_message(tg_id, text, parse_mode=ParseMode.HTML, reply_markup=markup)
+                delivery_counters["sent"] += 1
+                delivered.extend(part_items)
+            except Exception as e:
+                if not is_permanent_delivery_error(e):
+                    # Решту дайджесту все одно шлемо, а нагадування цього
+                    # повідомлення повторюємо на наступному тіку (нижче)
+                    delivery_counters["failed"] += 1
+                    failed.extend(part_items)
+                    scheduler_log.warning(
+                        "Помилка надсилання: %s", e,
+                        extra={**context, "error": type(e).__name__},
+                    )
+                    continue
+                delivery_counters["failed_permanent"] += 1
+                with use_bot(bot_id):
+                    parked = deactivate_user(tg_id)
+                delivery_counters["users_deactivated"] += 1
+                delivery_counters["parked_events"] += parked
+                scheduler_log.info(
+                    "Користувач недосяжний, вимкнено",
+                    extra={**context, "error": str(e), "parked_events": parked},
+                )
+                # Писати користувачу більше нікуди: решта дайджесту
+                # недоставлена, події вже припарковані
+                undelivered = failed + [item for _, rest in parts[i:] for item in rest]
+                delivery_counters["undelivered"] += len(undelivered)
+                for item in undelivered:
+                    finish_reminder(item, fired_ids)
+                failed = []
+                break
+
+        if delivered:
+            acked = utcnow()
+            for item in delivered:
+                delivery_stats.add(item["kind"], item["fire_at"], dequeued, acked)
+                deliveries.append((
+                    item["row"]["id"], item["row"]["user_id"], item["kind"],
+                    to_epoch_ms(item["fire_at"]), to_epoch_ms(dequeued), to_epoch_ms(acked),
+                ))
+                finish_reminder(item, fired_ids)
+            scheduler_log.debug(
+                "Нагадування надіслано",
+                extra={**context, "lag_seconds": round((acked - user_items[0]["fire_at"]).total_seconds(), 3)},
+            )
+
+        # Недоставлені через тимчасову помилку не позначаємо: вони йдуть у
+        # чергу відкладених і повторюються, поки не мине defer_deadline
+        for item in failed:
+            if pending_reminders.push(shard, item):
+                delivery_counters["retried"] += 1
+            else:
+                shed.append(item)
+
+    # Відкинуті нетермінові позначаємо, щоб не повертались
+    for item in shed:
+        finish_reminder(item, fired_ids)
+    if deferred or shed:
+        delivery_counters["deferred"] += deferred
+        delivery_counters["shed"] += len(shed)
+        scheduler_log.warning(
+            "Перевантаження доставки: нетермінові нагадування відкладено",
+            extra={
+                "shard": shard, "deferred": deferred, "shed": len(shed),
+                "pending": len(pending_reminders), "tick_seconds": round(loop.time() - started, 3),
+            },
+        )
+
+    if deliveries:
+        try:
+            record_deliveries(deliveries)
+        except Exception:
+            scheduler_log.exception("Помилка запису delivery_log", extra={"records": len(deliveries)})
+
+    if fired_ids:
+        try:
+            moved = archive_events(fired_ids, now_utc)
+            scheduler_log.info("Події перенесено в архів", extra={"moved": moved})
+        except Exception:
+            scheduler_log.exception("Помилка архівації подій", extra={"event_ids": fired_ids})
+
+    return now_utc
+
+
+def seconds_to_next_minute(now_utc: datetime) -> float:
+    return 60 - (now_utc.second + now_utc.microsecond / 1_000_000)
+
+
+async def reminder_loop(bots: dict[int, Bot], shards: list[int]):
+    """
+    Воркер планувальника: на початку кожної хвилини проходить свої шарди.
+
+    Тік прив'язаний до годинника, а не до паузи після попереднього, і
+    вікно кожного шарду починається з now його попереднього тіку: якщо
+    прохід затягнувся за хвилину (кілька шардів по
+    DELIVERY_TICK_BUDGET_SECONDS), наступний тік підхоплює весь проміжок.
+    """
+    last_now: dict[int, datetime] = {}
+    idle = asyncio.Event()
+    for shard in shards:
+        scheduler_idle[shard] = idle
     while True:
-        now_utc = datetime.now(UTC).replace(tzinfo=None)
-        events = get_events_to_notify(now_utc)
-
-        for item in events:
-            row = item["row"]
-            kind = item["kind"]
-
-            tg_id = row["tg_id"]
-            title = row["title"]
-            event_dt_utc = datetime.fromisoformat(row["event_datetime"])
-            repeat_yearly = bool(row["repeat_yearly"])
-            event_type = row["type"]
-            tz_str = row["timezone"] or DEFAULT_TZ
+        idle.clear()
+        for shard in shards:
+            with use_shard(shard):
+                last_now[shard] = await reminder_tick(bots, last_now.get(shard))
+
+        idle.set()
+        await clock_sleep(seconds_to_next_minute(utcnow()))
+
+
+async def maintenance_loop():
+    while True:
+        await asyncio.sleep(MAINTENANCE_INTERVAL_SECONDS)
+        for shard in range(len(shard_paths())):
+            # Чекаємо кінця тіку воркера цього шарду, щоб прохід вклався
+            # в паузу між його тіками; інші воркери можуть тікати далі
+            idle = scheduler_idle.get(shard)
+            if idle is not None:
+                await idle.wait()
             try:
-                user_tzinfo = ZoneInfo(tz_str)
+                with use_shard(shard):
+                    stats = await asyncio.to_thread(run_maintenance, MAINTENANCE_BUDGET_SECONDS)
+                log.info("Обслуговування БД", extra={"shard": shard, **stats})
             except Exception:
-                user_tzinfo = ZoneInfo(DEFAULT_TZ)
+                log.exception("Помилка обслуговування БД", extra={"shard": shard})
 
-            event_dt_local = utc_to_local(event_dt_utc, user_tzinfo)
 
-            if event_type == "birthday":
-                if kind == "30d":
-                    text = f"🥳 За місяць день народження: <b>{title}</b>"
-                elif kind == "7d":
-                    text = f"🎉 За тиждень день народження: <b>{title}</b>"
-                elif kind == "1d":
-                    text = f"🎈 Вже завтра день народження: <b>{title}</b>"
-                else:
-                    text = f"🔥 Сьогодні день народження <b>{title}</b>!"
+async def backup_loop():
+    while True:
+        await asyncio.sleep(BACKUP_INTERVAL_SECONDS)
+        for db_path in shard_paths():
+            try:
+                # Сам знімок іде кроками з паузами в окремому потоці,
+                # тож тіки й обробники не простоюють
+                path = await asyncio.to_thread(create_backup, db_path=db_path)
+                log.info("Бекап БД збережено", extra={"db_path": db_path, "backup": path})
+            except Exception:
+                log.exception("Помилка бекапу БД", extra={"db_path": db_path})
 
-                try:
-                    await bot.send_message(tg_id, text, parse_mode=ParseMode.HTML)
-                except Exception as e:
-                    print(f"Помилка надсилання (birthday): {e}")
 
-                mark_notified(row["id"], kind, repeat_yearly)
+# ======================== МОВА ============================
 
-            else:
-                if kind == "before":
-                    text = (
-                        f"⏰ Нагадування: <b>{title}</b>\n"
-                        f"О {event_dt_local.strftime('%Y-%m-%d %H:%M')}"
-                    )
-                    try:
-                        await bot.send_message(tg_id, text, parse_mode=ParseMode.HTML)
-                    except Exception as e:
-                        print(f"Помилка надсилання (before): {e}")
+def language_kb() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text=name, callback_data=f"lang:{code}")]
+            for code, name in LOCALE_NAMES.items()
+        ]
+    )
 
-                    mark_notified(row["id"], kind, repeat_yearly)
 
-                elif kind == "main":
-                    text = (
-                        f"🔥 Подія зараз: <b>{title}</b>\n"
-                        f"{event_dt_local.strftime('%Y-%m-%d %H:%M')}"
-                    )
-                    try:
-                        await bot.send_message(tg_id, text, parse_mode=ParseMode.HTML)
-                    except Exception as e:
-                        print(f"Помилка надсилання (main): {e}")
+async def cmd_language(message: Message, state: FSMContext):
+    await state.clear()
+    user_id = get_or_create_user(message.from_user.id, message.from_user.username)
+    await message.answer(tr(get_locale_for_user(user_id), "language.choose"), reply_markup=language_kb())
 
-                    try:
-                        delete_event_by_id(row["id"])
-                        print(f"Подію id={row['id']} видалено автоматично після проходження.")
-                    except Exception as e:
-                        print(f"Помилка автознищення події id={row['id']}: {e}")
 
-        await asyncio.sleep(60)
+async def language_callback(callback: CallbackQuery):
+    code = callback.data.split(":", 1)[1]
+    if code not in LOCALE_NAMES:
+        await callback.answer()
+        return
+    user_id = get_or_create_user(callback.from_user.id, callback.from_user.username)
+    set_locale_for_user(user_id, code)
+    await callback.answer()
+    await callback.message.answer(tr(code, "language.set", name=LOCALE_NAMES[code]))
+
+
+# ======================== ВІДКЛАДЕННЯ ============================
+
+async def snooze_callback(callback: CallbackQuery):
+    _, raw_id, code = callback.data.split(":", 2)
+    delta = SNOOZE_DELTAS.get(code)
+    if delta is None or not raw_id.isdigit():
+        await callback.answer()
+        return
+
+    user_id = get_or_create_user(callback.from_user.id, callback.from_user.username)
+    # До хвилини: повторне натискання тієї ж кнопки дає той самий час
+    fire_at = utcnow().replace(second=0, microsecond=0) + delta
+    snooze = snooze_event(user_id, int(raw_id), fire_at)
+    if snooze is None:
+        await callback.answer(tr(get_locale_for_user(user_id), "snooze.not_found"), show_alert=True)
+        return
+
+    snooze_queue.add(current_shard(), snooze)
+    try:
+        user_tzinfo = ZoneInfo(snooze["timezone"] or DEFAULT_TZ)
+    except Exception:
+        user_tzinfo = ZoneInfo(DEFAULT_TZ)
+    await callback.answer(tr(snooze["locale"], "snooze.done", dt=utc_to_local(fire_at, user_tzinfo)))
+
+
+# ======================== АДМІН ============================
+
+async def cmd_loglevel(message: Message, command: CommandObject):
+    """
+    /loglevel — поточні рівні; /loglevel DEBUG — кореневий;
+    /loglevel bot.scheduler DEBUG — окремий логер.
+    """
+    args = (command.args or "").split()
+    if not args:
+        names = ["root", "bot", "bot.scheduler", "pipeline", "aiogram"]
+        lines = [
+            f"{name}: {logging.getLevelName(logging.getLogger(None if name == 'root' else name).getEffectiveLevel())}"
+            for name in names
+        ]
+        await message.answer("\n".join(lines))
+        return
+
+    name, level = ("root", args[0]) if len(args) == 1 else (args[0], args[1])
+    try:
+        new_level = set_level(name, level)
+    except ValueError as e:
+        await message.answer(str(e))
+        return
+    log.warning("Рівень логера змінено", extra={"target": name, "level": new_level, "by": message.from_user.id})
+    await message.answer(f"{name}: {new_level}")
+
+
+async def cmd_stats(message: Message):
+    """
+    Затримка доставки з моменту старту процесу + лічильники доставки.
+    Звіт за довший період: python deliverystats.py --hours 24
+    """
+    counters = ", ".join(f"{k}={v}" for k, v in sorted(delivery_counters.items())) or "—"
+    counters += f"; у черзі відкладених: {len(pending_reminders)}"
+    await message.answer(
+        f"<b>Доставка з {delivery_stats.since:%Y-%m-%d %H:%M} UTC</b>\n"
+        f"<pre>{escape(format_report(delivery_stats.snapshot()))}</pre>\n"
+        f"Лічильники: {escape(counters)}",
+        parse_mode=ParseMode.HTML,
+    )
 
 
 # ======================== Fallback ============================
@@ -1412,6 +2297,12 @@ def setup_handlers(dp: Dispatcher):
     dp.message.register(cmd_birthdays, Command("birthdays"))
     dp.message.register(cmd_export, Command("export"))
     dp.message.register(cmd_timezone, Command("timezone"))
+    dp.message.register(cmd_search, Command("search"))
+    dp.message.register(cmd_history, Command("history"))
+    dp.message.register(cmd_bulk, Command("bulk"))
+    dp.message.register(cmd_language, Command("language"))
+    dp.message.register(cmd_loglevel, Command("loglevel"), F.from_user.id.in_(ADMIN_IDS))
+    dp.message.register(cmd_stats, Command("stats"), F.from_user.id.in_(ADMIN_IDS))
 
     # Меню
     dp.callback_query.register(menu_add_callback, F.data == "menu_add")
@@ -1419,10 +2310,17 @@ def setup_handlers(dp: Dispatcher):
     dp.callback_query.register(menu_birthdays_callback, F.data == "menu_birthdays")
     dp.callback_query.register(menu_edit_callback, F.data == "menu_edit")
     dp.callback_query.register(menu_delete_callback, F.data == "menu_delete")
+    dp.callback_query.register(menu_bulk_callback, F.data == "menu_bulk")
     dp.callback_query.register(menu_tz_callback, F.data == "menu_tz")
+    dp.callback_query.register(menu_history_callback, F.data == "menu_history")
+
+    # Експорт
+    dp.callback_query.register(export_csv_callback, F.data == "export_csv")
+    dp.callback_query.register(export_json_callback, F.data == "export_json")
 
     # TZ
     dp.callback_query.register(tz_select_callback, F.data.startswith("tz:"))
+    dp.message.register(tz_location_set, F.location)
     dp.message.register(tz_manual_set, SetTimezone.waiting)
 
     # Вибір типу
@@ -1477,21 +2375,59 @@ def setup_handlers(dp: Dispatcher):
     # Видалення
     dp.message.register(delete_event_process, DeleteEvent.choose_id)
 
+    # Масові дії
+    dp.callback_query.register(bulk_callback, F.data.startswith("bulk:"))
+    dp.message.register(bulk_shift_days, BulkShift.days)
+
+    # Пошук
+    dp.callback_query.register(search_page_callback, F.data.startswith("srch_page:"))
+    dp.callback_query.register(search_edit_callback, F.data.startswith("srch_edit:"))
+    dp.callback_query.register(search_delete_callback, F.data.startswith("srch_del:"))
+
+    # Відкладення нагадувань
+    dp.callback_query.register(snooze_callback, F.data.startswith("snz:"))
+
+    # Мова
+    dp.callback_query.register(language_callback, F.data.startswith("lang:"))
+
     # Усе інше
     dp.message.register(fallback)
 
 
 async def main():
+    setup_logging()
     init_db()
-    bot = Bot(BOT_TOKEN)
+    bots = {bot.id: bot for bot in map(create_bot, BOT_TOKENS)}
     dp = Dispatcher()
+    dp.update.outer_middleware(BotMiddleware())
+    dp.update.outer_middleware(ShardMiddleware())
+    throttle = ThrottleMiddleware()
+    dp.message.outer_middleware(throttle)
+    dp.callback_query.outer_middleware(throttle)
 
     setup_handlers(dp)
 
-    asyncio.create_task(reminder_loop(bot))
-
-    print("Bot started (background worker, multi-TZ).")
-    await dp.start_polling(bot)
+    snoozes = load_snoozes(snooze_queue)
+    if snoozes:
+        log.info("Відкладення завантажено", extra={"snoozes": snoozes})
+
+    # Шарди порівну між воркерами планувальника
+    shard_count = len(shard_paths())
+    workers = max(1, min(SCHEDULER_WORKERS, shard_count))
+    for w in range(workers):
+        asyncio.create_task(reminder_loop(bots, list(range(w, shard_count, workers))))
+    asyncio.create_task(maintenance_loop())
+    if DB_BACKEND == "sqlite":
+        # Для Postgres бекапи — штатними засобами сервера (pg_dump / PITR)
+        asyncio.create_task(backup_loop())
+
+    # Обробники працюють у потоках пулу; цей loop лише приймає оновлення
+    # і крутить планувальник та обслуговування
+    pipeline = UpdatePipeline(dp, BOT_TOKENS, UPDATE_WORKERS, UPDATE_QUEUE_SIZE, bot_factory=create_bot)
+    asyncio.create_task(pipeline.report_loop(UPDATE_STATS_INTERVAL_SECONDS))
+
+    log.info("Bot started (background worker, multi-TZ).", extra={"bots": list(bots)})
+    await pipeline.run_polling(list(bots.values()))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+"""
+Годинник планувальника і часової логіки БД.
+
+Усе, що вирішує «коли», бере час через utcnow() і чекає через sleep(),
+а не напряму з datetime / asyncio. Це тік планувальника, вікно вибірки
+нагадувань, перенесення річниць, мітки created_at / deactivated_at та
+fire_at відкладень.
+
+Зазвичай це системний час. simulate.py підставляє SimulatedClock
+(set_clock): sleep() не чекає, а пересуває час, тож рік розкладу
+програється за секунди.
+
+Бюджети виконання (тік, обслуговування БД) міряються time.monotonic /
+loop.time — це реальна робота, а не час розкладу.
+"""
+import asyncio
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+
+
+class SystemClock:
+    def now(self) -> datetime:
+        """Поточний час, naive UTC."""
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+
+class SimulationFinished(Exception):
+    """Симульований час дійшов до SimulatedClock.until."""
+
+
+class SimulatedClock:
+    """
+    Час, який іде лише від sleep()/advance(). sleep() віддає керування
+    event loop'у (інші задачі встигають відпрацювати), але не чекає.
+    Коли час доходить до until, sleep() кидає SimulationFinished, і
+    нескінченний цикл, що спить через годинник, завершується.
+
+    fast_forward(now) -> момент, раніше якого прокидатись немає сенсу
+    (None — до until). Так простої між нагадуваннями проскакуються за
+    один sleep(); хто його дає, відповідає за те, щоб не перескочити
+    жодного потрібного тіку.
+    """
+
+    def __init__(
+        self,
+        start: datetime,
+        until: datetime | None = None,
+        fast_forward: Callable[[datetime], datetime | None] | None = None,
+    ):
+        self._now = start
+        self.until = until
+        self.fast_forward = fast_forward
+        self.sleeps = 0
+
+    def now(self) -> datetime:
+        return self._now
+
+    def advance(self, seconds: float) -> None:
+        self._now += timedelta(seconds=seconds)
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps += 1
+        self.advance(seconds)
+        if self.fast_forward is not None:
+            wake_at = self.fast_forward(self._now) or self.until
+            if wake_at is not None and wake_at > self._now:
+                self._now = wake_at
+        if self.until is not None and self._now >= self.until:
+            raise SimulationFinished(self._now)
+        await asyncio.sleep(0)
+
+
+_clock: SystemClock | SimulatedClock = SystemClock()
+
+
+def get_clock() -> SystemClock | SimulatedClock:
+    return _clock
+
+
+def set_clock(clock: SystemClock | SimulatedClock) -> None:
+    """Процесний годинник; ставиться до старту планувальника."""
+    global _clock
+    _clock = clock
+
+
+def utcnow() -> datetime:
+    return _clock.now()
+
+
+async def sleep(seconds: float) -> None:
+    await _clock.sleep(seconds)
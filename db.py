@@ -1,38 +1,546 @@
+import argparse
+import contextvars
+import functools
+import hashlib
+import os
+import re
+import shutil
 import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from itertools import repeat
+from zoneinfo import ZoneInfo
+
+from clock import utcnow
+from config import (
+    DB_PATH,
+    DB_SHARDS,
+    DB_BACKEND,
+    DATABASE_URL,
+    PG_POOL_MIN_SIZE,
+    PG_POOL_MAX_SIZE,
+    DELIVERY_LOG_RETENTION_DAYS,
+    BOT_TOKEN,
+)
+
+
+# =============== ШАРДИ ==================
+#
+# Користувачі розкладені по DB_SHARDS файлах SQLite за tg_id, щоб записи
+# різних користувачів не стояли в черзі за одним writer-lock. Шард 0 — це
+# DB_PATH (з DB_SHARDS=1 усе як раніше), решта — bot.shard1.db, ...
+#
+# user_id / event_id локальні для свого шарду. Оновлення Telegram завжди
+# стосується одного користувача, тож middleware ставить поточний шард
+# на час обробки (use_shard), і всі функції нижче йдуть у потрібний файл.
+
+
+def shard_paths(shard_count: int = DB_SHARDS) -> list[str]:
+    if shard_count <= 1:
+        return [DB_PATH]
+    stem, ext = os.path.splitext(DB_PATH)
+    return [DB_PATH] + [f"{stem}.shard{i}{ext or '.db'}" for i in range(1, shard_count)]
+
+
+def shard_for_tg_id(tg_id: int, shard_count: int = DB_SHARDS) -> int:
+    """
+    Rendezvous-хешування: при зміні кількості шардів переїжджає лише
+    ~1/N користувачів. sha1, а не hash(), — стабільно між процесами.
+    """
+    if shard_count <= 1:
+        return 0
+
+    def weight(shard: int) -> bytes:
+        return hashlib.sha1(f"{tg_id}:{shard}".encode()).digest()
+
+    return max(range(shard_count), key=weight)
+
+
+_current_shard: contextvars.ContextVar[int] = contextvars.ContextVar("db_shard", default=0)
+
+
+def current_shard() -> int:
+    return _current_shard.get()
+
+
+@contextmanager
+def use_shard(shard: int):
+    token = _current_shard.set(shard)
+    try:
+        yield
+    finally:
+        _current_shard.reset(token)
+
+
+# =============== БОТИ ==================
+#
+# Кілька ботів (BOT_TOKENS) ділять одну БД: users.bot_id — id бота
+# (числова частина токена), той самий tg_id у різних ботів — різні
+# користувачі. Як і шард, поточний бот ставить middleware (use_bot),
+# а планувальник — за рядком події. Дані, що були до появи bot_id,
+# належать першому боту.
+
+
+def bot_id_from_token(token: str) -> int:
+    return int(token.split(":", 1)[0])
+
 
-from config import DB_PATH
+DEFAULT_BOT_ID = bot_id_from_token(BOT_TOKEN)
 
+_current_bot: contextvars.ContextVar[int] = contextvars.ContextVar("bot_id", default=DEFAULT_BOT_ID)
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+
+def current_bot() -> int:
+    return _current_bot.get()
+
+
+@contextmanager
+def use_bot(bot_id: int):
+    token = _current_bot.set(bot_id)
+    try:
+        yield
+    finally:
+        _current_bot.reset(token)
+
+
+def get_connection(shard: int | None = None):
+    path = shard_paths()[current_shard() if shard is None else shard]
+    conn = sqlite3.connect(path)
     conn.row_factory = sqlite3.Row
     return conn
 
 
-def init_db():
-    conn = get_connection()
-    cur = conn.cursor()
+# =============== ЧАС ==================
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(dt: datetime) -> int:
+    """
+    naive UTC datetime → цілі секунди epoch (так час лежить у БД).
+    """
+    return int((dt - _EPOCH).total_seconds())
+
+
+def to_epoch_ms(dt: datetime) -> int:
+    """naive UTC datetime → мілісекунди epoch (delivery_log)."""
+    return int((dt - _EPOCH).total_seconds() * 1000)
+
+
+def from_epoch(ts: int) -> datetime:
+    """
+    Секунди epoch з БД → naive UTC datetime.
+    """
+    return _EPOCH + timedelta(seconds=ts)
+
+
+def shift_local_days(ts: int, days: int, tz: ZoneInfo) -> int:
+    """
+    Секунди epoch, зсунуті на days календарних днів за місцевим часом tz:
+    через перехід на літній/зимовий час подія лишається о тій самій
+    годині на годиннику, а не зсувається на годину.
+    """
+    local = datetime.fromtimestamp(ts, tz).replace(tzinfo=None) + timedelta(days=days)
+    return int(local.replace(tzinfo=tz).timestamp())
+
+
+# =============== ЗАПИСИ ==================
+#
+# Рядок події читається в EventRecord: __slots__ замість sqlite3.Row /
+# dict, а event_datetime розбирається в event_dt (naive UTC) один раз.
+# Поля доступні і атрибутом (row.title), і ключем (row["title"]), як у
+# sqlite3.Row, тож код, що читає рядки, від формату не залежить.
+#
+# Великі вибірки (експорт, повний прохід, тік планувальника) читаються
+# генераторами пачками по READ_BATCH_SIZE: у пам'яті лише поточна пачка.
+
+READ_BATCH_SIZE = 500
+
+EVENT_FIELDS = (
+    # events / events_archive
+    "id", "user_id", "title", "type", "category", "event_datetime",
+    "remind_before_minutes", "repeat_yearly",
+    "notified_30d", "notified_7d", "notified_1d", "notified_before", "notified_main",
+    "created_at", "fired_at", "archive_month", "claimed_until",
+    # users — у вибірках планувальника
+    "bot_id", "tg_id", "timezone", "locale",
+)
+_EVENT_FIELD_SET = frozenset(EVENT_FIELDS)
+
+
+class EventRecord:
+    __slots__ = ("_fields", "event_dt") + EVENT_FIELDS
+
+    @classmethod
+    def from_row(cls, names: tuple[str, ...], values) -> "EventRecord":
+        return _build_record(_record_fields(names), values)
+
+    @classmethod
+    def from_mapping(cls, mapping) -> "EventRecord":
+        """dict / asyncpg.Record → EventRecord."""
+        names = tuple(mapping.keys())
+        return cls.from_row(names, [mapping[name] for name in names])
+
+    def __getitem__(self, key: str):
+        if key in self._fields:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self._fields else default
+
+    def keys(self) -> tuple[str, ...]:
+        return self._fields
+
+    def __repr__(self) -> str:
+        return f"EventRecord(id={self.get('id')}, title={self.get('title')!r}, event_dt={self.event_dt})"
+
+
+@functools.lru_cache(maxsize=64)
+def _record_fields(names: tuple[str, ...]) -> tuple[str, ...]:
+    """
+    Перевіряє стовпці вибірки раз на кожен її вигляд. Стовпець поза
+    EVENT_FIELDS — помилка в SQL, а не поле, яке можна мовчки відкинути.
+    """
+    unknown = [name for name in names if name not in _EVENT_FIELD_SET]
+    if unknown:
+        raise ValueError(f"Стовпці поза EVENT_FIELDS: {', '.join(unknown)}")
+    return names
+
+
+def _build_record(fields: tuple[str, ...], values) -> EventRecord:
+    record = object.__new__(EventRecord)
+    record._fields = fields
+    # setattr через map — цикл по полях без байткоду на кожне
+    deque(map(setattr, repeat(record, len(fields)), fields, values), 0)
+    ts = getattr(record, "event_datetime", None)
+    record.event_dt = None if ts is None else from_epoch(ts)
+    return record
+
+
+class Reminder:
+    """Нагадування тіку: подія (row), тип (kind) і коли мало спрацювати (fire_at)."""
+
+    __slots__ = ("row", "kind", "fire_at")
+
+    def __init__(self, row: EventRecord, kind: str, fire_at: datetime):
+        self.row = row
+        self.kind = kind
+        self.fire_at = fire_at
+
+    def __getitem__(self, key: str):
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __repr__(self) -> str:
+        return f"Reminder({self.kind}, event={self.row.get('id')}, fire_at={self.fire_at})"
+
+
+def iter_records(cur, batch_size: int = READ_BATCH_SIZE):
+    """Рядки виконаного курсора sqlite3 → EventRecord, пачками fetchmany."""
+    # Кортежі замість sqlite3.Row: рядок усе одно одразу стає EventRecord
+    cur.row_factory = None
+    fields = _record_fields(tuple(d[0] for d in cur.description))
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        for values in rows:
+            yield _build_record(fields, values)
+
+
+# =============== НАГАДУВАННЯ ==================
+
+
+def due_reminder(
+    row: EventRecord,
+    now_utc: datetime,
+    lookahead_seconds: int = 0,
+    since_utc: datetime | None = None,
+) -> Reminder | None:
+    """
+    Яке нагадування по рядку події треба надіслати в тік now_utc (naive UTC):
+    Reminder або None. Спільне для всіх бекендів — SQL лише звужує
+    вибірку, рішення приймається тут.
+
+    Нагадування належить тіку, якщо fire_at у (since_utc, now_utc];
+    since_utc — now попереднього тіку, без нього — now_utc - 60 с.
+    З lookahead_seconds > 0 — також ті, що настануть протягом цього вікна.
+    """
+    window = 60 if since_utc is None else (now_utc - since_utc).total_seconds()
+
+    def due(target: datetime) -> bool:
+        return -lookahead_seconds <= (now_utc - target).total_seconds() < window
+
+    event_dt_utc = row.event_dt
+
+    # Дні народження
+    if row.type == "birthday":
+        # 30 днів
+        target_30 = event_dt_utc - timedelta(days=30)
+        if row.notified_30d == 0 and due(target_30):
+            return Reminder(row, "30d", target_30)
+
+        # 7 днів
+        target_7 = event_dt_utc - timedelta(days=7)
+        if row.notified_7d == 0 and due(target_7):
+            return Reminder(row, "7d", target_7)
+
+        # 1 день
+        target_1 = event_dt_utc - timedelta(days=1)
+        if row.notified_1d == 0 and due(target_1):
+            return Reminder(row, "1d", target_1)
+
+        # Основний день
+        if row.notified_main == 0 and due(event_dt_utc):
+            return Reminder(row, "main", event_dt_utc)
+
+        return None
+
+    # Звичайні події
+    before_min = row.remind_before_minutes or 0
+    if before_min > 0:
+        before_dt_utc = event_dt_utc - timedelta(minutes=before_min)
+        if row.notified_before == 0 and due(before_dt_utc):
+            return Reminder(row, "before", before_dt_utc)
+
+    if row.notified_main == 0 and due(event_dt_utc):
+        return Reminder(row, "main", event_dt_utc)
+
+    return None
+
+
+def due_window(
+    now_utc: datetime, lookahead_seconds: int = 0, since_utc: datetime | None = None
+) -> tuple[int, int]:
+    """
+    Межі fire_at (секунди epoch) для SQL-передфільтра тіку now_utc —
+    трохи ширші за due_reminder, яка й ухвалює остаточне рішення.
+    """
+    now = to_epoch(now_utc)
+    lo = now - 60 if since_utc is None else to_epoch(since_utc)
+    return lo, now + lookahead_seconds + 1
+
+
+def next_yearly(dt: datetime, now_utc: datetime) -> datetime:
+    """Найближча річниця dt, що ще не настала (29.02 → 28.02 у невисокосні роки)."""
+    year = now_utc.year
+    while True:
+        try:
+            candidate = dt.replace(year=year)
+        except ValueError:
+            candidate = dt.replace(year=year, day=28)
+        if candidate > now_utc:
+            return candidate
+        year += 1
+
+
+def search_words(text: str) -> list[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+# =============== ІНТЕРФЕЙС СХОВИЩА ==================
+
+
+class Storage(ABC):
+    """
+    Усе, що бот робить із даними. Час на вході/виході — naive UTC datetime,
+    у сховищі — секунди epoch. Рядки подій підтримують row["колонка"].
+    Реалізації: SQLiteStorage (нижче) і PostgresStorage (db_postgres.py);
+    вибір — DB_BACKEND у config.py.
+    """
+
+    @abstractmethod
+    def init_db(self) -> None: ...
 
     # USERS
+    @abstractmethod
+    def get_or_create_user(self, tg_id: int, username: str | None) -> int: ...
+
+    @abstractmethod
+    def get_user_timezone(self, user_id: int) -> str | None: ...
+
+    @abstractmethod
+    def set_user_timezone(self, user_id: int, tz: str) -> None: ...
+
+    @abstractmethod
+    def get_user_locale(self, user_id: int) -> str | None: ...
+
+    @abstractmethod
+    def set_user_locale(self, user_id: int, locale: str) -> None: ...
+
+    @abstractmethod
+    def deactivate_user(self, tg_id: int) -> int: ...
+
+    @abstractmethod
+    def reactivate_user(self, user_id: int) -> bool: ...
+
+    # EVENTS
+    @abstractmethod
+    def add_event(
+        self,
+        user_id: int,
+        title: str,
+        type_: str,
+        category: str | None,
+        event_dt_utc: datetime,
+        remind_before_minutes: int = 0,
+        repeat_yearly: bool = False,
+    ) -> int: ...
+
+    @abstractmethod
+    def get_user_events(self, user_id: int) -> list[EventRecord]: ...
+
+    @abstractmethod
+    def iter_user_events(self, user_id: int) -> Iterator[EventRecord]: ...
+
+    @abstractmethod
+    def iter_events(self) -> Iterator[EventRecord]: ...
+
+    @abstractmethod
+    def get_user_events_by_category(self, user_id: int, category: str) -> list[EventRecord]: ...
+
+    @abstractmethod
+    def get_user_birthdays(self, user_id: int) -> list[EventRecord]: ...
+
+    @abstractmethod
+    def get_user_birthdays_by_category(self, user_id: int, category: str) -> list[EventRecord]: ...
+
+    @abstractmethod
+    def get_event_by_id(self, user_id: int, event_id: int) -> EventRecord | None: ...
+
+    @abstractmethod
+    def search_user_events(self, user_id: int, text: str, limit: int = 10, offset: int = 0): ...
+
+    @abstractmethod
+    def delete_event(self, user_id: int, event_id: int) -> bool: ...
+
+    @abstractmethod
+    def delete_event_by_id(self, event_id: int) -> None: ...
+
+    @abstractmethod
+    def update_event_title(self, event_id: int, new_title: str) -> None: ...
+
+    @abstractmethod
+    def update_event_datetime_and_reset(
+        self, event_id: int, new_dt_utc: datetime, is_birthday: bool
+    ) -> None: ...
+
+    @abstractmethod
+    def update_event_remind_before(self, event_id: int, minutes: int) -> None: ...
+
+    # BULK
+    @abstractmethod
+    def delete_events(self, user_id: int, event_ids: list[int]) -> int: ...
+
+    @abstractmethod
+    def delete_events_in_category(self, user_id: int, category: str) -> int: ...
+
+    @abstractmethod
+    def move_events_category(self, user_id: int, from_category: str, to_category: str) -> int: ...
+
+    @abstractmethod
+    def shift_events(self, user_id: int, days: int, tz: ZoneInfo) -> int: ...
+
+    # NOTIFICATIONS
+    @abstractmethod
+    def get_events_to_notify(
+        self, now_utc: datetime, lookahead_seconds: int = 0, since_utc: datetime | None = None
+    ) -> Iterable[Reminder]: ...
+
+    @abstractmethod
+    def get_next_fire_at(self, after_utc: datetime) -> datetime | None: ...
+
+    @abstractmethod
+    def mark_notified(self, event_id: int, kind: str, repeat_yearly: bool) -> None: ...
+
+    # ARCHIVE
+    @abstractmethod
+    def archive_events(self, event_ids: list[int], fired_at_utc: datetime) -> int: ...
+
+    @abstractmethod
+    def get_user_archived_events(
+        self, user_id: int, month: int | None = None, limit: int | None = None
+    ) -> list[EventRecord]: ...
+
+    @abstractmethod
+    def iter_user_archived_events(
+        self, user_id: int, month: int | None = None, limit: int | None = None
+    ) -> Iterator[EventRecord]: ...
+
+    # DELIVERY LOG
+    @abstractmethod
+    def record_deliveries(self, records: list[tuple]) -> None: ...
+
+    @abstractmethod
+    def get_delivery_records(self, since_utc: datetime): ...
+
+    # SNOOZE
+    @abstractmethod
+    def snooze_event(self, user_id: int, event_id: int, fire_at_utc: datetime) -> dict | None: ...
+
+    @abstractmethod
+    def get_snoozes(self) -> list[dict]: ...
+
+    @abstractmethod
+    def delete_snooze(self, user_id: int, event_id: int, fire_at_utc: datetime) -> bool: ...
+
+    # MAINTENANCE
+    @abstractmethod
+    def run_maintenance(self, budget_seconds: float) -> dict: ...
+
+
+# =============== SQLITE ==================
+
+
+# --------------- СХЕМА ---------------
+
+
+def _create_users_table(cur, name: str = "users") -> None:
     cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS users (
+        f"""
+        CREATE TABLE IF NOT EXISTS {name} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tg_id INTEGER NOT NULL UNIQUE,
+            bot_id INTEGER NOT NULL,
+            tg_id INTEGER NOT NULL,
             username TEXT,
-            timezone TEXT
+            timezone TEXT,
+            locale TEXT,
+            active INTEGER NOT NULL DEFAULT 1,
+            deactivated_at INTEGER,
+            UNIQUE (bot_id, tg_id)
         );
         """
     )
 
-    # На випадок старої БД без стовпця timezone
-    cur.execute("PRAGMA table_info(users)")
-    cols = [r["name"] for r in cur.fetchall()]
-    if "timezone" not in cols:
-        cur.execute("ALTER TABLE users ADD COLUMN timezone TEXT")
 
-    # EVENTS
+def _migrate_users_to_bot_namespace(cur) -> None:
+    """
+    Стара users мала UNIQUE(tg_id) — SQLite не вміє його прибрати через
+    ALTER, тож переганяємо таблицю (id зберігаються, events посилаються
+    на них як і раніше). Наявні користувачі дістаються DEFAULT_BOT_ID.
+    """
+    _create_users_table(cur, "users_new")
+    cur.execute(
+        """
+        INSERT INTO users_new (id, bot_id, tg_id, username, timezone, locale, active, deactivated_at)
+        SELECT id, ?, tg_id, username, timezone, locale, active, deactivated_at FROM users
+        """,
+        (DEFAULT_BOT_ID,),
+    )
+    cur.execute("DROP TABLE users")
+    cur.execute("ALTER TABLE users_new RENAME TO users")
+
+
+def _create_events_table(cur) -> None:
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS events (
@@ -40,8 +548,8 @@ def init_db():
             user_id INTEGER NOT NULL,
             title TEXT NOT NULL,
             type TEXT NOT NULL,
-            category TEXT,
-            event_datetime TEXT NOT NULL,
+            category TEXT NOT NULL DEFAULT 'other',
+            event_datetime INTEGER NOT NULL,
             remind_before_minutes INTEGER DEFAULT 0,
             repeat_yearly INTEGER DEFAULT 0,
             notified_30d INTEGER DEFAULT 0,
@@ -49,207 +557,721 @@ def init_db():
             notified_1d INTEGER DEFAULT 0,
             notified_before INTEGER DEFAULT 0,
             notified_main INTEGER DEFAULT 0,
-            created_at TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
             FOREIGN KEY (user_id) REFERENCES users(id)
         );
         """
     )
 
-    conn.commit()
 
+def _migrate_events_to_epoch(cur) -> None:
+    """
+    Стара схема зберігала event_datetime/created_at як ISO-текст.
+    Переганяємо таблицю в нову схему з цілими секундами epoch
+    (і одразу прибираємо NULL-категорії → 'other').
+    """
+    cur.execute("ALTER TABLE events RENAME TO events_old")
+    _create_events_table(cur)
+    cur.execute(
+        """
+        INSERT INTO events (
+            id, user_id, title, type, category,
+            event_datetime, remind_before_minutes, repeat_yearly,
+            notified_30d, notified_7d, notified_1d,
+            notified_before, notified_main, created_at
+        )
+        SELECT
+            id, user_id, title, type, COALESCE(category, 'other'),
+            CAST(strftime('%s', event_datetime) AS INTEGER),
+            remind_before_minutes, repeat_yearly,
+            notified_30d, notified_7d, notified_1d,
+            notified_before, notified_main,
+            CAST(strftime('%s', created_at) AS INTEGER)
+        FROM events_old
+        """
+    )
+    cur.execute("DROP TABLE events_old")
 
-# =============== USERS ==================
 
+def _create_events_fts(cur) -> None:
+    """
+    Contentless FTS5-індекс над events.title. Колонка owner містить
+    токен 'u<user_id>', тож пошук обмежується подіями одного користувача
+    ще всередині FTS, а не фільтром після JOIN по всій базі.
+    Синхронізується тригерами на INSERT / UPDATE / DELETE.
+    """
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events_fts'"
+    )
+    existed = cur.fetchone() is not None
 
-def get_or_create_user(tg_id: int, username: str | None) -> int:
-    conn = get_connection()
-    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+            title,
+            owner,
+            content = '',
+            prefix = '2 3',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS events_fts_ai AFTER INSERT ON events
+        BEGIN
+            INSERT INTO events_fts (rowid, title, owner)
+            VALUES (new.id, new.title, 'u' || new.user_id);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS events_fts_ad AFTER DELETE ON events
+        BEGIN
+            INSERT INTO events_fts (events_fts, rowid, title, owner)
+            VALUES ('delete', old.id, old.title, 'u' || old.user_id);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS events_fts_au
+        AFTER UPDATE OF title, user_id ON events
+        BEGIN
+            INSERT INTO events_fts (events_fts, rowid, title, owner)
+            VALUES ('delete', old.id, old.title, 'u' || old.user_id);
+            INSERT INTO events_fts (rowid, title, owner)
+            VALUES (new.id, new.title, 'u' || new.user_id);
+        END
+        """
+    )
+
+    if not existed:
+        cur.execute(
+            """
+            INSERT INTO events_fts (rowid, title, owner)
+            SELECT id, title, 'u' || user_id FROM events
+            """
+        )
 
-    cur.execute("SELECT id FROM users WHERE tg_id = ?", (tg_id,))
-    row = cur.fetchone()
-    if row:
-        return row["id"]
 
+def _create_events_archive(cur) -> None:
+    """
+    Архів відпрацьованих разових подій. Рядки лише додаються; archive_month
+    (YYYYMM) — ключ місячної партиції: вибірки й чистка йдуть по місяцях
+    через індекс, не чіпаючи гарячу таблицю events.
+    """
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS events_archive (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            type TEXT NOT NULL,
+            category TEXT NOT NULL,
+            event_datetime INTEGER NOT NULL,
+            remind_before_minutes INTEGER DEFAULT 0,
+            created_at INTEGER NOT NULL,
+            fired_at INTEGER NOT NULL,
+            archive_month INTEGER NOT NULL
+        );
+        """
+    )
     cur.execute(
-        "INSERT INTO users (tg_id, username) VALUES (?, ?)",
-        (tg_id, username),
+        """
+        CREATE INDEX IF NOT EXISTS idx_archive_month_user
+        ON events_archive (archive_month, user_id)
+        """
+    )
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_archive_user_dt
+        ON events_archive (user_id, event_datetime)
+        """
     )
-    conn.commit()
-    return cur.lastrowid
 
 
-def get_user_timezone(user_id: int) -> str | None:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT timezone FROM users WHERE id = ?", (user_id,))
-    row = cur.fetchone()
-    if not row:
+def _configure_storage(conn) -> None:
+    """
+    WAL — читачі не блокують записи (і навпаки), checkpoint робить
+    maintenance. auto_vacuum=INCREMENTAL — вільні сторінки можна
+    повертати ОС маленькими порціями через incremental_vacuum.
+    Для вже наявної БД зміна auto_vacuum вимагає одноразового VACUUM.
+    """
+    conn.execute("PRAGMA journal_mode = WAL")
+
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if conn.execute("PRAGMA page_count").fetchone()[0] > 0:
+            conn.execute("VACUUM")
+
+
+def _fts_match_query(user_id: int, text: str) -> str | None:
+    """
+    Будує FTS5-вираз: кожне слово — префіксний пошук ("мам"*),
+    усі слова мають збігтися, і лише серед подій цього користувача.
+    """
+    words = search_words(text)
+    if not words:
         return None
-    return row["timezone"]
+    terms = " AND ".join(f'"{w}"*' for w in words)
+    return f"owner : u{user_id} AND title : ({terms})"
 
 
-def set_user_timezone(user_id: int, tz: str) -> None:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("UPDATE users SET timezone = ? WHERE id = ?", (tz, user_id))
-    conn.commit()
+ARCHIVE_BATCH_SIZE = 500
+MAINTENANCE_BUSY_TIMEOUT_MS = 200
+MAINTENANCE_ANALYSIS_LIMIT = 400
+MAINTENANCE_VACUUM_STEP_PAGES = 256
 
 
-# =============== EVENTS CRUD ==================
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
 
 
-def add_event(
-    user_id: int,
-    title: str,
-    type_: str,
-    category: str | None,
-    event_dt_utc: datetime,
-    remind_before_minutes: int = 0,
-    repeat_yearly: bool = False,
-) -> int:
+class SQLiteStorage(Storage):
     """
-    ВАЖЛИВО: event_dt_utc — це вже час у UTC (naive).
+    Сховище на SQLite: по файлу на шард (див. ШАРДИ вище).
     """
-    conn = get_connection()
-    cur = conn.cursor()
 
-    cur.execute(
-        """
-        INSERT INTO events (
-            user_id, title, type, category,
-            event_datetime, remind_before_minutes,
-            repeat_yearly, created_at
+    def init_db(self):
+        for shard in range(len(shard_paths())):
+            self._init_shard(shard)
+
+    def _init_shard(self, shard: int) -> None:
+        conn = get_connection(shard)
+        _configure_storage(conn)
+        cur = conn.cursor()
+
+        # USERS
+        _create_users_table(cur)
+
+        # На випадок старої БД без стовпця timezone
+        cur.execute("PRAGMA table_info(users)")
+        cols = [r["name"] for r in cur.fetchall()]
+        if "timezone" not in cols:
+            cur.execute("ALTER TABLE users ADD COLUMN timezone TEXT")
+        # Мова повідомлень (i18n.py); NULL — ще не обрана
+        if "locale" not in cols:
+            cur.execute("ALTER TABLE users ADD COLUMN locale TEXT")
+        # Користувач, якому бот не може писати (заблокував, видалив акаунт):
+        # його події планувальник не вибирає, доки не буде /start
+        if "active" not in cols:
+            cur.execute("ALTER TABLE users ADD COLUMN active INTEGER NOT NULL DEFAULT 1")
+        if "deactivated_at" not in cols:
+            cur.execute("ALTER TABLE users ADD COLUMN deactivated_at INTEGER")
+        # Простір імен бота: UNIQUE(tg_id) → UNIQUE(bot_id, tg_id)
+        if "bot_id" not in cols:
+            _migrate_users_to_bot_namespace(cur)
+
+        # EVENTS
+        _create_events_table(cur)
+
+        # На випадок старої БД, де час зберігався ISO-текстом
+        cur.execute("PRAGMA table_info(events)")
+        ev_types = {r["name"]: (r["type"] or "").upper() for r in cur.fetchall()}
+        if ev_types.get("event_datetime") != "INTEGER":
+            _migrate_events_to_epoch(cur)
+
+        # Індекси під списки користувача: WHERE user_id = ? [AND type/category]
+        # ORDER BY event_datetime читаються прямо з індексу, без сортування.
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_events_user_dt
+            ON events (user_id, event_datetime)
+            """
+        )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_events_user_type_cat_dt
+            ON events (user_id, type, category, event_datetime)
+            """
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            user_id,
-            title,
-            type_,
-            category,
-            event_dt_utc.isoformat(),
-            remind_before_minutes,
-            1 if repeat_yearly else 0,
-            datetime.utcnow().isoformat(),
-        ),
-    )
-    conn.commit()
-    return cur.lastrowid
 
+        # Індекси під вибірку планувальника: діапазони event_datetime
+        # (основне і ДР-нагадування) і момент «за N хвилин до»
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_events_dt
+            ON events (event_datetime)
+            """
+        )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_events_before_dt
+            ON events (event_datetime - remind_before_minutes * 60)
+            WHERE remind_before_minutes > 0
+            """
+        )
 
-def get_user_events(user_id: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT * FROM events
-        WHERE user_id = ?
-        ORDER BY datetime(event_datetime) ASC
-        """,
-        (user_id,),
-    )
-    return cur.fetchall()
+        # Повнотекстовий пошук по назвах (FTS5)
+        _create_events_fts(cur)
 
+        # ARCHIVE: відпрацьовані разові події (append-only)
+        _create_events_archive(cur)
 
-def get_user_events_by_category(user_id: int, category: str):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+        # Журнал доставки: три моменти кожного нагадування, мс epoch
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS delivery_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                scheduled_at INTEGER NOT NULL,
+                dequeued_at INTEGER NOT NULL,
+                acked_at INTEGER NOT NULL
+            );
+            """
+        )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_delivery_log_acked
+            ON delivery_log (acked_at)
+            """
+        )
+
+        # Відкладені користувачем нагадування (кнопки під нагадуванням).
+        # Одне на подію: повторне відкладення лише пересуває fire_at.
+        # Назву й час події копіюємо — разова подія могла вже піти в архів
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS snoozes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                event_id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                event_datetime INTEGER NOT NULL,
+                fire_at INTEGER NOT NULL,
+                created_at INTEGER NOT NULL,
+                UNIQUE (user_id, event_id)
+            );
+            """
+        )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_snoozes_fire
+            ON snoozes (fire_at)
+            """
+        )
+
+        # Журнал фонового обслуговування БД
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS maintenance_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at INTEGER NOT NULL,
+                duration_ms INTEGER NOT NULL,
+                file_size INTEGER NOT NULL,
+                page_count INTEGER NOT NULL,
+                freelist_count INTEGER NOT NULL,
+                free_ratio REAL NOT NULL,
+                pages_vacuumed INTEGER NOT NULL,
+                wal_frames INTEGER NOT NULL,
+                wal_checkpointed INTEGER NOT NULL,
+                analyzed INTEGER NOT NULL
+            );
+            """
+        )
+
+        conn.commit()
+
+    # --------------- USERS ---------------
+
+    def get_or_create_user(self, tg_id: int, username: str | None) -> int:
         """
-        SELECT * FROM events
-        WHERE user_id = ?
-          AND (category = ? OR (category IS NULL AND ? = 'other'))
-        ORDER BY datetime(event_datetime) ASC
-        """,
-        (user_id, category, category),
-    )
-    return cur.fetchall()
+        Повертає user_id поточного бота (use_bot) у шарді цього tg_id
+        (див. shard_for_tg_id).
+        """
+        conn = get_connection(shard_for_tg_id(tg_id))
+        cur = conn.cursor()
+        bot_id = current_bot()
 
+        cur.execute("SELECT id FROM users WHERE bot_id = ? AND tg_id = ?", (bot_id, tg_id))
+        row = cur.fetchone()
+        if row:
+            return row["id"]
 
-def get_user_birthdays(user_id: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+        cur.execute(
+            "INSERT INTO users (bot_id, tg_id, username) VALUES (?, ?, ?)",
+            (bot_id, tg_id, username),
+        )
+        conn.commit()
+        return cur.lastrowid
+
+    def get_user_timezone(self, user_id: int) -> str | None:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT timezone FROM users WHERE id = ?", (user_id,))
+        row = cur.fetchone()
+        if not row:
+            return None
+        return row["timezone"]
+
+    def set_user_timezone(self, user_id: int, tz: str) -> None:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("UPDATE users SET timezone = ? WHERE id = ?", (tz, user_id))
+        conn.commit()
+
+    def get_user_locale(self, user_id: int) -> str | None:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT locale FROM users WHERE id = ?", (user_id,))
+        row = cur.fetchone()
+        if not row:
+            return None
+        return row["locale"]
+
+    def set_user_locale(self, user_id: int, locale: str) -> None:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("UPDATE users SET locale = ? WHERE id = ?", (locale, user_id))
+        conn.commit()
+
+    def deactivate_user(self, tg_id: int) -> int:
         """
-        SELECT * FROM events
-        WHERE user_id = ?
-          AND type = 'birthday'
-        ORDER BY datetime(event_datetime) ASC
-        """,
-        (user_id,),
-    )
-    return cur.fetchall()
+        Позначає користувача поточного бота недосяжним. Повертає кількість
+        його подій, які планувальник більше не вибиратиме.
+        """
+        conn = get_connection(shard_for_tg_id(tg_id))
+        cur = conn.cursor()
+        bot_id = current_bot()
+        cur.execute(
+            "UPDATE users SET active = 0, deactivated_at = ? WHERE bot_id = ? AND tg_id = ? AND active = 1",
+            (to_epoch(utcnow()), bot_id, tg_id),
+        )
+        if cur.rowcount == 0:
+            conn.commit()
+            return 0
+        cur.execute(
+            "SELECT COUNT(*) FROM events e JOIN users u ON u.id = e.user_id WHERE u.bot_id = ? AND u.tg_id = ?",
+            (bot_id, tg_id),
+        )
+        parked = cur.fetchone()[0]
+        conn.commit()
+        return parked
 
+    def reactivate_user(self, user_id: int) -> bool:
+        """
+        Повертає користувача в розсилку. Річні події, чия дата минула,
+        поки він був неактивний, переносяться на найближчу річницю.
+        """
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE users SET active = 1, deactivated_at = NULL WHERE id = ? AND active = 0",
+            (user_id,),
+        )
+        if cur.rowcount == 0:
+            conn.commit()
+            return False
 
-def get_user_birthdays_by_category(user_id: int, category: str):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+        now_utc = utcnow()
+        cur.execute(
+            """
+            SELECT id, event_datetime FROM events
+            WHERE user_id = ? AND repeat_yearly = 1 AND event_datetime < ?
+            """,
+            (user_id, to_epoch(now_utc)),
+        )
+        for row in cur.fetchall():
+            new_dt = next_yearly(from_epoch(row["event_datetime"]), now_utc)
+            cur.execute(
+                """
+                UPDATE events
+                SET event_datetime = ?,
+                    notified_30d = 0,
+                    notified_7d = 0,
+                    notified_1d = 0,
+                    notified_before = 0,
+                    notified_main = 0
+                WHERE id = ?
+                """,
+                (to_epoch(new_dt), row["id"]),
+            )
+        conn.commit()
+        return True
+
+    # --------------- EVENTS CRUD ---------------
+
+    def add_event(
+        self,
+        user_id: int,
+        title: str,
+        type_: str,
+        category: str | None,
+        event_dt_utc: datetime,
+        remind_before_minutes: int = 0,
+        repeat_yearly: bool = False,
+    ) -> int:
         """
-        SELECT * FROM events
-        WHERE user_id = ?
-          AND type = 'birthday'
-          AND (category = ? OR (category IS NULL AND ? = 'other'))
-        ORDER BY datetime(event_datetime) ASC
-        """,
-        (user_id, category, category),
-    )
-    return cur.fetchall()
+        ВАЖЛИВО: event_dt_utc — це вже час у UTC (naive).
+        """
+        conn = get_connection()
+        cur = conn.cursor()
 
+        cur.execute(
+            """
+            INSERT INTO events (
+                user_id, title, type, category,
+                event_datetime, remind_before_minutes,
+                repeat_yearly, created_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                user_id,
+                title,
+                type_,
+                category or "other",
+                to_epoch(event_dt_utc),
+                remind_before_minutes,
+                1 if repeat_yearly else 0,
+                to_epoch(utcnow()),
+            ),
+        )
+        conn.commit()
+        return cur.lastrowid
 
-def get_event_by_id(user_id: int, event_id: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT * FROM events WHERE id = ? AND user_id = ?",
-        (event_id, user_id),
-    )
-    return cur.fetchone()
+    def get_user_events(self, user_id: int) -> list[EventRecord]:
+        return list(self.iter_user_events(user_id))
 
+    def iter_user_events(self, user_id: int) -> Iterator[EventRecord]:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT * FROM events
+            WHERE user_id = ?
+            ORDER BY event_datetime ASC
+            """,
+            (user_id,),
+        )
+        yield from iter_records(cur)
+
+    def iter_events(self) -> Iterator[EventRecord]:
+        """Усі події поточного шарду, за id."""
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM events ORDER BY id")
+        yield from iter_records(cur)
+
+    def get_user_events_by_category(self, user_id: int, category: str) -> list[EventRecord]:
+        conn = get_connection()
+        cur = conn.cursor()
+        # Навмисно idx_events_user_dt із перевіркою category по рядках:
+        # у idx_events_user_type_cat_dt між user_id і category стоїть type
+        # (див. tests/test_query_plans.py)
+        cur.execute(
+            """
+            SELECT * FROM events
+            WHERE user_id = ?
+              AND category = ?
+            ORDER BY event_datetime ASC
+            """,
+            (user_id, category),
+        )
+        return list(iter_records(cur))
 
-def delete_event(user_id: int, event_id: int) -> bool:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "DELETE FROM events WHERE id = ? AND user_id = ?",
-        (event_id, user_id),
-    )
-    conn.commit()
-    return cur.rowcount > 0
+    def get_user_birthdays(self, user_id: int) -> list[EventRecord]:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT * FROM events
+            WHERE user_id = ?
+              AND type = 'birthday'
+            ORDER BY event_datetime ASC
+            """,
+            (user_id,),
+        )
+        return list(iter_records(cur))
 
+    def get_user_birthdays_by_category(self, user_id: int, category: str) -> list[EventRecord]:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT * FROM events
+            WHERE user_id = ?
+              AND type = 'birthday'
+              AND category = ?
+            ORDER BY event_datetime ASC
+            """,
+            (user_id, category),
+        )
+        return list(iter_records(cur))
 
-def delete_event_by_id(event_id: int) -> None:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM events WHERE id = ?", (event_id,))
-    conn.commit()
+    def get_event_by_id(self, user_id: int, event_id: int) -> EventRecord | None:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT * FROM events WHERE id = ? AND user_id = ?",
+            (event_id, user_id),
+        )
+        return next(iter_records(cur), None)
 
+    def search_user_events(self, user_id: int, text: str, limit: int = 10, offset: int = 0):
+        """
+        Повертає (rows, has_more): події користувача, відсортовані за
+        релевантністю (bm25) назви до запиту.
+        """
+        match = _fts_match_query(user_id, text)
+        if match is None:
+            return [], False
 
-def update_event_title(event_id: int, new_title: str) -> None:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE events SET title = ? WHERE id = ?",
-        (new_title, event_id),
-    )
-    conn.commit()
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT e.*
+            FROM events_fts f
+            JOIN events e ON e.id = f.rowid
+            WHERE events_fts MATCH ?
+            ORDER BY bm25(events_fts, 1.0, 0.0), e.event_datetime
+            LIMIT ? OFFSET ?
+            """,
+            (match, limit + 1, offset),
+        )
+        rows = list(iter_records(cur))
+        return rows[:limit], len(rows) > limit
 
+    def delete_event(self, user_id: int, event_id: int) -> bool:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "DELETE FROM events WHERE id = ? AND user_id = ?",
+            (event_id, user_id),
+        )
+        conn.commit()
+        return cur.rowcount > 0
+
+    def delete_event_by_id(self, event_id: int) -> None:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("DELETE FROM events WHERE id = ?", (event_id,))
+        conn.commit()
+
+    def update_event_title(self, event_id: int, new_title: str) -> None:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE events SET title = ? WHERE id = ?",
+            (new_title, event_id),
+        )
+        conn.commit()
 
-def update_event_datetime_and_reset(
-    event_id: int, new_dt_utc: datetime, is_birthday: bool
-) -> None:
-    """
-    new_dt_utc — знову ж таки в UTC (naive).
-    """
-    conn = get_connection()
-    cur = conn.cursor()
+    def update_event_datetime_and_reset(
+        self,
+        event_id: int, new_dt_utc: datetime, is_birthday: bool
+    ) -> None:
+        """
+        new_dt_utc — знову ж таки в UTC (naive).
+        """
+        conn = get_connection()
+        cur = conn.cursor()
+
+        if is_birthday:
+            cur.execute(
+                """
+                UPDATE events
+                SET event_datetime = ?,
+                    repeat_yearly = 1,
+                    notified_30d = 0,
+                    notified_7d = 0,
+                    notified_1d = 0,
+                    notified_before = 0,
+                    notified_main = 0
+                WHERE id = ?
+                """,
+                (to_epoch(new_dt_utc), event_id),
+            )
+        else:
+            cur.execute(
+                """
+                UPDATE events
+                SET event_datetime = ?,
+                    notified_30d = 0,
+                    notified_7d = 0,
+                    notified_1d = 0,
+                    notified_before = 0,
+                    notified_main = 0
+                WHERE id = ?
+                """,
+                (to_epoch(new_dt_utc), event_id),
+            )
+
+        conn.commit()
 
-    if is_birthday:
+    def update_event_remind_before(self, event_id: int, minutes: int) -> None:
+        conn = get_connection()
+        cur = conn.cursor()
         cur.execute(
+            "UPDATE events SET remind_before_minutes = ? WHERE id = ?",
+            (minutes, event_id),
+        )
+        conn.commit()
+
+    # --------------- BULK ---------------
+    #
+    # Кожна операція — одна транзакція і один commit, скільки б подій
+    # вона не зачепила. Повертають кількість змінених подій.
+
+    def delete_events(self, user_id: int, event_ids: list[int]) -> int:
+        """Видаляє події користувача за списком ID; чужі й неіснуючі пропускаються."""
+        if not event_ids:
+            return 0
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.executemany(
+            "DELETE FROM events WHERE id = ? AND user_id = ?",
+            [(event_id, user_id) for event_id in event_ids],
+        )
+        conn.commit()
+        return cur.rowcount
+
+    def delete_events_in_category(self, user_id: int, category: str) -> int:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "DELETE FROM events WHERE user_id = ? AND category = ?",
+            (user_id, category),
+        )
+        conn.commit()
+        return cur.rowcount
+
+    def move_events_category(self, user_id: int, from_category: str, to_category: str) -> int:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE events SET category = ? WHERE user_id = ? AND category = ?",
+            (to_category, user_id, from_category),
+        )
+        conn.commit()
+        return cur.rowcount
+
+    def shift_events(self, user_id: int, days: int, tz: ZoneInfo) -> int:
+        """
+        Зсуває всі події користувача на days днів (можна від'ємне) за його
+        місцевим часом tz і, як update_event_datetime_and_reset, скидає
+        позначки надісланих нагадувань: у новий час вони мають прийти знову.
+        """
+        conn = get_connection()
+        cur = conn.cursor()
+        # Читання й запис — в одній транзакції: між ними подію не змінять
+        cur.execute("BEGIN IMMEDIATE")
+        rows = cur.execute(
+            "SELECT id, event_datetime FROM events WHERE user_id = ?",
+            (user_id,),
+        ).fetchall()
+        cur.executemany(
             """
             UPDATE events
             SET event_datetime = ?,
-                repeat_yearly = 1,
                 notified_30d = 0,
                 notified_7d = 0,
                 notified_1d = 0,
@@ -257,175 +1279,581 @@ def update_event_datetime_and_reset(
                 notified_main = 0
             WHERE id = ?
             """,
-            (new_dt_utc.isoformat(), event_id),
+            [(shift_local_days(row["event_datetime"], days, tz), row["id"]) for row in rows],
         )
-    else:
+        conn.commit()
+        return len(rows)
+
+    # --------------- NOTIFICATIONS ---------------
+
+    def get_events_to_notify(
+        self, now_utc: datetime, lookahead_seconds: int = 0, since_utc: datetime | None = None
+    ) -> Iterator[Reminder]:
+        """
+        now_utc — поточний час в UTC (naive).
+        event_datetime в БД зберігається як секунди epoch (UTC).
+
+        since_utc — now попереднього тіку: вікно (since_utc, now_utc]
+        підхоплює все, що настало, навіть якщо тік запізнився.
+
+        lookahead_seconds > 0 додатково повертає нагадування, які настануть
+        протягом цього вікна (fire_at > now_utc) — щоб планувальник міг
+        злити їх у дайджест разом із тими, що вже настали.
+
+        Генератор: рядки читаються з курсора пачками, у пам'яті — лише
+        нагадування, що справді настали.
+        """
+        conn = get_connection()
+        cur = conn.cursor()
+
+        # Кожна гілка OR читається своїм індексом (idx_events_dt /
+        # idx_events_before_dt); неактивні користувачі відсіюються на JOIN
+        lo, hi = due_window(now_utc, lookahead_seconds, since_utc)
         cur.execute(
             """
-            UPDATE events
-            SET event_datetime = ?,
-                notified_30d = 0,
-                notified_7d = 0,
-                notified_1d = 0,
-                notified_before = 0,
-                notified_main = 0
-            WHERE id = ?
+            SELECT e.*, u.bot_id, u.tg_id, u.timezone, u.locale
+            FROM events e
+            JOIN users u ON e.user_id = u.id
+            WHERE u.active = 1
+              AND (
+                e.event_datetime BETWEEN :lo AND :hi
+                OR (e.type = 'birthday' AND e.event_datetime BETWEEN :lo + 86400 AND :hi + 86400)
+                OR (e.type = 'birthday' AND e.event_datetime BETWEEN :lo + 604800 AND :hi + 604800)
+                OR (e.type = 'birthday' AND e.event_datetime BETWEEN :lo + 2592000 AND :hi + 2592000)
+                OR (e.remind_before_minutes > 0
+                    AND e.event_datetime - e.remind_before_minutes * 60 BETWEEN :lo AND :hi)
+              )
             """,
-            (new_dt_utc.isoformat(), event_id),
+            {"lo": lo, "hi": hi},
         )
+        for row in iter_records(cur):
+            item = due_reminder(row, now_utc, lookahead_seconds, since_utc)
+            if item is not None:
+                yield item
 
-    conn.commit()
+    def get_next_fire_at(self, after_utc: datetime) -> datetime | None:
+        """
+        Нижня межа найближчого fire_at, пізнішого за after_utc (None — подій
+        немає). Прапорці notified_*, тип події й активність користувача не
+        враховуються: межа може бути раніше справжньої, але не пізніше.
+        Кожна гілка — MIN по індексу, без сканування.
+        """
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT MIN(fire_at) FROM (
+                SELECT MIN(event_datetime) AS fire_at FROM events
+                WHERE event_datetime > :after
+                UNION ALL
+                SELECT MIN(event_datetime) - 86400 FROM events
+                WHERE event_datetime > :after + 86400
+                UNION ALL
+                SELECT MIN(event_datetime) - 604800 FROM events
+                WHERE event_datetime > :after + 604800
+                UNION ALL
+                SELECT MIN(event_datetime) - 2592000 FROM events
+                WHERE event_datetime > :after + 2592000
+                UNION ALL
+                SELECT MIN(event_datetime - remind_before_minutes * 60) FROM events
+                WHERE remind_before_minutes > 0
+                  AND event_datetime - remind_before_minutes * 60 > :after
+            )
+            """,
+            {"after": to_epoch(after_utc)},
+        )
+        ts = cur.fetchone()[0]
+        return None if ts is None else from_epoch(ts)
 
+    def mark_notified(self, event_id: int, kind: str, repeat_yearly: bool) -> None:
+        conn = get_connection()
+        cur = conn.cursor()
 
-def update_event_remind_before(event_id: int, minutes: int) -> None:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE events SET remind_before_minutes = ? WHERE id = ?",
-        (minutes, event_id),
-    )
-    conn.commit()
+        if kind == "30d":
+            cur.execute(
+                "UPDATE events SET notified_30d = 1 WHERE id = ?",
+                (event_id,),
+            )
+        elif kind == "7d":
+            cur.execute(
+                "UPDATE events SET notified_7d = 1 WHERE id = ?",
+                (event_id,),
+            )
+        elif kind == "1d":
+            cur.execute(
+                "UPDATE events SET notified_1d = 1 WHERE id = ?",
+                (event_id,),
+            )
+        elif kind == "before":
+            cur.execute(
+                "UPDATE events SET notified_before = 1 WHERE id = ?",
+                (event_id,),
+            )
+        elif kind == "main":
+            if repeat_yearly:
+                # Для ДР: переносимо на наступний рік (в UTC)
+                cur.execute(
+                    "SELECT event_datetime FROM events WHERE id = ?",
+                    (event_id,),
+                )
+                row = cur.fetchone()
+                if row:
+                    dt = from_epoch(row["event_datetime"])
+                    # 29.02 → 28.02 у невисокосний рік (replace кинув би ValueError)
+                    new_dt = next_yearly(dt, dt)
+                    cur.execute(
+                        """
+                        UPDATE events
+                        SET event_datetime = ?,
+                            notified_30d = 0,
+                            notified_7d = 0,
+                            notified_1d = 0,
+                            notified_before = 0,
+                            notified_main = 0
+                        WHERE id = ?
+                        """,
+                        (to_epoch(new_dt), event_id),
+                    )
+            else:
+                cur.execute(
+                    "UPDATE events SET notified_main = 1 WHERE id = ?",
+                    (event_id,),
+                )
+
+        conn.commit()
 
+    # --------------- ARCHIVE ---------------
 
-# =============== NOTIFICATIONS ==================
+    def archive_events(self, event_ids: list[int], fired_at_utc: datetime) -> int:
+        """
+        Переносить відпрацьовані події з events у events_archive пачками,
+        усе в одній транзакції. Повертає кількість перенесених подій.
+        """
+        if not event_ids:
+            return 0
+
+        conn = get_connection()
+        cur = conn.cursor()
+        fired_at = to_epoch(fired_at_utc)
+        month = fired_at_utc.year * 100 + fired_at_utc.month
+        moved = 0
+
+        for i in range(0, len(event_ids), ARCHIVE_BATCH_SIZE):
+            batch = event_ids[i:i + ARCHIVE_BATCH_SIZE]
+            marks = ",".join("?" * len(batch))
+            cur.execute(
+                f"""
+                INSERT OR IGNORE INTO events_archive (
+                    id, user_id, title, type, category,
+                    event_datetime, remind_before_minutes, created_at,
+                    fired_at, archive_month
+                )
+                SELECT
+                    id, user_id, title, type, category,
+                    event_datetime, remind_before_minutes, created_at,
+                    ?, ?
+                FROM events
+                WHERE id IN ({marks})
+                """,
+                (fired_at, month, *batch),
+            )
+            cur.execute(f"DELETE FROM events WHERE id IN ({marks})", batch)
+            moved += cur.rowcount
 
+        conn.commit()
+        return moved
 
-def get_events_to_notify(now_utc: datetime):
-    """
-    now_utc — поточний час в UTC (naive).
-    event_datetime в БД також зберігається як UTC (naive).
-    """
-    conn = get_connection()
-    cur = conn.cursor()
+    def get_user_archived_events(
+        self, user_id: int, month: int | None = None, limit: int | None = None
+    ) -> list[EventRecord]:
+        return list(self.iter_user_archived_events(user_id, month, limit))
 
-    cur.execute(
+    def iter_user_archived_events(
+        self, user_id: int, month: int | None = None, limit: int | None = None
+    ) -> Iterator[EventRecord]:
         """
-        SELECT e.*, u.tg_id, u.timezone
-        FROM events e
-        JOIN users u ON e.user_id = u.id
+        Історія користувача, найновіші спершу. month — YYYYMM, щоб читати
+        одну місячну партицію.
         """
-    )
-    rows = cur.fetchall()
-
-    result = []
-
-    for row in rows:
-        event_dt_utc = datetime.fromisoformat(row["event_datetime"])
-        event_type = row["type"]
-        repeat_yearly = bool(row["repeat_yearly"])
-
-        # Дні народження
-        if event_type == "birthday":
-            # 30 днів
-            target_30 = event_dt_utc - timedelta(days=30)
-            if (
-                row["notified_30d"] == 0
-                and 0 <= (now_utc - target_30).total_seconds() < 60
-            ):
-                result.append({"row": row, "kind": "30d"})
-                continue
-
-            # 7 днів
-            target_7 = event_dt_utc - timedelta(days=7)
-            if (
-                row["notified_7d"] == 0
-                and 0 <= (now_utc - target_7).total_seconds() < 60
-            ):
-                result.append({"row": row, "kind": "7d"})
-                continue
-
-            # 1 день
-            target_1 = event_dt_utc - timedelta(days=1)
-            if (
-                row["notified_1d"] == 0
-                and 0 <= (now_utc - target_1).total_seconds() < 60
-            ):
-                result.append({"row": row, "kind": "1d"})
-                continue
-
-            # Основний день
-            if (
-                row["notified_main"] == 0
-                and 0 <= (now_utc - event_dt_utc).total_seconds() < 60
-            ):
-                result.append({"row": row, "kind": "main"})
-                continue
-
-        # Звичайні події
+        conn = get_connection()
+        cur = conn.cursor()
+
+        if month is None:
+            sql = """
+                SELECT * FROM events_archive
+                WHERE user_id = ?
+                ORDER BY event_datetime DESC
+            """
+            params = [user_id]
         else:
-            before_min = row["remind_before_minutes"] or 0
+            sql = """
+                SELECT * FROM events_archive
+                WHERE archive_month = ? AND user_id = ?
+                ORDER BY event_datetime DESC
+            """
+            params = [month, user_id]
+
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
 
-            if before_min > 0:
-                before_dt_utc = event_dt_utc - timedelta(minutes=before_min)
-                if (
-                    row["notified_before"] == 0
-                    and 0 <= (now_utc - before_dt_utc).total_seconds() < 60
-                ):
-                    result.append({"row": row, "kind": "before"})
-                    continue
+        cur.execute(sql, params)
+        yield from iter_records(cur)
 
-            if (
-                row["notified_main"] == 0
-                and 0 <= (now_utc - event_dt_utc).total_seconds() < 60
-            ):
-                result.append({"row": row, "kind": "main"})
-                continue
+    # --------------- DELIVERY LOG ---------------
 
-    return result
+    def record_deliveries(self, records: list[tuple]) -> None:
+        """
+        records: (event_id, user_id, kind, scheduled_at, dequeued_at, acked_at),
+        час — мілісекунди epoch. Одна транзакція на тік.
+        """
+        if not records:
+            return
+        conn = get_connection()
+        conn.executemany(
+            """
+            INSERT INTO delivery_log (
+                event_id, user_id, kind, scheduled_at, dequeued_at, acked_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            records,
+        )
+        conn.commit()
 
+    def get_delivery_records(self, since_utc: datetime):
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT event_id, user_id, kind, scheduled_at, dequeued_at, acked_at
+            FROM delivery_log
+            WHERE acked_at >= ?
+            ORDER BY acked_at
+            """,
+            (to_epoch(since_utc) * 1000,),
+        )
+        return cur.fetchall()
 
-def mark_notified(event_id: int, kind: str, repeat_yearly: bool) -> None:
-    conn = get_connection()
-    cur = conn.cursor()
+    # --------------- SNOOZE ---------------
 
-    if kind == "30d":
+    def snooze_event(self, user_id: int, event_id: int, fire_at_utc: datetime) -> dict | None:
+        """
+        Відкладає нагадування про подію користувача до fire_at_utc.
+        Ідемпотентно: повторне відкладення тієї ж події оновлює час.
+        Повертає запис для планувальника (з bot_id, tg_id, timezone і locale) або None,
+        якщо такої події в користувача немає ні в events, ні в архіві.
+        """
+        conn = get_connection()
+        cur = conn.cursor()
         cur.execute(
-            "UPDATE events SET notified_30d = 1 WHERE id = ?",
-            (event_id,),
+            """
+            INSERT INTO snoozes (user_id, event_id, title, event_datetime, fire_at, created_at)
+            SELECT user_id, id, title, event_datetime, :fire_at, :now
+            FROM (
+                SELECT user_id, id, title, event_datetime FROM events
+                WHERE id = :event_id AND user_id = :user_id
+                UNION ALL
+                SELECT user_id, id, title, event_datetime FROM events_archive
+                WHERE id = :event_id AND user_id = :user_id
+            )
+            WHERE true
+            LIMIT 1
+            ON CONFLICT (user_id, event_id) DO UPDATE SET fire_at = excluded.fire_at
+            """,
+            {
+                "user_id": user_id,
+                "event_id": event_id,
+                "fire_at": to_epoch(fire_at_utc),
+                "now": to_epoch(utcnow()),
+            },
         )
-    elif kind == "7d":
+        conn.commit()
+        if cur.rowcount == 0:
+            return None
+
         cur.execute(
-            "UPDATE events SET notified_7d = 1 WHERE id = ?",
-            (event_id,),
+            """
+            SELECT s.*, u.bot_id, u.tg_id, u.timezone, u.locale
+            FROM snoozes s
+            JOIN users u ON s.user_id = u.id
+            WHERE s.user_id = ? AND s.event_id = ?
+            """,
+            (user_id, event_id),
         )
-    elif kind == "1d":
+        row = cur.fetchone()
+        return dict(row) if row else None
+
+    def get_snoozes(self) -> list[dict]:
+        """Усі відкладення активних користувачів — для старту планувальника."""
+        conn = get_connection()
+        cur = conn.cursor()
         cur.execute(
-            "UPDATE events SET notified_1d = 1 WHERE id = ?",
-            (event_id,),
+            """
+            SELECT s.*, u.bot_id, u.tg_id, u.timezone, u.locale
+            FROM snoozes s
+            JOIN users u ON s.user_id = u.id
+            WHERE u.active = 1
+            ORDER BY s.fire_at
+            """
         )
-    elif kind == "before":
+        return [dict(row) for row in cur.fetchall()]
+
+    def delete_snooze(self, user_id: int, event_id: int, fire_at_utc: datetime) -> bool:
+        """
+        Прибирає надіслане відкладення. Лише якщо fire_at не змінився —
+        повторне відкладення, зроблене поки йшла відправка, лишається.
+        """
+        conn = get_connection()
+        cur = conn.cursor()
         cur.execute(
-            "UPDATE events SET notified_before = 1 WHERE id = ?",
-            (event_id,),
+            "DELETE FROM snoozes WHERE user_id = ? AND event_id = ? AND fire_at = ?",
+            (user_id, event_id, to_epoch(fire_at_utc)),
         )
-    elif kind == "main":
-        if repeat_yearly:
-            # Для ДР: переносимо на наступний рік (в UTC)
-            cur.execute(
-                "SELECT event_datetime FROM events WHERE id = ?",
-                (event_id,),
-            )
-            row = cur.fetchone()
-            if row:
-                dt = datetime.fromisoformat(row["event_datetime"])
-                new_dt = dt.replace(year=dt.year + 1)
-                cur.execute(
-                    """
-                    UPDATE events
-                    SET event_datetime = ?,
-                        notified_30d = 0,
-                        notified_7d = 0,
-                        notified_1d = 0,
-                        notified_before = 0,
-                        notified_main = 0
-                    WHERE id = ?
-                    """,
-                    (new_dt.isoformat(), event_id),
+        conn.commit()
+        return cur.rowcount > 0
+
+    # --------------- MAINTENANCE ---------------
+
+    def run_maintenance(self, budget_seconds: float) -> dict:
+        """
+        Один прохід обслуговування: ANALYZE (з analysis_limit, щоб не читати
+        великі індекси повністю), incremental_vacuum короткими транзакціями
+        по MAINTENANCE_VACUUM_STEP_PAGES сторінок і пасивний WAL checkpoint.
+
+        Працює з поточним шардом (use_shard).
+        Короткий busy_timeout: якщо БД зайнята обробниками чи планувальником,
+        крок пропускається, а не чекає. Після budget_seconds нові кроки
+        не починаються. Підсумок пишеться в maintenance_log і повертається.
+        """
+        started = time.monotonic()
+        started_at = to_epoch(utcnow())
+        deadline = started + budget_seconds
+
+        conn = get_connection()
+        conn.isolation_level = None
+        conn.execute(f"PRAGMA busy_timeout = {MAINTENANCE_BUSY_TIMEOUT_MS}")
+
+        # Старі записи delivery_log — до vacuum, щоб звільнене місце
+        # повернулося в тому ж проході
+        cutoff = to_epoch(utcnow() - timedelta(days=DELIVERY_LOG_RETENTION_DAYS)) * 1000
+        try:
+            conn.execute("DELETE FROM delivery_log WHERE acked_at < ?", (cutoff,))
+        except sqlite3.OperationalError:
+            pass
+
+        analyzed = 0
+        try:
+            conn.execute(f"PRAGMA analysis_limit = {MAINTENANCE_ANALYSIS_LIMIT}")
+            conn.execute("ANALYZE")
+            analyzed = 1
+        except sqlite3.OperationalError:
+            pass
+
+        pages_vacuumed = 0
+        while time.monotonic() < deadline:
+            free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if free_before == 0:
+                break
+            try:
+                # executescript, бо execute робить лише один крок PRAGMA
+                conn.executescript(
+                    f"PRAGMA incremental_vacuum({MAINTENANCE_VACUUM_STEP_PAGES})"
                 )
-        else:
-            cur.execute(
-                "UPDATE events SET notified_main = 1 WHERE id = ?",
-                (event_id,),
+            except sqlite3.OperationalError:
+                break
+            pages_vacuumed += free_before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+        wal_frames = 0
+        wal_checkpointed = 0
+        if time.monotonic() < deadline:
+            try:
+                _, wal_frames, wal_checkpointed = conn.execute(
+                    "PRAGMA wal_checkpoint(PASSIVE)"
+                ).fetchone()
+            except sqlite3.OperationalError:
+                pass
+
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        stats = {
+            "started_at": started_at,
+            "duration_ms": int((time.monotonic() - started) * 1000),
+            "file_size": _file_size(shard_paths()[current_shard()]),
+            "page_count": page_count,
+            "freelist_count": freelist_count,
+            "free_ratio": freelist_count / page_count if page_count else 0.0,
+            "pages_vacuumed": pages_vacuumed,
+            "wal_frames": max(wal_frames, 0),
+            "wal_checkpointed": max(wal_checkpointed, 0),
+            "analyzed": analyzed,
+        }
+
+        conn.execute(
+            """
+            INSERT INTO maintenance_log (
+                started_at, duration_ms, file_size, page_count, freelist_count,
+                free_ratio, pages_vacuumed, wal_frames, wal_checkpointed, analyzed
             )
-
+            VALUES (
+                :started_at, :duration_ms, :file_size, :page_count, :freelist_count,
+                :free_ratio, :pages_vacuumed, :wal_frames, :wal_checkpointed, :analyzed
+            )
+            """,
+            stats,
+        )
+        conn.close()
+        return stats
+
+
+# =============== ВИБІР БЕКЕНДУ ==================
+
+
+def create_storage(backend: str = DB_BACKEND) -> Storage:
+    if backend == "sqlite":
+        return SQLiteStorage()
+    if backend == "postgres":
+        # asyncpg потрібен лише для цього бекенду
+        from db_postgres import PostgresStorage
+        return PostgresStorage(DATABASE_URL, PG_POOL_MIN_SIZE, PG_POOL_MAX_SIZE)
+    raise ValueError(f"Невідомий DB_BACKEND: {backend}")
+
+
+storage = create_storage()
+
+# Публічний API модуля — методи активного сховища
+init_db = storage.init_db
+get_or_create_user = storage.get_or_create_user
+get_user_timezone = storage.get_user_timezone
+set_user_timezone = storage.set_user_timezone
+get_user_locale = storage.get_user_locale
+set_user_locale = storage.set_user_locale
+deactivate_user = storage.deactivate_user
+reactivate_user = storage.reactivate_user
+add_event = storage.add_event
+get_user_events = storage.get_user_events
+iter_user_events = storage.iter_user_events
+iter_events = storage.iter_events
+get_user_events_by_category = storage.get_user_events_by_category
+get_user_birthdays = storage.get_user_birthdays
+get_user_birthdays_by_category = storage.get_user_birthdays_by_category
+get_event_by_id = storage.get_event_by_id
+search_user_events = storage.search_user_events
+delete_event = storage.delete_event
+delete_event_by_id = storage.delete_event_by_id
+update_event_title = storage.update_event_title
+update_event_datetime_and_reset = storage.update_event_datetime_and_reset
+update_event_remind_before = storage.update_event_remind_before
+delete_events = storage.delete_events
+delete_events_in_category = storage.delete_events_in_category
+move_events_category = storage.move_events_category
+shift_events = storage.shift_events
+get_events_to_notify = storage.get_events_to_notify
+get_next_fire_at = storage.get_next_fire_at
+mark_notified = storage.mark_notified
+archive_events = storage.archive_events
+get_user_archived_events = storage.get_user_archived_events
+iter_user_archived_events = storage.iter_user_archived_events
+record_deliveries = storage.record_deliveries
+get_delivery_records = storage.get_delivery_records
+snooze_event = storage.snooze_event
+get_snoozes = storage.get_snoozes
+delete_snooze = storage.delete_snooze
+run_maintenance = storage.run_maintenance
+
+
+# =============== БЕНЧМАРК ==================
+#
+# Повний прохід по events трьома способами: fetchall() у sqlite3.Row (як
+# читалось раніше), список EventRecord і потік EventRecord пачками.
+# Пікова пам'ять — tracemalloc, час — окремим прогоном без нього.
+#
+#     python db.py bench [--rows 200000] [--batch 500]
+
+_BENCH_TITLES = ("Зустріч з командою", "ДР мами", "Стоматолог", "Оплатити інтернет")
+
+
+def _bench_db(path: str, rows: int) -> None:
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    _create_events_table(cur)
+    start = to_epoch(datetime(2025, 1, 1))
+    cur.executemany(
+        """
+        INSERT INTO events (
+            user_id, title, type, category, event_datetime,
+            remind_before_minutes, repeat_yearly, created_at
+        )
+        VALUES (?, ?, ?, 'other', ?, 15, 0, ?)
+        """,
+        (
+            (i % 1000, _BENCH_TITLES[i % len(_BENCH_TITLES)], "meeting", start + i * 60, start)
+            for i in range(rows)
+        ),
+    )
     conn.commit()
+    conn.close()
+
+
+def bench(rows: int, batch_size: int) -> None:
+    tmp_dir = tempfile.mkdtemp(prefix="db-bench-")
+    path = os.path.join(tmp_dir, "bench.db")
+    try:
+        _bench_db(path, rows)
+        conn = sqlite3.connect(path)
+        sql = "SELECT * FROM events ORDER BY id"
+
+        def scan_rows():
+            conn.row_factory = sqlite3.Row
+            latest = None
+            for row in conn.execute(sql).fetchall():
+                latest = max(latest or _EPOCH, from_epoch(row["event_datetime"]))
+            return latest
+
+        def scan_record_list():
+            latest = None
+            for row in list(iter_records(conn.execute(sql), batch_size)):
+                latest = max(latest or _EPOCH, row.event_dt)
+            return latest
+
+        def scan_records():
+            latest = None
+            for row in iter_records(conn.execute(sql), batch_size):
+                latest = max(latest or _EPOCH, row.event_dt)
+            return latest
+
+        print(f"Повний прохід по {rows} подіях, пачка {batch_size}:")
+        print(f"{'':<28}{'час, с':>9}{'пік, МБ':>10}")
+        for label, scan in (
+            ("sqlite3.Row, fetchall", scan_rows),
+            ("EventRecord, список", scan_record_list),
+            ("EventRecord, потік", scan_records),
+        ):
+            started = time.perf_counter()
+            scan()
+            elapsed = time.perf_counter() - started
+            tracemalloc.start()
+            scan()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{label:<28}{elapsed:>9.2f}{peak / 2**20:>10.1f}")
+        conn.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Сховище подій")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_bench = sub.add_parser("bench", help="пам'ять і час повного проходу по подіях")
+    p_bench.add_argument("--rows", type=int, default=200_000)
+    p_bench.add_argument("--batch", type=int, default=READ_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(args.rows, args.batch)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,835 @@
+"""
+PostgreSQL-реалізація Storage на asyncpg (DB_BACKEND=postgres).
+
+Бот звертається до db синхронно, тож пул asyncpg живе у власному
+event loop в окремому потоці: кожен метод віддає корутину в цей loop
+і чекає результат — так само, як виклик SQLite блокує потік на час запиту.
+
+Схема та сама, що й у SQLite (час — секунди epoch), плюс:
+  * title_tsv + GIN-індекс замість FTS5;
+  * claimed_until — оренда рядка планувальником: кілька воркерів
+    забирають нагадування через FOR UPDATE SKIP LOCKED і не дублюють їх.
+"""
+import asyncio
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import asyncpg
+
+from clock import utcnow
+from config import DELIVERY_LOG_RETENTION_DAYS
+from db import (
+    DEFAULT_BOT_ID,
+    READ_BATCH_SIZE,
+    EventRecord,
+    Reminder,
+    Storage,
+    current_bot,
+    due_reminder,
+    due_window,
+    from_epoch,
+    next_yearly,
+    search_words,
+    shift_local_days,
+    to_epoch,
+)
+
+# Оренда нагадування воркером; менша за інтервал тіку, щоб ранні нагадування
+# з вікна злиття, які воркер не надіслав, потрапили в наступний тік.
+CLAIM_SECONDS = 50
+
+EVENT_COLUMNS = """
+    e.id, e.user_id, e.title, e.type, e.category, e.event_datetime,
+    e.remind_before_minutes, e.repeat_yearly,
+    e.notified_30d, e.notified_7d, e.notified_1d,
+    e.notified_before, e.notified_main, e.created_at
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id BIGSERIAL PRIMARY KEY,
+    bot_id BIGINT NOT NULL DEFAULT 0,
+    tg_id BIGINT NOT NULL,
+    username TEXT,
+    timezone TEXT,
+    locale TEXT,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    deactivated_at BIGINT
+);
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS active BOOLEAN NOT NULL DEFAULT TRUE;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS deactivated_at BIGINT;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS locale TEXT;
+-- Простір імен бота: UNIQUE(tg_id) → UNIQUE(bot_id, tg_id); bot_id = 0
+-- (рядки до міграції) init_db віддає DEFAULT_BOT_ID
+ALTER TABLE users ADD COLUMN IF NOT EXISTS bot_id BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE users DROP CONSTRAINT IF EXISTS users_tg_id_key;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_bot_tg
+    ON users (bot_id, tg_id);
+
+CREATE TABLE IF NOT EXISTS events (
+    id BIGSERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users(id),
+    title TEXT NOT NULL,
+    type TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT 'other',
+    event_datetime BIGINT NOT NULL,
+    remind_before_minutes INTEGER DEFAULT 0,
+    repeat_yearly INTEGER DEFAULT 0,
+    notified_30d INTEGER DEFAULT 0,
+    notified_7d INTEGER DEFAULT 0,
+    notified_1d INTEGER DEFAULT 0,
+    notified_before INTEGER DEFAULT 0,
+    notified_main INTEGER DEFAULT 0,
+    created_at BIGINT NOT NULL,
+    claimed_until BIGINT NOT NULL DEFAULT 0,
+    title_tsv tsvector GENERATED ALWAYS AS (to_tsvector('simple', title)) STORED
+);
+
+CREATE INDEX IF NOT EXISTS idx_events_user_dt
+    ON events (user_id, event_datetime);
+CREATE INDEX IF NOT EXISTS idx_events_user_type_cat_dt
+    ON events (user_id, type, category, event_datetime);
+CREATE INDEX IF NOT EXISTS idx_events_dt
+    ON events (event_datetime);
+CREATE INDEX IF NOT EXISTS idx_events_before_dt
+    ON events ((event_datetime - remind_before_minutes * 60))
+    WHERE remind_before_minutes > 0;
+CREATE INDEX IF NOT EXISTS idx_events_title_tsv
+    ON events USING GIN (title_tsv);
+
+CREATE TABLE IF NOT EXISTS events_archive (
+    id BIGINT PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    title TEXT NOT NULL,
+    type TEXT NOT NULL,
+    category TEXT NOT NULL,
+    event_datetime BIGINT NOT NULL,
+    remind_before_minutes INTEGER DEFAULT 0,
+    created_at BIGINT NOT NULL,
+    fired_at BIGINT NOT NULL,
+    archive_month INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_archive_month_user
+    ON events_archive (archive_month, user_id);
+CREATE INDEX IF NOT EXISTS idx_archive_user_dt
+    ON events_archive (user_id, event_datetime);
+
+CREATE TABLE IF NOT EXISTS delivery_log (
+    id BIGSERIAL PRIMARY KEY,
+    event_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    kind TEXT NOT NULL,
+    scheduled_at BIGINT NOT NULL,
+    dequeued_at BIGINT NOT NULL,
+    acked_at BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_delivery_log_acked
+    ON delivery_log (acked_at);
+
+CREATE TABLE IF NOT EXISTS snoozes (
+    id BIGSERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    event_id BIGINT NOT NULL,
+    title TEXT NOT NULL,
+    event_datetime BIGINT NOT NULL,
+    fire_at BIGINT NOT NULL,
+    created_at BIGINT NOT NULL,
+    UNIQUE (user_id, event_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_snoozes_fire
+    ON snoozes (fire_at);
+
+CREATE TABLE IF NOT EXISTS maintenance_log (
+    id BIGSERIAL PRIMARY KEY,
+    started_at BIGINT NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    file_size BIGINT NOT NULL,
+    page_count BIGINT NOT NULL,
+    freelist_count BIGINT NOT NULL,
+    free_ratio DOUBLE PRECISION NOT NULL,
+    pages_vacuumed BIGINT NOT NULL,
+    wal_frames BIGINT NOT NULL,
+    wal_checkpointed BIGINT NOT NULL,
+    analyzed INTEGER NOT NULL
+);
+"""
+
+NOTIFIED_RESET = """
+    notified_30d = 0,
+    notified_7d = 0,
+    notified_1d = 0,
+    notified_before = 0,
+    notified_main = 0
+"""
+
+
+def _affected(status: str) -> int:
+    # asyncpg повертає статус команди, напр. "DELETE 1"
+    return int(status.rsplit(" ", 1)[-1])
+
+
+class PostgresStorage(Storage):
+    def __init__(self, dsn: str, min_size: int, max_size: int):
+        self._dsn = dsn
+        self._min_size = min_size
+        self._max_size = max_size
+        self._pool: asyncpg.Pool | None = None
+        self._pool_lock = threading.Lock()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="pg-storage", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _get_pool(self) -> asyncpg.Pool:
+        async def create():
+            return await asyncpg.create_pool(
+                self._dsn, min_size=self._min_size, max_size=self._max_size
+            )
+
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = self._run(create())
+        return self._pool
+
+    def _fetch(self, sql: str, *args):
+        return self._run(self._get_pool().fetch(sql, *args))
+
+    def _fetchrow(self, sql: str, *args):
+        return self._run(self._get_pool().fetchrow(sql, *args))
+
+    def _fetchval(self, sql: str, *args):
+        return self._run(self._get_pool().fetchval(sql, *args))
+
+    def _execute(self, sql: str, *args) -> str:
+        return self._run(self._get_pool().execute(sql, *args))
+
+    def _fetch_records(self, sql: str, *args) -> list[EventRecord]:
+        return [EventRecord.from_mapping(row) for row in self._fetch(sql, *args)]
+
+    def _iter_records(self, sql: str, args: tuple, key: tuple[str, ...], limit: int | None = None) -> Iterator[EventRecord]:
+        """
+        Читання пачками READ_BATCH_SIZE з keyset-пагінацією: курсор asyncpg
+        живе лише в транзакції свого loop'а, тож генератор у потоці бота
+        просить кожну пачку окремим запитом. Параметри sql — args, далі
+        значення key останнього прочитаного рядка (NULL на першій пачці)
+        і розмір пачки.
+        """
+        last = (None,) * len(key)
+        while limit is None or limit > 0:
+            batch = READ_BATCH_SIZE if limit is None else min(READ_BATCH_SIZE, limit)
+            rows = self._fetch(sql, *args, *last, batch)
+            for row in rows:
+                yield EventRecord.from_mapping(row)
+            if len(rows) < batch:
+                return
+            last = tuple(rows[-1][name] for name in key)
+            if limit is not None:
+                limit -= len(rows)
+
+    def _transaction(self, fn):
+        """
+        fn(conn) — корутина, що виконується в одній транзакції.
+        """
+        # Пул — до входу в loop: _get_pool створює його через _run,
+        # і виклик зсередини loop'а чекав би сам на себе
+        pool = self._get_pool()
+
+        async def run():
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    return await fn(conn)
+
+        return self._run(run())
+
+    def init_db(self) -> None:
+        self._execute(SCHEMA)
+        self._execute("UPDATE users SET bot_id = $1 WHERE bot_id = 0", DEFAULT_BOT_ID)
+
+    # --------------- USERS ---------------
+
+    def get_or_create_user(self, tg_id: int, username: str | None) -> int:
+        bot_id = current_bot()
+        user_id = self._fetchval("SELECT id FROM users WHERE bot_id = $1 AND tg_id = $2", bot_id, tg_id)
+        if user_id is not None:
+            return user_id
+        return self._fetchval(
+            """
+            INSERT INTO users (bot_id, tg_id, username) VALUES ($1, $2, $3)
+            ON CONFLICT (bot_id, tg_id) DO UPDATE SET tg_id = EXCLUDED.tg_id
+            RETURNING id
+            """,
+            bot_id,
+            tg_id,
+            username,
+        )
+
+    def get_user_timezone(self, user_id: int) -> str | None:
+        return self._fetchval("SELECT timezone FROM users WHERE id = $1", user_id)
+
+    def set_user_timezone(self, user_id: int, tz: str) -> None:
+        self._execute("UPDATE users SET timezone = $1 WHERE id = $2", tz, user_id)
+
+    def get_user_locale(self, user_id: int) -> str | None:
+        return self._fetchval("SELECT locale FROM users WHERE id = $1", user_id)
+
+    def set_user_locale(self, user_id: int, locale: str) -> None:
+        self._execute("UPDATE users SET locale = $1 WHERE id = $2", locale, user_id)
+
+    def deactivate_user(self, tg_id: int) -> int:
+        return self._fetchval(
+            """
+            WITH u AS (
+                UPDATE users SET active = FALSE, deactivated_at = $2
+                WHERE bot_id = $3 AND tg_id = $1 AND active
+                RETURNING id
+            )
+            SELECT COUNT(e.id) FROM u JOIN events e ON e.user_id = u.id
+            """,
+            tg_id,
+            to_epoch(utcnow()),
+            current_bot(),
+        )
+
+    def reactivate_user(self, user_id: int) -> bool:
+        now_utc = utcnow()
+
+        async def reactivate(conn):
+            status = await conn.execute(
+                "UPDATE users SET active = TRUE, deactivated_at = NULL WHERE id = $1 AND NOT active",
+                user_id,
+            )
+            if _affected(status) == 0:
+                return False
+            rows = await conn.fetch(
+                """
+                SELECT id, event_datetime FROM events
+                WHERE user_id = $1 AND repeat_yearly = 1 AND event_datetime < $2
+                FOR UPDATE
+                """,
+                user_id,
+                to_epoch(now_utc),
+            )
+            for row in rows:
+                new_dt = next_yearly(from_epoch(row["event_datetime"]), now_utc)
+                await conn.execute(
+                    f"UPDATE events SET event_datetime = $1, {NOTIFIED_RESET} WHERE id = $2",
+                    to_epoch(new_dt),
+                    row["id"],
+                )
+            return True
+
+        return self._transaction(reactivate)
+
+    # --------------- EVENTS CRUD ---------------
+
+    def add_event(
+        self,
+        user_id: int,
+        title: str,
+        type_: str,
+        category: str | None,
+        event_dt_utc: datetime,
+        remind_before_minutes: int = 0,
+        repeat_yearly: bool = False,
+    ) -> int:
+        return self._fetchval(
+            """
+            INSERT INTO events (
+                user_id, title, type, category,
+                event_datetime, remind_before_minutes,
+                repeat_yearly, created_at
+            )
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            RETURNING id
+            """,
+            user_id,
+            title,
+            type_,
+            category or "other",
+            to_epoch(event_dt_utc),
+            remind_before_minutes,
+            1 if repeat_yearly else 0,
+            to_epoch(utcnow()),
+        )
+
+    def get_user_events(self, user_id: int) -> list[EventRecord]:
+        return list(self.iter_user_events(user_id))
+
+    def iter_user_events(self, user_id: int) -> Iterator[EventRecord]:
+        return self._iter_records(
+            f"""
+            SELECT {EVENT_COLUMNS} FROM events e
+            WHERE e.user_id = $1
+              AND ($2::bigint IS NULL OR (e.event_datetime, e.id) > ($2, $3))
+            ORDER BY e.event_datetime ASC, e.id
+            LIMIT $4
+            """,
+            (user_id,),
+            ("event_datetime", "id"),
+        )
+
+    def iter_events(self) -> Iterator[EventRecord]:
+        return self._iter_records(
+            f"""
+            SELECT {EVENT_COLUMNS}, e.claimed_until FROM events e
+            WHERE $1::bigint IS NULL OR e.id > $1
+            ORDER BY e.id
+            LIMIT $2
+            """,
+            (),
+            ("id",),
+        )
+
+    def get_user_events_by_category(self, user_id: int, category: str) -> list[EventRecord]:
+        return self._fetch_records(
+            f"""
+            SELECT {EVENT_COLUMNS} FROM events e
+            WHERE e.user_id = $1 AND e.category = $2
+            ORDER BY e.event_datetime ASC
+            """,
+            user_id,
+            category,
+        )
+
+    def get_user_birthdays(self, user_id: int) -> list[EventRecord]:
+        return self._fetch_records(
+            f"""
+            SELECT {EVENT_COLUMNS} FROM events e
+            WHERE e.user_id = $1 AND e.type = 'birthday'
+            ORDER BY e.event_datetime ASC
+            """,
+            user_id,
+        )
+
+    def get_user_birthdays_by_category(self, user_id: int, category: str) -> list[EventRecord]:
+        return self._fetch_records(
+            f"""
+            SELECT {EVENT_COLUMNS} FROM events e
+            WHERE e.user_id = $1 AND e.type = 'birthday' AND e.category = $2
+            ORDER BY e.event_datetime ASC
+            """,
+            user_id,
+            category,
+        )
+
+    def get_event_by_id(self, user_id: int, event_id: int) -> EventRecord | None:
+        row = self._fetchrow(
+            f"SELECT {EVENT_COLUMNS} FROM events e WHERE e.id = $1 AND e.user_id = $2",
+            event_id,
+            user_id,
+        )
+        return None if row is None else EventRecord.from_mapping(row)
+
+    def search_user_events(self, user_id: int, text: str, limit: int = 10, offset: int = 0):
+        words = search_words(text)
+        if not words:
+            return [], False
+
+        query = " & ".join(f"{w}:*" for w in words)
+        rows = self._fetch_records(
+            f"""
+            SELECT {EVENT_COLUMNS}
+            FROM events e, to_tsquery('simple', $2) q
+            WHERE e.user_id = $1 AND e.title_tsv @@ q
+            ORDER BY ts_rank(e.title_tsv, q) DESC, e.event_datetime
+            LIMIT $3 OFFSET $4
+            """,
+            user_id,
+            query,
+            limit + 1,
+            offset,
+        )
+        return rows[:limit], len(rows) > limit
+
+    def delete_event(self, user_id: int, event_id: int) -> bool:
+        status = self._execute(
+            "DELETE FROM events WHERE id = $1 AND user_id = $2", event_id, user_id
+        )
+        return _affected(status) > 0
+
+    def delete_event_by_id(self, event_id: int) -> None:
+        self._execute("DELETE FROM events WHERE id = $1", event_id)
+
+    def update_event_title(self, event_id: int, new_title: str) -> None:
+        self._execute("UPDATE events SET title = $1 WHERE id = $2", new_title, event_id)
+
+    def update_event_datetime_and_reset(
+        self, event_id: int, new_dt_utc: datetime, is_birthday: bool
+    ) -> None:
+        repeat = ", repeat_yearly = 1" if is_birthday else ""
+        self._execute(
+            f"""
+            UPDATE events
+            SET event_datetime = $1, {NOTIFIED_RESET} {repeat}
+            WHERE id = $2
+            """,
+            to_epoch(new_dt_utc),
+            event_id,
+        )
+
+    def update_event_remind_before(self, event_id: int, minutes: int) -> None:
+        self._execute(
+            "UPDATE events SET remind_before_minutes = $1 WHERE id = $2", minutes, event_id
+        )
+
+    # --------------- BULK ---------------
+
+    def delete_events(self, user_id: int, event_ids: list[int]) -> int:
+        if not event_ids:
+            return 0
+        status = self._execute(
+            "DELETE FROM events WHERE user_id = $1 AND id = ANY($2::bigint[])",
+            user_id,
+            event_ids,
+        )
+        return _affected(status)
+
+    def delete_events_in_category(self, user_id: int, category: str) -> int:
+        status = self._execute(
+            "DELETE FROM events WHERE user_id = $1 AND category = $2", user_id, category
+        )
+        return _affected(status)
+
+    def move_events_category(self, user_id: int, from_category: str, to_category: str) -> int:
+        status = self._execute(
+            "UPDATE events SET category = $1 WHERE user_id = $2 AND category = $3",
+            to_category,
+            user_id,
+            from_category,
+        )
+        return _affected(status)
+
+    def shift_events(self, user_id: int, days: int, tz: ZoneInfo) -> int:
+        async def shift(conn):
+            rows = await conn.fetch(
+                "SELECT id, event_datetime FROM events WHERE user_id = $1 FOR UPDATE",
+                user_id,
+            )
+            await conn.executemany(
+                f"UPDATE events SET event_datetime = $1, {NOTIFIED_RESET} WHERE id = $2",
+                [(shift_local_days(row["event_datetime"], days, tz), row["id"]) for row in rows],
+            )
+            return len(rows)
+
+        return self._transaction(shift)
+
+    # --------------- NOTIFICATIONS ---------------
+
+    def get_events_to_notify(
+        self, now_utc: datetime, lookahead_seconds: int = 0, since_utc: datetime | None = None
+    ) -> list[Reminder]:
+        """
+        Забирає кандидатів у тік через FOR UPDATE SKIP LOCKED і ставить їм
+        оренду claimed_until: паралельні воркери отримують різні рядки.
+        Остаточне рішення про тип нагадування — due_reminder, як і в SQLite.
+        """
+        now = to_epoch(now_utc)
+        lo, hi = due_window(now_utc, lookahead_seconds, since_utc)
+        rows = self._fetch(
+            f"""
+            WITH due AS (
+                SELECT e.id
+                FROM events e
+                JOIN users u ON u.id = e.user_id
+                WHERE e.claimed_until <= $1
+                  AND u.active
+                  AND (
+                    (e.type = 'birthday' AND (
+                        (e.notified_30d = 0 AND e.event_datetime BETWEEN $2 + 2592000 AND $3 + 2592000)
+                     OR (e.notified_7d = 0 AND e.event_datetime BETWEEN $2 + 604800 AND $3 + 604800)
+                     OR (e.notified_1d = 0 AND e.event_datetime BETWEEN $2 + 86400 AND $3 + 86400)
+                     OR (e.notified_main = 0 AND e.event_datetime BETWEEN $2 AND $3)
+                    ))
+                    OR (e.type <> 'birthday' AND (
+                        (e.remind_before_minutes > 0 AND e.notified_before = 0
+                         AND e.event_datetime - e.remind_before_minutes * 60 BETWEEN $2 AND $3)
+                     OR (e.notified_main = 0 AND e.event_datetime BETWEEN $2 AND $3)
+                    ))
+                  )
+                FOR UPDATE OF e SKIP LOCKED
+            )
+            UPDATE events e
+            SET claimed_until = $1 + {CLAIM_SECONDS}
+            FROM due, users u
+            WHERE e.id = due.id AND u.id = e.user_id
+            RETURNING {EVENT_COLUMNS}, u.bot_id, u.tg_id, u.timezone, u.locale
+            """,
+            now,
+            lo,
+            hi,
+        )
+
+        result = []
+        for row in rows:
+            item = due_reminder(EventRecord.from_mapping(row), now_utc, lookahead_seconds, since_utc)
+            if item is not None:
+                result.append(item)
+        return result
+
+    def get_next_fire_at(self, after_utc: datetime) -> datetime | None:
+        """Нижня межа найближчого fire_at — як у SQLiteStorage."""
+        ts = self._fetchval(
+            """
+            SELECT MIN(fire_at) FROM (
+                SELECT MIN(event_datetime) AS fire_at FROM events
+                WHERE event_datetime > $1
+                UNION ALL
+                SELECT MIN(event_datetime) - 86400 FROM events
+                WHERE event_datetime > $1 + 86400
+                UNION ALL
+                SELECT MIN(event_datetime) - 604800 FROM events
+                WHERE event_datetime > $1 + 604800
+                UNION ALL
+                SELECT MIN(event_datetime) - 2592000 FROM events
+                WHERE event_datetime > $1 + 2592000
+                UNION ALL
+                SELECT MIN(event_datetime - remind_before_minutes * 60) FROM events
+                WHERE remind_before_minutes > 0
+                  AND event_datetime - remind_before_minutes * 60 > $1
+            ) t
+            """,
+            to_epoch(after_utc),
+        )
+        return None if ts is None else from_epoch(ts)
+
+    def mark_notified(self, event_id: int, kind: str, repeat_yearly: bool) -> None:
+        if kind in ("30d", "7d", "1d", "before") or (kind == "main" and not repeat_yearly):
+            column = f"notified_{kind}"
+            self._execute(
+                f"UPDATE events SET {column} = 1, claimed_until = 0 WHERE id = $1",
+                event_id,
+            )
+            return
+
+        if kind != "main":
+            return
+
+        # Для ДР: переносимо на наступний рік (в UTC)
+        async def roll_over(conn):
+            ts = await conn.fetchval(
+                "SELECT event_datetime FROM events WHERE id = $1 FOR UPDATE", event_id
+            )
+            if ts is None:
+                return
+            dt = from_epoch(ts)
+            # 29.02 → 28.02 у невисокосний рік (replace кинув би ValueError)
+            new_dt = next_yearly(dt, dt)
+            await conn.execute(
+                f"""
+                UPDATE events
+                SET event_datetime = $1, claimed_until = 0, {NOTIFIED_RESET}
+                WHERE id = $2
+                """,
+                to_epoch(new_dt),
+                event_id,
+            )
+
+        self._transaction(roll_over)
+
+    # --------------- ARCHIVE ---------------
+
+    def archive_events(self, event_ids: list[int], fired_at_utc: datetime) -> int:
+        if not event_ids:
+            return 0
+        return self._fetchval(
+            """
+            WITH moved AS (
+                DELETE FROM events WHERE id = ANY($1::bigint[])
+                RETURNING id, user_id, title, type, category,
+                          event_datetime, remind_before_minutes, created_at
+            ), archived AS (
+                INSERT INTO events_archive (
+                    id, user_id, title, type, category,
+                    event_datetime, remind_before_minutes, created_at,
+                    fired_at, archive_month
+                )
+                SELECT id, user_id, title, type, category,
+                       event_datetime, remind_before_minutes, created_at,
+                       $2, $3
+                FROM moved
+                ON CONFLICT (id) DO NOTHING
+            )
+            SELECT COUNT(*) FROM moved
+            """,
+            list(event_ids),
+            to_epoch(fired_at_utc),
+            fired_at_utc.year * 100 + fired_at_utc.month,
+        )
+
+    def get_user_archived_events(
+        self, user_id: int, month: int | None = None, limit: int | None = None
+    ) -> list[EventRecord]:
+        return list(self.iter_user_archived_events(user_id, month, limit))
+
+    def iter_user_archived_events(
+        self, user_id: int, month: int | None = None, limit: int | None = None
+    ) -> Iterator[EventRecord]:
+        if month is None:
+            return self._iter_records(
+                """
+                SELECT * FROM events_archive
+                WHERE user_id = $1
+                  AND ($2::bigint IS NULL OR (event_datetime, id) < ($2, $3))
+                ORDER BY event_datetime DESC, id DESC
+                LIMIT $4
+                """,
+                (user_id,),
+                ("event_datetime", "id"),
+                limit,
+            )
+        return self._iter_records(
+            """
+            SELECT * FROM events_archive
+            WHERE archive_month = $1 AND user_id = $2
+              AND ($3::bigint IS NULL OR (event_datetime, id) < ($3, $4))
+            ORDER BY event_datetime DESC, id DESC
+            LIMIT $5
+            """,
+            (month, user_id),
+            ("event_datetime", "id"),
+            limit,
+        )
+
+    # --------------- DELIVERY LOG ---------------
+
+    def record_deliveries(self, records: list[tuple]) -> None:
+        if not records:
+            return
+
+        async def insert(conn):
+            await conn.executemany(
+                """
+                INSERT INTO delivery_log (
+                    event_id, user_id, kind, scheduled_at, dequeued_at, acked_at
+                )
+                VALUES ($1, $2, $3, $4, $5, $6)
+                """,
+                records,
+            )
+
+        self._transaction(insert)
+
+    def get_delivery_records(self, since_utc: datetime):
+        return self._fetch(
+            """
+            SELECT event_id, user_id, kind, scheduled_at, dequeued_at, acked_at
+            FROM delivery_log
+            WHERE acked_at >= $1
+            ORDER BY acked_at
+            """,
+            to_epoch(since_utc) * 1000,
+        )
+
+    # --------------- SNOOZE ---------------
+
+    def snooze_event(self, user_id: int, event_id: int, fire_at_utc: datetime) -> dict | None:
+        row = self._fetchrow(
+            """
+            WITH source AS (
+                SELECT user_id, id, title, event_datetime FROM events
+                WHERE id = $2 AND user_id = $1
+                UNION ALL
+                SELECT user_id, id, title, event_datetime FROM events_archive
+                WHERE id = $2 AND user_id = $1
+                LIMIT 1
+            ), upsert AS (
+                INSERT INTO snoozes (user_id, event_id, title, event_datetime, fire_at, created_at)
+                SELECT user_id, id, title, event_datetime, $3::bigint, $4::bigint FROM source
+                ON CONFLICT (user_id, event_id) DO UPDATE SET fire_at = EXCLUDED.fire_at
+                RETURNING *
+            )
+            SELECT s.*, u.bot_id, u.tg_id, u.timezone, u.locale
+            FROM upsert s
+            JOIN users u ON s.user_id = u.id
+            """,
+            user_id,
+            event_id,
+            to_epoch(fire_at_utc),
+            to_epoch(utcnow()),
+        )
+        return dict(row) if row else None
+
+    def get_snoozes(self) -> list[dict]:
+        rows = self._fetch(
+            """
+            SELECT s.*, u.bot_id, u.tg_id, u.timezone, u.locale
+            FROM snoozes s
+            JOIN users u ON s.user_id = u.id
+            WHERE u.active
+            ORDER BY s.fire_at
+            """
+        )
+        return [dict(row) for row in rows]
+
+    def delete_snooze(self, user_id: int, event_id: int, fire_at_utc: datetime) -> bool:
+        status = self._execute(
+            "DELETE FROM snoozes WHERE user_id = $1 AND event_id = $2 AND fire_at = $3",
+            user_id,
+            event_id,
+            to_epoch(fire_at_utc),
+        )
+        return _affected(status) > 0
+
+    # --------------- MAINTENANCE ---------------
+
+    def run_maintenance(self, budget_seconds: float) -> dict:
+        """
+        VACUUM і checkpoint у Postgres роблять autovacuum і сам сервер;
+        тут — ANALYZE гарячих таблиць і метрики в maintenance_log.
+        """
+        started = time.monotonic()
+        started_at = to_epoch(utcnow())
+
+        cutoff = to_epoch(utcnow() - timedelta(days=DELIVERY_LOG_RETENTION_DAYS)) * 1000
+        self._execute("DELETE FROM delivery_log WHERE acked_at < $1", cutoff)
+
+        analyzed = 0
+        for table in ("events", "events_archive"):
+            if time.monotonic() - started >= budget_seconds:
+                break
+            self._execute(f"ANALYZE {table}")
+            analyzed = 1
+
+        size = self._fetchval("SELECT pg_database_size(current_database())")
+        # SUM(bigint) — numeric: без приведення asyncpg віддав би Decimal
+        dead, live = self._fetchrow(
+            """
+            SELECT COALESCE(SUM(n_dead_tup), 0)::bigint, COALESCE(SUM(n_live_tup), 0)::bigint
+            FROM pg_stat_user_tables
+            """
+        )
+        stats = {
+            "started_at": started_at,
+            "duration_ms": int((time.monotonic() - started) * 1000),
+            "file_size": size,
+            "page_count": live + dead,
+            "freelist_count": dead,
+            "free_ratio": dead / (live + dead) if live + dead else 0.0,
+            "pages_vacuumed": 0,
+            "wal_frames": 0,
+            "wal_checkpointed": 0,
+            "analyzed": analyzed,
+        }
+        self._execute(
+            """
+            INSERT INTO maintenance_log (
+                started_at, duration_ms, file_size, page_count, freelist_count,
+                free_ratio, pages_vacuumed, wal_frames, wal_checkpointed, analyzed
+            )
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+            """,
+            *stats.values(),
+        )
+        return stats
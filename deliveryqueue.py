@@ -0,0 +1,178 @@
+"""
+Пріоритети доставки нагадувань і черга відкладених.
+
+Класи (менше — важливіше):
+  0 — подія зараз, ДР сьогодні, коротке «before» (до години),
+      відкладене користувачем;
+  1 — довше «before»;
+  2 — ДР завтра (1d);
+  3 — ДР за тиждень (7d);
+  4 — ДР за місяць (30d).
+
+Тік спершу шле користувачів із найважливішими нагадуваннями. Класи
+0–1 надсилаються завжди. Класи 2–4, які не вмістились у бюджет тіку,
+потрапляють у PendingReminders і чекають наступних тіків, але не довше
+DELIVERY_DEFER_MINUTES від свого fire_at. Прострочені й ті, що не
+влізли в переповнену чергу, відкидаються: їх позначають надісланими
+без відправки.
+
+Та сама черга повторює нагадування будь-якого класу, яких не вдалося
+надіслати через тимчасову помилку Bot API: класи 0–1 — не довше
+DELIVERY_RETRY_MINUTES від fire_at.
+
+Черга живе лише в пам'яті: після рестарту відкладені нетермінові
+нагадування втрачаються (вони вже поза вікном вибірки тіку).
+
+SnoozeQueue — відкладення, які користувач зробив кнопкою під
+нагадуванням. Рядок у таблиці snoozes робить їх сталими, а сам
+планувальник бере їх з цієї купи, без запиту до БД на кожному тіку.
+Після рестарту купу наповнює load_snoozes().
+"""
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+
+from config import DELIVERY_DEFER_MINUTES, DELIVERY_PENDING_MAX, DELIVERY_RETRY_MINUTES
+from db import EventRecord, Reminder, from_epoch, get_snoozes, shard_paths, to_epoch, use_shard
+
+SHORT_BEFORE_MINUTES = 60
+_KIND_PRIORITY = {"1d": 2, "7d": 3, "30d": 4}
+# Класи від цього і нижчі за важливістю можна відкладати
+DEFERRABLE_PRIORITY = 2
+
+
+def reminder_priority(item) -> int:
+    kind = item["kind"]
+    if kind in ("main", "snooze"):
+        return 0
+    if kind == "before":
+        return 0 if (item["row"]["remind_before_minutes"] or 0) <= SHORT_BEFORE_MINUTES else 1
+    return _KIND_PRIORITY.get(kind, DEFERRABLE_PRIORITY)
+
+
+def is_deferrable(item) -> bool:
+    return reminder_priority(item) >= DEFERRABLE_PRIORITY
+
+
+def defer_deadline(item) -> datetime:
+    # Класи 0–1 потрапляють у чергу лише на повтор після помилки надсилання
+    minutes = DELIVERY_DEFER_MINUTES.get(item["kind"], DELIVERY_RETRY_MINUTES)
+    return item["fire_at"] + timedelta(minutes=minutes)
+
+
+class PendingReminders:
+    """
+    Відкладені нагадування по шардах: купа за (пріоритет, fire_at).
+    Використовується лише з event loop планувальника, без блокувань.
+    """
+
+    def __init__(self, max_size: int = DELIVERY_PENDING_MAX):
+        self.max_size = max_size
+        self._heaps: dict[int, list] = {}
+        self._size = 0
+        # Порядок вставки — щоб купа не порівнювала самі dict'и
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, shard: int, item) -> bool:
+        """False — черга повна, нагадування треба відкинути."""
+        if self._size >= self.max_size:
+            return False
+        heap = self._heaps.setdefault(shard, [])
+        heapq.heappush(heap, (reminder_priority(item), item["fire_at"], next(self._seq), item))
+        self._size += 1
+        return True
+
+    def take(self, shard: int, now_utc: datetime) -> tuple[list, list]:
+        """
+        Забирає всі відкладені шарду: (ще актуальні — у порядку
+        пріоритету, прострочені).
+        """
+        heap = self._heaps.pop(shard, None)
+        if not heap:
+            return [], []
+        self._size -= len(heap)
+        ready, expired = [], []
+        while heap:
+            item = heapq.heappop(heap)[-1]
+            (expired if defer_deadline(item) <= now_utc else ready).append(item)
+        return ready, expired
+
+
+def snooze_item(snooze: dict) -> Reminder:
+    """Рядок snoozes → нагадування у форматі due_reminder."""
+    row = EventRecord.from_mapping({
+        "id": snooze["event_id"],
+        "user_id": snooze["user_id"],
+        "bot_id": snooze["bot_id"],
+        "tg_id": snooze["tg_id"],
+        "timezone": snooze["timezone"],
+        "locale": snooze["locale"],
+        "title": snooze["title"],
+        "type": "snooze",
+        "event_datetime": snooze["event_datetime"],
+        "remind_before_minutes": 0,
+    })
+    return Reminder(row, "snooze", from_epoch(snooze["fire_at"]))
+
+
+class SnoozeQueue:
+    """
+    Купа відкладень за fire_at по шардах. Кнопки обробляються в потоках
+    UpdatePipeline, а забирає планувальник — тому під блокуванням.
+    Повторне відкладення тієї ж події лишає в купі старий запис, але
+    take_due його пропускає: чинний лише останній fire_at.
+    """
+
+    def __init__(self):
+        self._heaps: dict[int, list] = {}
+        # (шард, user_id, event_id) → чинний fire_at, секунди epoch
+        self._latest: dict[tuple, int] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._latest)
+
+    def add(self, shard: int, snooze: dict) -> None:
+        key = (shard, snooze["user_id"], snooze["event_id"])
+        with self._lock:
+            self._latest[key] = snooze["fire_at"]
+            heapq.heappush(self._heaps.setdefault(shard, []), (snooze["fire_at"], next(self._seq), snooze))
+
+    def take_due(self, shard: int, now_utc: datetime) -> list[dict]:
+        """Нагадування з відкладень шарду, час яких настав."""
+        now = to_epoch(now_utc)
+        due = []
+        with self._lock:
+            heap = self._heaps.get(shard)
+            while heap and heap[0][0] <= now:
+                fire_at, _, snooze = heapq.heappop(heap)
+                key = (shard, snooze["user_id"], snooze["event_id"])
+                if self._latest.get(key) == fire_at:
+                    del self._latest[key]
+                    due.append(snooze_item(snooze))
+        return due
+
+
+def load_snoozes(queue: SnoozeQueue) -> int:
+    """
+    Наповнює купу відкладеннями з усіх шардів. Ті, що настали, поки бот
+    не працював, прийдуть у перший тік.
+    """
+    loaded = 0
+    for shard in range(len(shard_paths())):
+        with use_shard(shard):
+            for snooze in get_snoozes():
+                queue.add(shard, snooze)
+                loaded += 1
+    return loaded
+
+
+# Процесні черги, які наповнює планувальник і кнопки відкладення
+pending_reminders = PendingReminders()
+snooze_queue = SnoozeQueue()
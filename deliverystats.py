@@ -0,0 +1,161 @@
+"""
+Облік затримки доставки нагадувань.
+
+Для кожного надісланого нагадування є три моменти: scheduled — коли
+воно мало спрацювати (fire_at), dequeued — коли планувальник узяв його
+в роботу, acked — коли Bot API підтвердив відправку. Затримка
+lag = acked - scheduled; dequeued - scheduled показує, скільки з неї
+припадає на сам планувальник.
+
+Записи зберігаються в таблиці delivery_log (record_deliveries) і
+паралельно агрегуються в пам'яті в гістограми по типу нагадування —
+їх показує /stats. Звіт за довший період з БД:
+
+    python deliverystats.py [--hours 24] [--slo 60]
+"""
+import argparse
+import sys
+import threading
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from config import DELIVERY_SLO_SECONDS
+
+# Верхні межі кошиків, секунди. Останній — усе, що більше
+BUCKETS = (0, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1800, 3600)
+KINDS = ("30d", "7d", "1d", "before", "main", "snooze")
+
+
+class LagHistogram:
+    """
+    Гістограма затримок: кількість у кошиках BUCKETS + точні count/sum/max.
+    Перцентилі — верхня межа кошика, в який вони потрапили.
+    """
+
+    __slots__ = ("counts", "count", "total", "max", "queue_total")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.queue_total = 0.0
+
+    def add(self, lag: float, queue_lag: float = 0.0) -> None:
+        self.counts[bisect_left(BUCKETS, lag)] += 1
+        self.count += 1
+        self.total += lag
+        self.queue_total += queue_lag
+        if lag > self.max:
+            self.max = lag
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return float(BUCKETS[i]) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def within(self, seconds: float) -> float:
+        """Частка доставок із затримкою не більше seconds (межа кошика)."""
+        if not self.count:
+            return 1.0
+        i = bisect_left(BUCKETS, seconds)
+        return sum(self.counts[: i + 1]) / self.count
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "avg_queue": self.queue_total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class DeliveryStats:
+    def __init__(self):
+        self._by_kind: dict[str, LagHistogram] = {}
+        self._lock = threading.Lock()
+        self.since = datetime.utcnow()
+
+    def add(self, kind: str, scheduled: datetime, dequeued: datetime, acked: datetime) -> None:
+        lag = (acked - scheduled).total_seconds()
+        queue_lag = (dequeued - scheduled).total_seconds()
+        with self._lock:
+            hist = self._by_kind.get(kind)
+            if hist is None:
+                hist = self._by_kind[kind] = LagHistogram()
+            hist.add(lag, queue_lag)
+
+    def snapshot(self) -> dict[str, LagHistogram]:
+        with self._lock:
+            result = {}
+            for kind, hist in self._by_kind.items():
+                copy = LagHistogram()
+                copy.counts = list(hist.counts)
+                copy.count, copy.total, copy.max, copy.queue_total = hist.count, hist.total, hist.max, hist.queue_total
+                result[kind] = copy
+            return result
+
+
+def format_report(histograms: dict[str, LagHistogram], slo_seconds: float = DELIVERY_SLO_SECONDS) -> str:
+    if not histograms:
+        return "Доставок ще не було."
+    lines = [f"{'тип':<7}{'к-сть':>7}{'сер.':>8}{'p50':>7}{'p90':>7}{'p99':>7}{'макс':>8}  ≤{slo_seconds:g}с"]
+    ordered = [k for k in KINDS if k in histograms] + sorted(set(histograms) - set(KINDS))
+    for kind in ordered:
+        hist = histograms[kind]
+        s = hist.summary()
+        lines.append(
+            f"{kind:<7}{s['count']:>7}{s['avg']:>8.1f}{s['p50']:>7g}{s['p90']:>7g}"
+            f"{s['p99']:>7g}{s['max']:>8.1f}  {hist.within(slo_seconds):.1%}"
+        )
+    return "\n".join(lines)
+
+
+def histograms_from_rows(rows) -> dict[str, LagHistogram]:
+    """Рядки delivery_log (мс epoch) → гістограми по kind."""
+    result: dict[str, LagHistogram] = {}
+    for row in rows:
+        hist = result.get(row["kind"])
+        if hist is None:
+            hist = result[row["kind"]] = LagHistogram()
+        hist.add(
+            (row["acked_at"] - row["scheduled_at"]) / 1000,
+            (row["dequeued_at"] - row["scheduled_at"]) / 1000,
+        )
+    return result
+
+
+# Процесний агрегатор, який наповнює планувальник
+delivery_stats = DeliveryStats()
+
+
+def main(argv=None) -> int:
+    from db import get_delivery_records, shard_paths, use_shard
+
+    parser = argparse.ArgumentParser(description="Звіт про затримку доставки нагадувань")
+    parser.add_argument("--hours", type=float, default=24, help="за скільки останніх годин")
+    parser.add_argument("--slo", type=float, default=DELIVERY_SLO_SECONDS, help="ціль затримки, с")
+    args = parser.parse_args(argv)
+
+    since = datetime.utcnow() - timedelta(hours=args.hours)
+    rows = []
+    for shard in range(len(shard_paths())):
+        with use_shard(shard):
+            rows.extend(get_delivery_records(since))
+
+    print(f"Доставки з {since:%Y-%m-%d %H:%M} UTC: {len(rows)}")
+    print(format_report(histograms_from_rows(rows), args.slo))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
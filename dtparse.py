@@ -0,0 +1,427 @@
+"""
+Розбір дати й часу, які вводить користувач, за один прохід.
+
+Розуміє:
+  * числові формати: 2025-11-22 18:00, 22.11.2025 18:00, 22/11 18:00,
+    18:00, 18.30, 9,15, 1830;
+  * відносні фрази: «сьогодні», «завтра о 18», «післязавтра»,
+    «через 2 години», «через півгодини», «через 3 дні о 10:00»;
+  * дні тижня: «в п'ятницю», «наступного понеділка о 9»;
+  * назви місяців: «10 травня», «10 травня 1999 о 8 ранку»;
+  * частини доби: «о 7 вечора», «о 2 дня», «опівдні».
+
+Текст проходить одним скомпільованим регулярним виразом зліва направо.
+Кожен токен заповнює одну частину результату (дата / час / зсув).
+Невідомий токен означає, що весь рядок не розібрано, і функції
+повертають None: вгадувати тут гірше, ніж перепитати.
+
+Усі дати локальні (naive), у поясі користувача. Відносні форми
+рахуються від переданого now.
+
+Вартість розбору: python dtparse.py bench [--n 20000]
+"""
+import argparse
+import re
+import sys
+import time as _time
+from datetime import date, datetime, time, timedelta
+
+from clock import utcnow
+
+# Якщо вказано день, але не час
+DEFAULT_TIME = time(9, 0)
+
+_APOSTROPHES = str.maketrans({"’": "'", "ʼ": "'", "`": "'", "‘": "'"})
+
+_RELATIVE_DAYS = {"сьогодні": 0, "завтра": 1, "післязавтра": 2}
+
+_WEEKDAYS = {
+    "понеділок": 0, "понеділка": 0,
+    "вівторок": 1, "вівторка": 1,
+    "середа": 2, "середу": 2, "середи": 2,
+    "четвер": 3, "четверга": 3,
+    "п'ятниця": 4, "п'ятницю": 4, "п'ятниці": 4,
+    "субота": 5, "суботу": 5, "суботи": 5,
+    "неділя": 6, "неділю": 6, "неділі": 6,
+}
+
+_MONTHS = {
+    "січень": 1, "січня": 1,
+    "лютий": 2, "лютого": 2,
+    "березень": 3, "березня": 3,
+    "квітень": 4, "квітня": 4,
+    "травень": 5, "травня": 5,
+    "червень": 6, "червня": 6,
+    "липень": 7, "липня": 7,
+    "серпень": 8, "серпня": 8,
+    "вересень": 9, "вересня": 9,
+    "жовтень": 10, "жовтня": 10,
+    "листопад": 11, "листопада": 11,
+    "грудень": 12, "грудня": 12,
+}
+
+# Частина доби → як поправити годину 1..12
+_DAYPARTS = {"ранку": "am", "зранку": "am", "ночі": "night", "дня": "pm", "вечора": "pm", "ввечері": "pm"}
+_FIXED_TIMES = {"опівдні": time(12, 0), "опівночі": time(0, 0)}
+
+_PREPOSITIONS = {"о", "об", "в", "у", "на", "до"}
+# Після них «9.05» — це час 09:05, а не 9 травня
+_TIME_PREPOSITIONS = {"о", "об", "в", "у"}
+_NEXT_WORDS = {"наступний", "наступного", "наступної", "наступну", "наступне", "наступна"}
+
+# «через N ...» далі за цей зсув — явно помилка вводу, а не нагадування
+MAX_RELATIVE_MINUTES = 10 * 366 * 1440
+
+# Одиниці для «через N ...»: початок слова → хвилин
+_UNITS = (
+    ("хв", 1),
+    ("год", 60),
+    ("д", 1440),
+    ("доб", 1440),
+    ("тиж", 10080),
+)
+
+
+def _alt(words) -> str:
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+_TOKEN = re.compile(
+    rf"""
+    (?P<skip>[\s,]+)
+    |(?P<iso>(?P<iso_y>\d{{4}})[-./](?P<iso_m>\d{{1,2}})[-./](?P<iso_d>\d{{1,2}}))(?![\d:])
+    |(?P<dmy>(?P<dmy_d>\d{{1,2}})[-./](?P<dmy_m>\d{{1,2}})(?:[-./](?P<dmy_y>\d{{4}}|\d{{2}}))?)(?![\d:])
+    |(?P<hm>(?P<hm_h>\d{{1,2}})[:,](?P<hm_m>\d{{2}}))(?!\d)
+    |(?P<mday>(?P<md_d>\d{{1,2}})\s*(?P<md_m>{_alt(_MONTHS)})(?:\s+(?P<md_y>\d{{4}}))?)(?!\w)
+    |(?P<rel>через\s+(?:(?P<rel_n>\d{{1,9}}|пів)\s*)?(?P<rel_u>хв\w*|год\w*|доб\w*|д(?:ень|ні|нів|ня)|тиж\w*))(?!\w)
+    |(?P<num>\d{{1,4}})(?!\d)
+    |(?P<word>[^\W\d][\w']*)
+    """,
+    re.X,
+)
+
+
+class _Parts:
+    __slots__ = ("date", "short_year", "day_offset", "weekday", "next", "hour", "minute", "daypart", "delta")
+
+    def __init__(self):
+        self.date = None          # (рік | None, місяць, день)
+        self.short_year = False   # рік введено двома цифрами
+        self.day_offset = None
+        self.weekday = None
+        self.next = False
+        self.hour = None
+        self.minute = 0
+        self.daypart = None
+        self.delta = None
+
+
+def _year(raw: str) -> int:
+    y = int(raw)
+    return y + 2000 if y < 100 else y
+
+
+def _unit_minutes(unit: str) -> int:
+    for prefix, minutes in reversed(_UNITS):
+        if unit.startswith(prefix):
+            return minutes
+    return 0
+
+
+def _tokenize(text: str, time_first: bool) -> _Parts | None:
+    """
+    Один прохід по рядку. time_first — «18.30» читати як час, а не 18-те
+    число 30-го місяця (для полів, де очікуємо лише час).
+    """
+    s = text.strip().lower().translate(_APOSTROPHES)
+    if not s:
+        return None
+
+    p = _Parts()
+    pos = 0
+    end = len(s)
+    # Попередній токен — «о» / «в»: наступне H.MM читається як час
+    at = False
+    while pos < end:
+        m = _TOKEN.match(s, pos)
+        if m is None:
+            return None
+        pos = m.end()
+        kind = m.lastgroup
+
+        if kind == "skip":
+            continue
+        after_at, at = at, False
+
+        if kind == "iso":
+            if p.date is not None:
+                return None
+            p.date = (int(m["iso_y"]), int(m["iso_m"]), int(m["iso_d"]))
+
+        elif kind == "dmy":
+            day, month, year = int(m["dmy_d"]), int(m["dmy_m"]), m["dmy_y"]
+            if year is None and p.hour is None and (time_first or after_at or month > 12) and day < 24 and month < 60:
+                p.hour, p.minute = day, month
+            elif p.date is None:
+                p.date = (_year(year) if year else None, month, day)
+                p.short_year = year is not None and len(year) == 2
+            else:
+                return None
+
+        elif kind == "hm":
+            if p.hour is not None:
+                return None
+            p.hour, p.minute = int(m["hm_h"]), int(m["hm_m"])
+
+        elif kind == "mday":
+            if p.date is not None:
+                return None
+            year = m["md_y"]
+            p.date = (int(year) if year else None, _MONTHS[m["md_m"]], int(m["md_d"]))
+
+        elif kind == "rel":
+            n = m["rel_n"]
+            amount = 0.5 if n == "пів" else int(n) if n else 1
+            minutes = _unit_minutes(m["rel_u"])
+            if not minutes or p.delta is not None or amount * minutes > MAX_RELATIVE_MINUTES:
+                return None
+            p.delta = timedelta(minutes=amount * minutes)
+
+        elif kind == "num":
+            raw = m["num"]
+            if p.hour is not None:
+                return None
+            if len(raw) <= 2:
+                p.hour = int(raw)
+            elif len(raw) == 4:
+                p.hour, p.minute = int(raw[:2]), int(raw[2:])
+            else:
+                return None
+
+        else:
+            word = m["word"]
+            if word in _PREPOSITIONS:
+                at = word in _TIME_PREPOSITIONS
+                continue
+            if word in _RELATIVE_DAYS:
+                p.day_offset = _RELATIVE_DAYS[word]
+            elif word in _WEEKDAYS:
+                p.weekday = _WEEKDAYS[word]
+            elif word in _NEXT_WORDS:
+                p.next = True
+            elif word in _DAYPARTS:
+                p.daypart = _DAYPARTS[word]
+            elif word in _FIXED_TIMES:
+                if p.hour is not None:
+                    return None
+                t = _FIXED_TIMES[word]
+                p.hour, p.minute = t.hour, t.minute
+            else:
+                return None
+
+    return p
+
+
+def _resolve_time(p: _Parts) -> time | None:
+    if p.hour is None:
+        return None
+    hour = p.hour
+    if p.daypart is not None:
+        if not 1 <= hour <= 12:
+            return None
+        if p.daypart == "pm" and hour < 12:
+            hour += 12
+        elif p.daypart in ("am", "night") and hour == 12:
+            hour = 0
+    try:
+        return time(hour, p.minute)
+    except ValueError:
+        return None
+
+
+def parse_time(text: str) -> time | None:
+    """«18:00», «9.30», «0830», «о 7 вечора», «опівдні»."""
+    p = _tokenize(text, time_first=True)
+    if p is None or p.date or p.day_offset is not None or p.weekday is not None or p.delta:
+        return None
+    return _resolve_time(p)
+
+
+def parse_date(text: str, today: date | None = None) -> date | None:
+    """
+    Повна дата з роком — для дат народження:
+    «1999-05-10», «10.05.1999», «10 травня 1999», «10.05.99».
+    Дворядковий рік — у минулому відносно today: «99» → 1999, «05» → 2005.
+    """
+    p = _tokenize(text, time_first=False)
+    if p is None or p.date is None or p.date[0] is None:
+        return None
+    if p.hour is not None or p.day_offset is not None or p.weekday is not None or p.delta:
+        return None
+    year, month, day = p.date
+    if p.short_year:
+        today = today or utcnow().date()
+        year = 2000 + year % 100
+        if year > today.year:
+            year -= 100
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_datetime(text: str, now: datetime) -> datetime | None:
+    """
+    Локальний datetime події. now — поточний локальний час користувача
+    (naive), від нього рахуються «завтра», «через 2 години», дні тижня
+    й дата без року (найближча в майбутньому).
+    """
+    p = _tokenize(text, time_first=False)
+    if p is None:
+        return None
+    try:
+        return _resolve_datetime(p, now)
+    except OverflowError:
+        # Результат поза межами datetime (далі 9999 року) — як нерозібраний
+        return None
+
+
+def _resolve_datetime(p: _Parts, now: datetime) -> datetime | None:
+    if p.daypart is not None and p.hour is None:
+        return None
+
+    day_sources = (p.date is not None) + (p.day_offset is not None) + (p.weekday is not None)
+    if day_sources > 1 or (p.next and p.weekday is None):
+        return None
+
+    t = _resolve_time(p)
+    if p.hour is not None and t is None:
+        return None
+
+    if p.delta is not None:
+        if p.date is not None or p.weekday is not None:
+            return None
+        base = now + p.delta + timedelta(days=p.day_offset or 0)
+        if t is None:
+            return base.replace(second=0, microsecond=0)
+        # «через 3 дні о 10» — день зі зсуву, час явний;
+        # «через 2 години о 10» — суперечність
+        if p.delta < timedelta(days=1):
+            return None
+        return datetime.combine(base.date(), t)
+
+    if t is None:
+        if day_sources == 0:
+            return None
+        t = DEFAULT_TIME
+
+    today = now.date()
+    if p.date is not None:
+        year, month, day = p.date
+        try:
+            result = datetime.combine(date(year or today.year, month, day), t)
+        except ValueError:
+            return None
+        if year is None and result < now:
+            try:
+                result = result.replace(year=today.year + 1)
+            except ValueError:
+                return None
+        return result
+
+    if p.day_offset is not None:
+        return datetime.combine(today + timedelta(days=p.day_offset), t)
+
+    if p.weekday is not None:
+        ahead = (p.weekday - today.weekday()) % 7
+        if ahead == 0 and (p.next or datetime.combine(today, t) <= now):
+            ahead = 7
+        return datetime.combine(today + timedelta(days=ahead), t)
+
+    # Лише час: сьогодні, а якщо вже минув — завтра
+    result = datetime.combine(today, t)
+    if result <= now:
+        result += timedelta(days=1)
+    return result
+
+
+# ======================== БЕНЧМАРК ============================
+
+# Ввід, який реально приходить у діалогах: числові формати, які розумів
+# і старий розбір, плюс фрази, з якими він просто повертав None
+_BENCH_DATETIME = [
+    "2025-11-22 18:00", "22.11.2025 18:00", "22/11/2025 18:00",
+    "22.11 18:00", "завтра о 18", "через 2 години", "в п'ятницю о 9.05",
+    "10 травня о 8 ранку", "о 9.05", "колись",
+]
+_BENCH_DATE = ["1999-05-10", "10.05.1999", "10/05/1999", "10 травня 1999", "10.05.99"]
+_BENCH_TIME = ["18:00", "18.30", "9,15", "1830", "о 7 вечора"]
+
+
+def _legacy_datetime(text: str):
+    """Ланцюжок strptime, яким бот розбирав ввід до цього модуля."""
+    raw = re.sub(r"\s+", " ", text.strip().replace("/", "-").replace(".", "-"))
+    for fmt in ("%Y-%m-%d %H:%M", "%d-%m-%Y %H:%M"):
+        try:
+            return datetime.strptime(raw, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _legacy_date(text: str):
+    raw = text.strip().replace("/", "-").replace(".", "-")
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(raw, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _legacy_time(text: str):
+    raw = text.strip().replace(".", ":").replace(",", ":")
+    if ":" not in raw and raw.isdigit() and len(raw) == 4:
+        raw = raw[:2] + ":" + raw[2:]
+    try:
+        return datetime.strptime(raw, "%H:%M").time()
+    except ValueError:
+        return None
+
+
+def bench(n: int) -> None:
+    now = datetime(2025, 11, 19, 14, 0)
+    today = now.date()
+
+    def run(label, fn, inputs):
+        parsed = sum(fn(text) is not None for text in inputs)
+        started = _time.perf_counter()
+        for _ in range(n):
+            for text in inputs:
+                fn(text)
+        per_call = (_time.perf_counter() - started) / (n * len(inputs)) * 1e6
+        print(f"{label:<28}{per_call:>8.2f} мкс   розібрано {parsed}/{len(inputs)}")
+
+    print(f"{n} проходів по вибірці вводу:")
+    run("datetime: strptime", _legacy_datetime, _BENCH_DATETIME)
+    run("datetime: parse_datetime", lambda t: parse_datetime(t, now), _BENCH_DATETIME)
+    run("date: strptime", _legacy_date, _BENCH_DATE)
+    run("date: parse_date", lambda t: parse_date(t, today), _BENCH_DATE)
+    run("time: strptime", _legacy_time, _BENCH_TIME)
+    run("time: parse_time", parse_time, _BENCH_TIME)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Розбір дати й часу")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_bench = sub.add_parser("bench", help="вартість розбору проти старого strptime")
+    p_bench.add_argument("--n", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(args.n)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
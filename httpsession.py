@@ -0,0 +1,251 @@
+"""
+HTTP-сесія Bot API, налаштована під розсилку нагадувань.
+
+Стандартна AiohttpSession aiogram має пул на 100 з'єднань, keep-alive
+15 с (дефолт aiohttp) і лише загальний таймаут на запит. Тут усе це
+задається з config:
+  * HTTP_POOL_LIMIT / HTTP_POOL_LIMIT_PER_HOST — розмір пулу;
+  * HTTP_DNS_TTL_SECONDS — кеш DNS (0 — без кешу);
+  * HTTP_KEEPALIVE_SECONDS — скільки тримати простійне з'єднання, щоб
+    щохвилинний тік не встановлював TLS заново (0 — не тримати);
+  * HTTP_TIMEOUT_SECONDS — таймаут запиту, HTTP_CONNECT_TIMEOUT_SECONDS —
+    окремо на встановлення з'єднання, щоб зависле TCP/TLS не з'їдало
+    весь бюджет запиту;
+  * HTTP_READ_BUFSIZE — буфер читання відповіді.
+
+Кожен Bot (на кожен токен — у головному loop'і і в кожному воркері
+UpdatePipeline) має отримати власну сесію: aiohttp-сесія прив'язана до
+свого event loop. create_bot() робить саме це і підключає до сесії
+спільний для токена SendRateLimiter (BOT_SEND_RATE / BOT_SEND_BURST):
+планувальник і обробники одного бота ділять один ліміт Bot API, а різні
+боти одне одного не гальмують.
+
+Навантажувальний тест проти локального фейкового Bot API:
+    python httpsession.py bench [--requests 2000] [--concurrency 50] \\
+        [--limits 10,100] [--keepalive 0,75] [--delay-ms 5]
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+
+from aiohttp import ClientSession, ClientTimeout, web
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+
+from aiogram import Bot, __version__
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.methods import GetUpdates
+
+from config import (
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_DNS_TTL_SECONDS,
+    HTTP_KEEPALIVE_SECONDS,
+    HTTP_TIMEOUT_SECONDS,
+    HTTP_CONNECT_TIMEOUT_SECONDS,
+    HTTP_READ_BUFSIZE,
+    BOT_SEND_RATE,
+    BOT_SEND_BURST,
+)
+
+
+class TunedAiohttpSession(AiohttpSession):
+    def __init__(
+        self,
+        limit: int = HTTP_POOL_LIMIT,
+        limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+        dns_ttl: int = HTTP_DNS_TTL_SECONDS,
+        keepalive: float = HTTP_KEEPALIVE_SECONDS,
+        timeout: float = HTTP_TIMEOUT_SECONDS,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT_SECONDS,
+        read_bufsize: int = HTTP_READ_BUFSIZE,
+        **kwargs,
+    ):
+        super().__init__(limit=limit, timeout=timeout, **kwargs)
+        self._connector_init.update(
+            limit_per_host=limit_per_host,
+            use_dns_cache=dns_ttl > 0,
+            ttl_dns_cache=dns_ttl or None,
+        )
+        if keepalive > 0:
+            self._connector_init["keepalive_timeout"] = keepalive
+        else:
+            self._connector_init["force_close"] = True
+        self.connect_timeout = connect_timeout
+        self.read_bufsize = read_bufsize
+
+    async def create_session(self) -> ClientSession:
+        if self._should_reset_connector:
+            await self.close()
+
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{__version__}"},
+                read_bufsize=self.read_bufsize,
+            )
+            self._should_reset_connector = False
+
+        return self._session
+
+    async def make_request(self, bot, method, timeout=None):
+        # aiogram передає в aiohttp лише загальний таймаут; додаємо
+        # окремий на встановлення з'єднання (очікування вільного місця
+        # в пулі сюди не входить)
+        total = self.timeout if timeout is None else timeout
+        return await super().make_request(
+            bot, method, timeout=ClientTimeout(total=total, sock_connect=self.connect_timeout)
+        )
+
+
+def create_session(**overrides) -> TunedAiohttpSession:
+    return TunedAiohttpSession(**overrides)
+
+
+class SendRateLimiter(BaseRequestMiddleware):
+    """
+    Ліміт вихідних запитів одного токена (GCRA): кожен запит бронює
+    наступний слот і, якщо сплеск вичерпано, чекає до нього. Спільний
+    для сесій у різних потоках — стан під threading.Lock, а чекання —
+    asyncio.sleep у loop'і того, хто робить запит. getUpdates не лімітується.
+    """
+
+    def __init__(self, rate: float = BOT_SEND_RATE, burst: int = BOT_SEND_BURST):
+        self.interval = 1 / rate
+        self.tolerance = (max(burst, 1) - 1) * self.interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+        self.waits = 0
+
+    def reserve(self) -> float:
+        """Скільки секунд чекати на свій слот."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+            delay = slot - now - self.tolerance
+            if delay > 0:
+                self.waits += 1
+                return delay
+            return 0.0
+
+    async def __call__(self, make_request, bot, method):
+        if not isinstance(method, GetUpdates):
+            delay = self.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+        return await make_request(bot, method)
+
+
+_limiters: dict[int, SendRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def rate_limiter_for(bot_id: int) -> SendRateLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(bot_id)
+        if limiter is None:
+            limiter = _limiters[bot_id] = SendRateLimiter()
+        return limiter
+
+
+def create_bot(token: str) -> Bot:
+    """Bot з власною налаштованою сесією і спільним лімітом свого токена."""
+    bot = Bot(token, session=create_session())
+    bot.session.middleware(rate_limiter_for(bot.id))
+    return bot
+
+
+# ======================== НАВАНТАЖУВАЛЬНИЙ ТЕСТ ============================
+
+async def _start_fake_api(delay: float) -> tuple[web.AppRunner, str]:
+    """Фейковий Bot API: будь-який метод → ok із повідомленням після delay."""
+    async def handle(request: web.Request) -> web.Response:
+        if delay:
+            await asyncio.sleep(delay)
+        return web.json_response({
+            "ok": True,
+            "result": {"message_id": 1, "date": 0, "chat": {"id": 1, "type": "private"}, "text": "ok"},
+        })
+
+    app = web.Application()
+    app.router.add_post("/{path:.*}", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+async def _bench_one(base_url: str, requests: int, concurrency: int, **settings) -> dict:
+    session = create_session(api=TelegramAPIServer.from_base(base_url), **settings)
+    bot = Bot("1:bench", session=session)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def send(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await bot.send_message(1, f"bench {i}")
+            latencies.append(time.perf_counter() - started)
+
+    try:
+        # Прогрів: DNS і перші з'єднання не входять у вимір
+        await asyncio.gather(*(send(i) for i in range(min(concurrency, requests))))
+        latencies.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(send(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await session.close()
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def bench(requests: int, concurrency: int, limits: list[int], keepalives: list[float], delay: float) -> None:
+    runner, base_url = await _start_fake_api(delay)
+    try:
+        print(f"{requests} запитів, паралельно {concurrency}, затримка API {delay * 1000:g} мс")
+        print(f"{'limit':>6}{'keepalive':>11}{'req/s':>9}{'p50 мс':>9}{'p99 мс':>9}")
+        for limit in limits:
+            for keepalive in keepalives:
+                r = await _bench_one(base_url, requests, concurrency, limit=limit, keepalive=keepalive)
+                print(f"{limit:>6}{keepalive:>11g}{r['rps']:>9.0f}{r['p50']:>9.1f}{r['p99']:>9.1f}")
+    finally:
+        await runner.cleanup()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="HTTP-сесія Bot API")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_bench = sub.add_parser("bench", help="навантажувальний тест проти локального фейкового API")
+    p_bench.add_argument("--requests", type=int, default=2000)
+    p_bench.add_argument("--concurrency", type=int, default=50)
+    p_bench.add_argument("--limits", default=f"10,{HTTP_POOL_LIMIT}", help="розміри пулу через кому")
+    p_bench.add_argument("--keepalive", default=f"0,{HTTP_KEEPALIVE_SECONDS:g}", help="keep-alive, с, через кому")
+    p_bench.add_argument("--delay-ms", type=float, default=5, help="затримка відповіді фейкового API")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        asyncio.run(bench(
+            args.requests,
+            args.concurrency,
+            [int(x) for x in args.limits.split(",")],
+            [float(x) for x in args.keepalive.split(",")],
+            args.delay_ms / 1000,
+        ))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Каталог повідомлень бота і їх рендер.
+
+CATALOG — тексти по мовах з іменованими полями у форматі str.format:
+"⏰ Нагадування: <b>{title}</b>\\nО {dt:%Y-%m-%d %H:%M}". При імпорті
+кожен шаблон один раз компілюється у функцію з f-рядком, тож рендер —
+це звичайний виклик без розбору шаблону:
+
+    tr("en", "reminder.main", title="Standup", dt=dt_local)
+    messages = catalog(locale); messages["reminder.main"](title=..., dt=...)
+
+Поля — лише імена (без індексів і атрибутів); переклад не може мати
+полів, яких немає в українському шаблоні, — це перевіряється при
+компіляції. Відсутній переклад береться з українського каталогу, а
+мова користувача, якої немає в каталозі, — DEFAULT_LOCALE з config.
+
+Вартість рендеру: python i18n.py bench [--n 100000]
+"""
+import argparse
+import string
+import sys
+import time
+from datetime import datetime
+
+from config import DEFAULT_LOCALE
+
+# Повний каталог; решта мов можуть перекладати не все
+SOURCE_LOCALE = "uk"
+
+LOCALE_NAMES = {
+    "uk": "🇺🇦 Українська",
+    "en": "🇬🇧 English",
+}
+
+CATALOG = {
+    "uk": {
+        # Нагадування
+        "reminder.bday_30d": "🥳 За місяць день народження: <b>{title}</b>",
+        "reminder.bday_7d": "🎉 За тиждень день народження: <b>{title}</b>",
+        "reminder.bday_1d": "🎈 Вже завтра день народження: <b>{title}</b>",
+        "reminder.bday_today": "🔥 Сьогодні день народження <b>{title}</b>!",
+        "reminder.before": "⏰ Нагадування: <b>{title}</b>\nО {dt:%Y-%m-%d %H:%M}",
+        "reminder.main": "🔥 Подія зараз: <b>{title}</b>\n{dt:%Y-%m-%d %H:%M}",
+        "reminder.snooze": "⏰ Відкладене нагадування: <b>{title}</b>\n{dt:%Y-%m-%d %H:%M}",
+        "reminder.digest_header": "🔔 <b>Нагадування ({count}):</b>",
+        # Відкладення
+        "snooze.10m": "+10 хв",
+        "snooze.1h": "+1 год",
+        "snooze.1d": "Завтра",
+        "snooze.done": "Нагадаю {dt:%d.%m о %H:%M} ⏰",
+        "snooze.not_found": "Подію не знайдено ❌",
+        # Категорії
+        "category.family": "👨‍👩‍👧 Сім'я",
+        "category.friends": "👥 Друзі",
+        "category.work": "💼 Робота",
+        "category.other": "📌 Інше",
+        # Списки
+        "list.events_all": "📋 <b>Список усіх подій:</b>",
+        "list.events_category": "📋 <b>Події — {category}:</b>",
+        "list.events_empty": "Немає подій за цим фільтром.",
+        "list.event_item": (
+            "{idx}) <b>{title}</b>\n"
+            "ID: <code>{id}</code>\n"
+            "{dt:%Y-%m-%d %H:%M}\n"
+            "Тип: {type}\n"
+            "Категорія: {category}\n\n"
+        ),
+        "list.events_footer": "👉 Для редагування/видалення використовуй саме ID.\n",
+        "list.birthdays_all": "🎂 <b>Усі дні народження:</b>",
+        "list.birthdays_category": "🎂 <b>Дні народження — {category}:</b>",
+        "list.birthdays_empty": "Немає днів народження за цим фільтром 🎂",
+        "list.birthday_item": (
+            "{idx}) <b>{title}</b>\n"
+            "ID: <code>{id}</code>\n"
+            "Наступна дата: {dt:%Y-%m-%d} о {dt:%H:%M}\n"
+            "Категорія: {category}\n\n"
+        ),
+        "list.birthdays_footer": "👉 Щоб відредагувати або видалити ДР — використовуй ID.\n",
+        # Історія
+        "history.empty": "Історія поки порожня 🗄",
+        "history.header": "🗄 <b>Минулі події (останні {count}):</b>\n\n",
+        "history.item": "<b>{title}</b>\n{dt:%Y-%m-%d %H:%M} · {category}\n\n",
+        # Мова
+        "language.choose": "Оберіть мову:",
+        "language.set": "Мову змінено: {name}",
+    },
+    "en": {
+        "reminder.bday_30d": "🥳 Birthday in a month: <b>{title}</b>",
+        "reminder.bday_7d": "🎉 Birthday in a week: <b>{title}</b>",
+        "reminder.bday_1d": "🎈 Birthday tomorrow: <b>{title}</b>",
+        "reminder.bday_today": "🔥 Today is <b>{title}</b>'s birthday!",
+        "reminder.before": "⏰ Reminder: <b>{title}</b>\nAt {dt:%Y-%m-%d %H:%M}",
+        "reminder.main": "🔥 Happening now: <b>{title}</b>\n{dt:%Y-%m-%d %H:%M}",
+        "reminder.snooze": "⏰ Snoozed reminder: <b>{title}</b>\n{dt:%Y-%m-%d %H:%M}",
+        "reminder.digest_header": "🔔 <b>Reminders ({count}):</b>",
+        "snooze.10m": "+10 min",
+        "snooze.1h": "+1 h",
+        "snooze.1d": "Tomorrow",
+        "snooze.done": "I'll remind you {dt:%d.%m at %H:%M} ⏰",
+        "snooze.not_found": "Event not found ❌",
+        "category.family": "👨‍👩‍👧 Family",
+        "category.friends": "👥 Friends",
+        "category.work": "💼 Work",
+        "category.other": "📌 Other",
+        "list.events_all": "📋 <b>All events:</b>",
+        "list.events_category": "📋 <b>Events — {category}:</b>",
+        "list.events_empty": "No events for this filter.",
+        "list.event_item": (
+            "{idx}) <b>{title}</b>\n"
+            "ID: <code>{id}</code>\n"
+            "{dt:%Y-%m-%d %H:%M}\n"
+            "Type: {type}\n"
+            "Category: {category}\n\n"
+        ),
+        "list.events_footer": "👉 Use the ID to edit or delete an event.\n",
+        "list.birthdays_all": "🎂 <b>All birthdays:</b>",
+        "list.birthdays_category": "🎂 <b>Birthdays — {category}:</b>",
+        "list.birthdays_empty": "No birthdays for this filter 🎂",
+        "list.birthday_item": (
+            "{idx}) <b>{title}</b>\n"
+            "ID: <code>{id}</code>\n"
+            "Next date: {dt:%Y-%m-%d} at {dt:%H:%M}\n"
+            "Category: {category}\n\n"
+        ),
+        "list.birthdays_footer": "👉 Use the ID to edit or delete a birthday.\n",
+        "history.empty": "History is empty so far 🗄",
+        "history.header": "🗄 <b>Past events (last {count}):</b>\n\n",
+        "history.item": "<b>{title}</b>\n{dt:%Y-%m-%d %H:%M} · {category}\n\n",
+        "language.choose": "Choose a language:",
+        "language.set": "Language changed: {name}",
+    },
+}
+
+_FORMATTER = string.Formatter()
+
+
+def _fields(text: str) -> list[str]:
+    fields = []
+    for _, name, spec, _ in _FORMATTER.parse(text):
+        if name is None:
+            continue
+        if not name.isidentifier():
+            raise ValueError(f"Поле шаблону має бути іменем: {{{name}}} у {text!r}")
+        if spec and "{" in spec:
+            raise ValueError(f"Вкладені поля не підтримуються: {text!r}")
+        if name not in fields:
+            fields.append(name)
+    return fields
+
+
+def compile_template(text: str):
+    """
+    Шаблон → функція(**поля) -> str. Текст стає f-рядком один раз;
+    у поля підставляються лише іменовані аргументи.
+    """
+    fields = _fields(text)
+    if not fields:
+        return lambda: text
+    source = f"lambda *, {', '.join(fields)}: f{text!r}"
+    return eval(compile(source, "<i18n>", "eval"), {})
+
+
+def _compile_catalog() -> dict[str, dict]:
+    base = CATALOG[SOURCE_LOCALE]
+    compiled = {}
+    for locale, texts in CATALOG.items():
+        unknown = set(texts) - set(base)
+        if unknown:
+            raise ValueError(f"{locale}: ключів немає в {SOURCE_LOCALE}: {sorted(unknown)}")
+        merged = {}
+        for key, default_text in base.items():
+            text = texts.get(key, default_text)
+            if not set(_fields(text)) <= set(_fields(default_text)):
+                raise ValueError(f"{locale}/{key}: поля не збігаються з {SOURCE_LOCALE}")
+            merged[key] = compile_template(text)
+        compiled[locale] = merged
+    return compiled
+
+
+_COMPILED = _compile_catalog()
+LOCALES = tuple(_COMPILED)
+_FALLBACK = DEFAULT_LOCALE if DEFAULT_LOCALE in _COMPILED else SOURCE_LOCALE
+
+
+def resolve_locale(locale: str | None) -> str:
+    """users.locale або language_code Telegram ("en-US") → мова каталогу."""
+    if locale:
+        locale = locale.split("-", 1)[0].lower()
+        if locale in _COMPILED:
+            return locale
+    return _FALLBACK
+
+
+def catalog(locale: str | None) -> dict:
+    """Скомпільовані шаблони мови: ключ → функція(**поля)."""
+    return _COMPILED[resolve_locale(locale)]
+
+
+def tr(locale: str | None, key: str, **values) -> str:
+    return catalog(locale)[key](**values)
+
+
+# ======================== БЕНЧМАРК ============================
+
+def bench(n: int) -> None:
+    dt = datetime(2025, 11, 22, 18, 0)
+    raw = CATALOG[SOURCE_LOCALE]["reminder.before"]
+    messages = catalog(SOURCE_LOCALE)
+
+    def run(label, fn):
+        started = time.perf_counter()
+        for _ in range(n):
+            fn()
+        per_call = (time.perf_counter() - started) / n * 1e6
+        print(f"{label:<28}{per_call:>8.2f} мкс")
+
+    print(f"reminder.before, {n} разів:")
+    run("f-рядок у коді", lambda: f"⏰ Нагадування: <b>{'Standup'}</b>\nО {dt:%Y-%m-%d %H:%M}")
+    run("str.format щоразу", lambda: raw.format(title="Standup", dt=dt))
+    run("скомпільований шаблон", lambda: messages["reminder.before"](title="Standup", dt=dt))
+    run("tr(locale, key)", lambda: tr("uk", "reminder.before", title="Standup", dt=dt))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Каталог повідомлень")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_bench = sub.add_parser("bench", help="вартість рендеру одного нагадування")
+    p_bench.add_argument("--n", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(args.n)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Структуроване логування: JSON-рядок на запис, запис у stdout —
+у фоновому потоці.
+
+Обробники й планувальник лише кладуть LogRecord у чергу
+(QueueHandler), форматування й запис робить QueueListener, тож
+повільний stdout не гальмує event loop.
+
+Поля з extra={...} (event_id, user_id, tg_id, kind, shard, ...)
+потрапляють у JSON як є.
+
+Однакові попередження/помилки (той самий логер, шаблон повідомлення
+й тип винятку або поле error) семплюються: у вікні LOG_SAMPLE_WINDOW_SECONDS проходять
+перші LOG_SAMPLE_BURST, решта лише рахуються, і перший запис наступного
+вікна несе suppressed=N.
+
+Рівні можна міняти на льоту: set_level("bot", "DEBUG") (/loglevel).
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+
+from config import LOG_LEVEL, LOG_SAMPLE_WINDOW_SECONDS, LOG_SAMPLE_BURST
+
+# Стандартні атрибути LogRecord — усе інше прийшло з extra
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = value
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Готує запис до передачі в інший потік: підставляє аргументи
+    й перетворює виняток на текст, але не форматує — це робить
+    JsonFormatter у потоці слухача.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Проріджує серії однакових записів рівня WARNING і вище.
+    """
+
+    def __init__(self, window: float = LOG_SAMPLE_WINDOW_SECONDS, burst: int = LOG_SAMPLE_BURST):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        # ключ → [початок вікна, пропущено у вікні, придушено у вікні]
+        self._seen: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        exc_type = record.exc_info[0].__name__ if record.exc_info else getattr(record, "error", None)
+        key = (record.name, record.msg, exc_type)
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self._seen[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                if len(self._seen) > 10000:
+                    self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window}
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def setup_logging(level: str = LOG_LEVEL) -> None:
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level.upper())
+    # aiogram.event пише рядок на кожне оновлення
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def set_level(logger_name: str, level: str) -> str:
+    """
+    Міняє рівень логера ("" або "root" — кореневий). Повертає новий рівень.
+    ValueError — якщо рівень невідомий.
+    """
+    level = level.upper()
+    if not isinstance(logging.getLevelName(level), int):
+        raise ValueError(f"Невідомий рівень: {level}")
+    logger = logging.getLogger(None if logger_name in ("", "root") else logger_name)
+    logger.setLevel(level)
+    return logging.getLevelName(logger.level)
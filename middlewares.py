@@ -0,0 +1,176 @@
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from config import (
+    FLOOD_CHEAP_RATE,
+    FLOOD_CHEAP_BURST,
+    FLOOD_EXPENSIVE_RATE,
+    FLOOD_EXPENSIVE_BURST,
+)
+from db import shard_for_tg_id, use_bot, use_shard
+
+
+class BotMiddleware(BaseMiddleware):
+    """
+    Ставить простір імен бота, якому прийшло оновлення (BOT_TOKENS):
+    get_or_create_user і решта db працюють з користувачами цього бота.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        with use_bot(data["bot"].id):
+            return await handler(event, data)
+
+
+class ShardMiddleware(BaseMiddleware):
+    """
+    Ставить шард БД користувача на весь час обробки оновлення,
+    тож обробники викликають функції db як і раніше.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        with use_shard(shard_for_tg_id(user.id)):
+            return await handler(event, data)
+
+
+# ======================== FLOOD CONTROL ============================
+
+# Дії, що читають усі події користувача або рендерять великі повідомлення
+EXPENSIVE_CALLBACKS = {"menu_list", "menu_birthdays", "menu_history", "export_csv", "export_json"}
+EXPENSIVE_CALLBACK_PREFIXES = ("list_cat_", "bday_cat_", "srch_page:")
+EXPENSIVE_COMMANDS = {"birthdays", "export", "search", "history"}
+
+# Бакети користувачів, що не смикали бота довше за це, прибираються
+BUCKET_IDLE_SECONDS = 600
+# Як часто (сек) можна повторно казати користувачу в чаті, що він поспішає
+THROTTLE_NOTICE_INTERVAL = 10
+
+THROTTLED_TEXT = "⏳ Забагато запитів, спробуйте за кілька секунд."
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: int, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+def action_cost(event: TelegramObject) -> str:
+    """cheap / expensive — з якого бюджету списувати оновлення."""
+    if isinstance(event, CallbackQuery):
+        data = event.data or ""
+        if data in EXPENSIVE_CALLBACKS or data.startswith(EXPENSIVE_CALLBACK_PREFIXES):
+            return "expensive"
+    elif isinstance(event, Message) and event.text and event.text.startswith("/"):
+        command = event.text[1:].split(maxsplit=1)[0].split("@", 1)[0].lower()
+        if command in EXPENSIVE_COMMANDS:
+            return "expensive"
+    return "cheap"
+
+
+class ThrottleMiddleware(BaseMiddleware):
+    """
+    Токен-бакет на користувача (окремо в кожному боті) для дешевих
+    і дорогих дій.
+    Оновлення понад бюджет не доходять до обробників (і до БД):
+    на callback — короткий answer(), на повідомлення — текст не частіше
+    ніж раз на THROTTLE_NOTICE_INTERVAL.
+
+    Повторне натискання тієї ж кнопки, поки перше ще обробляється,
+    сюди не доходить: його гасить UpdatePipeline ще до черги
+    (оновлення користувача обробляються по черзі, тож тут воно
+    ніколи не перетнулося б із першим).
+
+    Стан захищений lock'ом: middleware може ділитися між кількома
+    потоками-обробниками.
+    """
+
+    def __init__(
+        self,
+        cheap: tuple[float, int] = (FLOOD_CHEAP_RATE, FLOOD_CHEAP_BURST),
+        expensive: tuple[float, int] = (FLOOD_EXPENSIVE_RATE, FLOOD_EXPENSIVE_BURST),
+    ):
+        self.limits = {"cheap": cheap, "expensive": expensive}
+        # Ключ користувача — (bot_id, tg_id)
+        self._buckets: dict[tuple[tuple[int, int], str], TokenBucket] = {}
+        self._last_notice: dict[tuple[int, int], float] = {}
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+        self.throttled_total = 0
+
+    def _sweep(self, now: float) -> None:
+        if now - self._last_sweep < BUCKET_IDLE_SECONDS:
+            return
+        self._last_sweep = now
+        for key in [k for k, b in self._buckets.items() if now - b.updated > BUCKET_IDLE_SECONDS]:
+            del self._buckets[key]
+        for user_key in [u for u, t in self._last_notice.items() if now - t > BUCKET_IDLE_SECONDS]:
+            del self._last_notice[user_key]
+
+    def _allow(self, user_key: tuple[int, int], cost: str, now: float) -> bool:
+        bucket = self._buckets.get((user_key, cost))
+        if bucket is None:
+            rate, burst = self.limits[cost]
+            bucket = self._buckets[(user_key, cost)] = TokenBucket(rate, burst, now)
+        return bucket.take(now)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        user_key = (data["bot"].id, user.id)
+        now = time.monotonic()
+        notify = False
+        with self._lock:
+            self._sweep(now)
+            if self._allow(user_key, action_cost(event), now):
+                allowed = True
+            else:
+                allowed = False
+                self.throttled_total += 1
+                if now - self._last_notice.get(user_key, float("-inf")) >= THROTTLE_NOTICE_INTERVAL:
+                    self._last_notice[user_key] = now
+                    notify = True
+
+        if not allowed:
+            if isinstance(event, CallbackQuery):
+                await event.answer(THROTTLED_TEXT)
+            elif notify and isinstance(event, Message):
+                await event.answer(THROTTLED_TEXT)
+            return None
+
+        return await handler(event, data)
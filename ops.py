@@ -0,0 +1,382 @@
+"""
+Операційний CLI: подивитись на БД і планувальник без sqlite3-шелу.
+
+    python ops.py due [--from 2025-06-01T00:00] [--to ...] [--shard N]
+    python ops.py top [--limit 10]
+    python ops.py sizes
+    python ops.py tick [--at 2025-06-01T09:00]
+    python ops.py replay --from 2025-06-01T00:00 [--to ...] [--rate 5] [--dry-run]
+
+Час — UTC, у форматі ISO. Проходяться всі шарди (або один, --shard).
+
+  due    — скільки нагадувань настане у [from, to) (за замовчуванням —
+           наступна доба) і скільки з них кожного виду; лише активні
+           користувачі й поточні дати подій (річниці далі за збережену
+           дату ДР не рахуються).
+  top    — користувачі з найбільшою кількістю подій.
+  sizes  — розмір таблиць та індексів (dbstat) і кількість рядків.
+  tick   — тік планувальника на момент --at без відправки і без змін у
+           БД: що і кому пішло б, і скільки триває вибірка.
+  replay — нагадування з fire_at у [from, to), які так і не надіслали
+           (бот лежав довше, ніж вікно тіку): шле їх, як тік — дайджестом
+           на користувача, і позначає надісланими. Темп — не більше --rate
+           повідомлень на секунду: ліміт токена в живому боті окремий, а
+           Bot API спільний. --dry-run лише показує, що буде надіслано.
+
+Працює з SQLite-шардами. На Postgres вибірка тіку бере рядки в оренду
+(claimed_until), тож сухий тік там не сухий — ops відмовляється.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from clock import utcnow
+from config import BOT_TOKENS, DB_BACKEND, REMINDER_COALESCE_SECONDS
+from db import (
+    Reminder,
+    archive_events,
+    deactivate_user,
+    get_connection,
+    get_events_to_notify,
+    iter_records,
+    record_deliveries,
+    shard_paths,
+    to_epoch,
+    to_epoch_ms,
+    use_bot,
+    use_shard,
+)
+
+# Вид нагадування → (умова на подію e, її fire_at у секундах epoch).
+# Та сама логіка, що в due_reminder, але на SQL і для довільного вікна
+DUE_KINDS = {
+    "30d": ("e.type = 'birthday' AND e.notified_30d = 0", "e.event_datetime - 2592000"),
+    "7d": ("e.type = 'birthday' AND e.notified_7d = 0", "e.event_datetime - 604800"),
+    "1d": ("e.type = 'birthday' AND e.notified_1d = 0", "e.event_datetime - 86400"),
+    "before": (
+        "e.type <> 'birthday' AND e.remind_before_minutes > 0 AND e.notified_before = 0",
+        "e.event_datetime - e.remind_before_minutes * 60",
+    ),
+    "main": ("e.notified_main = 0", "e.event_datetime"),
+}
+
+REPLAY_RATE = 5
+# Нагадування ближчі до «зараз» ще може взяти живий тік
+REPLAY_MIN_AGE = timedelta(minutes=2)
+# Скільки рядків показувати в tick / replay --dry-run
+SHOW_LIMIT = 50
+
+
+def _shards(shard: int | None) -> list[int]:
+    return list(range(len(shard_paths()))) if shard is None else [shard]
+
+
+def _parse_time(value: str) -> datetime:
+    """ISO-час → naive UTC; без зсуву вважається UTC."""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+# ======================== DUE / TOP / SIZES ============================
+
+def due_counts(lo: datetime, hi: datetime) -> dict[str, int]:
+    """Нагадування поточного шарду з fire_at у [lo, hi) по видах."""
+    conn = get_connection()
+    try:
+        counts = {}
+        for kind, (condition, fire_at) in DUE_KINDS.items():
+            counts[kind] = conn.execute(
+                f"""
+                SELECT COUNT(*)
+                FROM events e
+                JOIN users u ON u.id = e.user_id
+                WHERE u.active = 1 AND {condition}
+                  AND {fire_at} >= ? AND {fire_at} < ?
+                """,
+                (to_epoch(lo), to_epoch(hi)),
+            ).fetchone()[0]
+        counts["snooze"] = conn.execute(
+            "SELECT COUNT(*) FROM snoozes WHERE fire_at >= ? AND fire_at < ?",
+            (to_epoch(lo), to_epoch(hi)),
+        ).fetchone()[0]
+        return counts
+    finally:
+        conn.close()
+
+
+def cmd_due(args) -> int:
+    lo = _parse_time(args.from_) if args.from_ else utcnow()
+    hi = _parse_time(args.to) if args.to else lo + timedelta(days=1)
+    kinds = list(DUE_KINDS) + ["snooze"]
+    print(f"Нагадування з fire_at у [{lo:%Y-%m-%d %H:%M}, {hi:%Y-%m-%d %H:%M}) UTC")
+    print(f"{'шард':>5}" + "".join(f"{k:>9}" for k in kinds) + f"{'усього':>9}")
+    totals = dict.fromkeys(kinds, 0)
+    for shard in _shards(args.shard):
+        with use_shard(shard):
+            counts = due_counts(lo, hi)
+        for kind in kinds:
+            totals[kind] += counts[kind]
+        print(f"{shard:>5}" + "".join(f"{counts[k]:>9}" for k in kinds) + f"{sum(counts.values()):>9}")
+    print(f"{'Σ':>5}" + "".join(f"{totals[k]:>9}" for k in kinds) + f"{sum(totals.values()):>9}")
+    return 0
+
+
+def cmd_top(args) -> int:
+    rows = []
+    for shard in _shards(args.shard):
+        conn = get_connection(shard)
+        try:
+            rows += [
+                (shard, *row) for row in conn.execute(
+                    """
+                    SELECT u.bot_id, u.tg_id, u.username, u.active, COUNT(e.id) AS n
+                    FROM users u
+                    JOIN events e ON e.user_id = u.id
+                    GROUP BY u.id
+                    ORDER BY n DESC
+                    LIMIT ?
+                    """,
+                    (args.limit,),
+                )
+            ]
+        finally:
+            conn.close()
+    rows.sort(key=lambda r: r[-1], reverse=True)
+    print(f"{'подій':>7}{'шард':>6}{'bot_id':>12}{'tg_id':>14}  username")
+    for shard, bot_id, tg_id, username, active, n in rows[:args.limit]:
+        mark = "" if active else "  (неактивний)"
+        print(f"{n:>7}{shard:>6}{bot_id:>12}{tg_id:>14}  {username or '-'}{mark}")
+    return 0
+
+
+def cmd_sizes(args) -> int:
+    for shard in _shards(args.shard):
+        conn = get_connection(shard)
+        try:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            types = dict(conn.execute("SELECT name, type FROM sqlite_master"))
+            sizes = conn.execute(
+                "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY SUM(pgsize) DESC"
+            ).fetchall()
+
+            print(f"Шард {shard}: {shard_paths()[shard]}")
+            print(f"  {page_count * page_size / 2**20:.1f} МБ, вільних сторінок {freelist} із {page_count}")
+            print(f"  {'об’єкт':<36}{'тип':<8}{'КБ':>10}{'рядків':>10}")
+            for name, size in sizes:
+                type_ = types.get(name, "-")
+                rows = ""
+                if type_ == "table" and not name.startswith("sqlite_"):
+                    rows = conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+                print(f"  {name:<36}{type_:<8}{size / 1024:>10.0f}{rows:>10}")
+        finally:
+            conn.close()
+    return 0
+
+
+# ======================== TICK ============================
+
+def cmd_tick(args) -> int:
+    from bot import group_reminders
+
+    at = _parse_time(args.at) if args.at else utcnow()
+    print(f"Сухий тік на {at:%Y-%m-%d %H:%M:%S} UTC (вікно злиття {REMINDER_COALESCE_SECONDS} с)")
+    shown = 0
+    for shard in _shards(args.shard):
+        with use_shard(shard):
+            started = time.perf_counter()
+            items = list(get_events_to_notify(at, REMINDER_COALESCE_SECONDS))
+            query_ms = (time.perf_counter() - started) * 1000
+        groups = group_reminders(items, at)
+        messages = sum(len(user_items) for user_items in groups.values())
+        print(f"Шард {shard}: вибірка {query_ms:.1f} мс, нагадувань {len(items)}, "
+              f"користувачів {len(groups)}, пішло б нагадувань {messages}")
+        for (bot_id, tg_id), user_items in groups.items():
+            for item in user_items:
+                if shown >= SHOW_LIMIT:
+                    break
+                shown += 1
+                print(f"  {bot_id}/{tg_id}  {item.kind:<7}{item.fire_at:%Y-%m-%d %H:%M}  {item.row.title}")
+    if shown >= SHOW_LIMIT:
+        print(f"  … показано перші {SHOW_LIMIT}")
+    return 0
+
+
+# ======================== REPLAY ============================
+
+def missed_reminders(lo: datetime, hi: datetime) -> list[Reminder]:
+    """
+    Ненадіслані нагадування поточного шарду з fire_at у [lo, hi), за
+    fire_at: тоді в межах однієї події відмітки ставляться в тому ж
+    порядку, що й у живих тіках (ДР «main» переносить дату на рік уперед
+    і має йти останнім).
+    """
+    conn = get_connection()
+    try:
+        missed = []
+        for kind, (condition, fire_at) in DUE_KINDS.items():
+            cur = conn.execute(
+                f"""
+                SELECT e.*, u.bot_id, u.tg_id, u.timezone, u.locale
+                FROM events e
+                JOIN users u ON u.id = e.user_id
+                WHERE u.active = 1 AND {condition}
+                  AND {fire_at} >= ? AND {fire_at} < ?
+                """,
+                (to_epoch(lo), to_epoch(hi)),
+            )
+            for row in iter_records(cur):
+                offset = {"30d": 30, "7d": 7, "1d": 1}.get(kind)
+                if offset is not None:
+                    at = row.event_dt - timedelta(days=offset)
+                elif kind == "before":
+                    at = row.event_dt - timedelta(minutes=row.remind_before_minutes)
+                else:
+                    at = row.event_dt
+                missed.append(Reminder(row, kind, at))
+        missed.sort(key=lambda item: item.fire_at)
+        return missed
+    finally:
+        conn.close()
+
+
+async def replay_shard(bots: dict, items: list[Reminder], rate: float, counters: dict) -> None:
+    from aiogram.enums import ParseMode
+
+    from bot import build_digest_texts, finish_reminder, is_permanent_delivery_error
+
+    loop = asyncio.get_running_loop()
+    next_send = loop.time()
+    fired_ids: list[int] = []
+    deliveries: list[tuple] = []
+
+    groups: dict[tuple[int, int], list] = {}
+    for item in items:
+        groups.setdefault((item.row.bot_id, item.row.tg_id), []).append(item)
+
+    for (bot_id, tg_id), user_items in groups.items():
+        bot = bots.get(bot_id)
+        if bot is None:
+            counters["no_bot"] += len(user_items)
+            continue
+        dequeued = utcnow()
+        for text in build_digest_texts(user_items):
+            await asyncio.sleep(max(0.0, next_send - loop.time()))
+            next_send = max(next_send, loop.time()) + 1 / rate
+            try:
+                await bot.send_message(tg_id, text, parse_mode=ParseMode.HTML)
+                counters["messages"] += 1
+            except Exception as e:
+                counters["failed"] += len(user_items)
+                print(f"  {bot_id}/{tg_id}: {type(e).__name__}: {e}", file=sys.stderr)
+                if is_permanent_delivery_error(e):
+                    with use_bot(bot_id):
+                        deactivate_user(tg_id)
+                break
+        else:
+            acked = utcnow()
+            for item in user_items:
+                finish_reminder(item, fired_ids)
+                deliveries.append((
+                    item.row.id, item.row.user_id, item.kind,
+                    to_epoch_ms(item.fire_at), to_epoch_ms(dequeued), to_epoch_ms(acked),
+                ))
+            counters["sent"] += len(user_items)
+
+    record_deliveries(deliveries)
+    if fired_ids:
+        archive_events(fired_ids, utcnow())
+
+
+async def _replay(args, lo: datetime, hi: datetime, counters: dict) -> None:
+    from httpsession import create_bot
+
+    bots = {bot.id: bot for bot in map(create_bot, BOT_TOKENS)}
+    try:
+        for shard in _shards(args.shard):
+            with use_shard(shard):
+                items = missed_reminders(lo, hi)
+                print(f"Шард {shard}: пропущених нагадувань {len(items)}")
+                await replay_shard(bots, items, args.rate, counters)
+    finally:
+        for bot in bots.values():
+            await bot.session.close()
+
+
+def cmd_replay(args) -> int:
+    lo = _parse_time(args.from_)
+    latest = utcnow() - REPLAY_MIN_AGE
+    hi = min(_parse_time(args.to), latest) if args.to else latest
+    if hi <= lo:
+        print("Порожнє вікно: --to має бути пізніше за --from і не ближче "
+              f"{int(REPLAY_MIN_AGE.total_seconds() // 60)} хв до зараз", file=sys.stderr)
+        return 1
+    print(f"Пропущені нагадування з fire_at у [{lo:%Y-%m-%d %H:%M}, {hi:%Y-%m-%d %H:%M}) UTC")
+
+    if args.dry_run:
+        shown = 0
+        for shard in _shards(args.shard):
+            with use_shard(shard):
+                items = missed_reminders(lo, hi)
+            users = {(item.row.bot_id, item.row.tg_id) for item in items}
+            print(f"Шард {shard}: нагадувань {len(items)}, користувачів {len(users)}")
+            for item in items[:max(0, SHOW_LIMIT - shown)]:
+                shown += 1
+                print(f"  {item.row.bot_id}/{item.row.tg_id}  {item.kind:<7}"
+                      f"{item.fire_at:%Y-%m-%d %H:%M}  {item.row.title}")
+        return 0
+
+    counters = {"sent": 0, "messages": 0, "failed": 0, "no_bot": 0}
+    started = time.perf_counter()
+    asyncio.run(_replay(args, lo, hi, counters))
+    elapsed = time.perf_counter() - started
+    print(f"Надіслано нагадувань: {counters['sent']} ({counters['messages']} повідомлень) за {elapsed:.1f} с; "
+          f"помилок: {counters['failed']}, без токена: {counters['no_bot']}")
+    return 1 if counters["failed"] else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Операційний CLI бота")
+    parser.add_argument("--shard", type=int, help="лише цей шард")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_due = sub.add_parser("due", help="скільки нагадувань настане в проміжку, по видах")
+    p_due.add_argument("--from", dest="from_", help="UTC, за замовчуванням — зараз")
+    p_due.add_argument("--to", help="UTC, за замовчуванням — from + доба")
+
+    p_top = sub.add_parser("top", help="користувачі з найбільшою кількістю подій")
+    p_top.add_argument("--limit", type=int, default=10)
+
+    sub.add_parser("sizes", help="розмір таблиць та індексів")
+
+    p_tick = sub.add_parser("tick", help="сухий тік: що пішло б і скільки триває вибірка")
+    p_tick.add_argument("--at", help="UTC, за замовчуванням — зараз")
+
+    p_replay = sub.add_parser("replay", help="дослати пропущені нагадування з обмеженням темпу")
+    p_replay.add_argument("--from", dest="from_", required=True, help="UTC")
+    p_replay.add_argument("--to", help="UTC, за замовчуванням — зараз мінус 2 хв")
+    p_replay.add_argument("--rate", type=float, default=REPLAY_RATE, help="повідомлень на секунду")
+    p_replay.add_argument("--dry-run", action="store_true", help="лише показати")
+    args = parser.parse_args(argv)
+
+    if DB_BACKEND != "sqlite":
+        print("ops працює лише з SQLite (DB_BACKEND=sqlite)", file=sys.stderr)
+        return 1
+
+    commands = {
+        "due": cmd_due,
+        "top": cmd_top,
+        "sizes": cmd_sizes,
+        "tick": cmd_tick,
+        "replay": cmd_replay,
+    }
+    return commands[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
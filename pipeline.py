@@ -0,0 +1,255 @@
+"""
+Обробка оновлень пулом потоків замість одного event loop.
+
+Обробники в bot.py викликають БД синхронно, тож у спільному loop'і
+повільний експорт одного користувача гальмує всіх. Тут:
+
+  * власний цикл getUpdates у головному loop'і кладе оновлення
+    в обмежені черги воркерів;
+  * воркер обирається за id користувача — оновлення одного користувача
+    завжди йдуть в один потік і обробляються по черзі (FSM AddEvent /
+    EditEvent не бачить перестановок), різні користувачі — паралельно;
+  * кожен воркер — окремий потік зі своїм event loop і своїм Bot на
+    кожен токен (aiohttp-сесія прив'язана до loop'а);
+  * кілька ботів (BOT_TOKENS) — по циклу getUpdates на токен, а черги
+    й воркери спільні;
+  * коли черга воркера повна, цикл getUpdates чекає, а Telegram
+    притримує решту оновлень у себе (backpressure);
+  * повторне натискання тієї ж кнопки (користувач, повідомлення, data),
+    поки перше ще в черзі чи обробці, гаситься вже тут: у черзі воно
+    однаково чекало б за першим, тож middleware його б не побачив
+    паралельно.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import GetUpdates
+from aiogram.types import Update
+
+POLLING_TIMEOUT = 30
+RETRY_DELAY_MAX = 30
+
+IN_FLIGHT_TEXT = "⏳ Вже обробляю…"
+
+log = logging.getLogger("pipeline")
+
+
+@dataclass
+class WorkerStats:
+    processed: int = 0
+    failed: int = 0
+    max_depth: int = 0
+    # Сумарний час від отримання оновлення до початку обробки
+    wait_seconds: float = 0.0
+    busy_seconds: float = 0.0
+
+
+@dataclass
+class PipelineStats:
+    received: int = 0
+    # Скільки разів цикл getUpdates чекав на місце в черзі і скільки сумарно
+    backpressure_waits: int = 0
+    backpressure_seconds: float = 0.0
+    # Повторні натискання кнопки, погашені до черги
+    collapsed: int = 0
+    workers: list[WorkerStats] = field(default_factory=list)
+
+
+def update_user_id(update: Update) -> int | None:
+    event = update.event
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    chat = getattr(event, "chat", None)
+    return chat.id if chat is not None else None
+
+
+def in_flight_key(bot_id: int, update: Update) -> tuple[int, int, int, str] | None:
+    """Ключ натискання кнопки: (бот, користувач, повідомлення, data)."""
+    cq = update.callback_query
+    if cq is None or cq.message is None:
+        return None
+    return (bot_id, cq.from_user.id, cq.message.message_id, cq.data or "")
+
+
+class UpdatePipeline:
+    def __init__(
+        self,
+        dp: Dispatcher,
+        tokens: list[str],
+        workers: int,
+        queue_size: int,
+        bot_factory: Callable[[str], Bot] = Bot,
+    ):
+        self.dp = dp
+        self.tokens = tokens
+        # Кожен воркер створює своїх Bot у своєму loop'і
+        self.bot_factory = bot_factory
+        self.queues: list[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.stats = PipelineStats(workers=[WorkerStats() for _ in range(workers)])
+        self._threads: list[threading.Thread] = []
+        # Натискання, що чекають у черзі або обробляються; чистить воркер
+        self._in_flight: set[tuple[int, int, int, str]] = set()
+        self._in_flight_lock = threading.Lock()
+        self._answers: set[asyncio.Task] = set()
+
+    # --------------- Воркери ---------------
+
+    def start(self) -> None:
+        for i in range(len(self.queues)):
+            t = threading.Thread(target=self._worker_thread, args=(i,), name=f"updates-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _worker_thread(self, index: int) -> None:
+        asyncio.run(self._worker(index))
+
+    async def _worker(self, index: int) -> None:
+        bots = {bot.id: bot for bot in map(self.bot_factory, self.tokens)}
+        q = self.queues[index]
+        stats = self.stats.workers[index]
+        try:
+            while True:
+                item = await asyncio.to_thread(q.get)
+                if item is None:
+                    break
+                bot_id, update, received_at, flight_key = item
+                started = time.monotonic()
+                stats.wait_seconds += started - received_at
+                try:
+                    await self.dp.feed_update(bots[bot_id], update)
+                    stats.processed += 1
+                except Exception:
+                    stats.failed += 1
+                    log.exception(
+                        "Помилка обробки оновлення",
+                        extra={
+                            "bot_id": bot_id,
+                            "update_id": update.update_id,
+                            "user_id": update_user_id(update),
+                            "worker": index,
+                        },
+                    )
+                finally:
+                    stats.busy_seconds += time.monotonic() - started
+                    if flight_key is not None:
+                        with self._in_flight_lock:
+                            self._in_flight.discard(flight_key)
+        finally:
+            for bot in bots.values():
+                await bot.session.close()
+
+    def stop(self) -> None:
+        for q in self.queues:
+            q.put(None)
+        for t in self._threads:
+            t.join()
+
+    # --------------- Прийом оновлень ---------------
+
+    def _queue_for(self, update: Update) -> int:
+        user_id = update_user_id(update)
+        if user_id is None:
+            return 0
+        return user_id % len(self.queues)
+
+    async def _enqueue(self, bot: Bot, update: Update) -> None:
+        flight_key = in_flight_key(bot.id, update)
+        if flight_key is not None:
+            with self._in_flight_lock:
+                duplicate = flight_key in self._in_flight
+                if not duplicate:
+                    self._in_flight.add(flight_key)
+            if duplicate:
+                self.stats.collapsed += 1
+                # Відповідь — фоном: цикл getUpdates не чекає на HTTP
+                task = asyncio.create_task(self._answer_in_flight(bot, update.callback_query.id))
+                self._answers.add(task)
+                task.add_done_callback(self._answers.discard)
+                return
+
+        index = self._queue_for(update)
+        q = self.queues[index]
+        item = (bot.id, update, time.monotonic(), flight_key)
+        try:
+            q.put_nowait(item)
+        except queue.Full:
+            self.stats.backpressure_waits += 1
+            waited_from = time.monotonic()
+            await asyncio.to_thread(q.put, item)
+            self.stats.backpressure_seconds += time.monotonic() - waited_from
+        self.stats.received += 1
+        ws = self.stats.workers[index]
+        ws.max_depth = max(ws.max_depth, q.qsize())
+
+    async def _answer_in_flight(self, bot: Bot, callback_query_id: str) -> None:
+        try:
+            await bot.answer_callback_query(callback_query_id, text=IN_FLIGHT_TEXT)
+        except Exception as e:
+            log.warning("Не вдалося відповісти на повторне натискання: %s", e, extra={"bot_id": bot.id})
+
+    async def run_polling(self, bots: list[Bot]) -> None:
+        """
+        Аналог dp.start_polling для кількох ботів: воркери спільні,
+        getUpdates — окремий цикл на кожного.
+        """
+        self.start()
+        try:
+            await asyncio.gather(*(self._poll(bot) for bot in bots))
+        finally:
+            await asyncio.to_thread(self.stop)
+
+    async def _poll(self, bot: Bot) -> None:
+        """
+        Зсув (offset) підтверджуємо лише після того, як оновлення лягло
+        в чергу воркера.
+        """
+        get_updates = GetUpdates(
+            timeout=POLLING_TIMEOUT,
+            allowed_updates=self.dp.resolve_used_update_types(),
+        )
+        request_timeout = int((bot.session.timeout or 0) + POLLING_TIMEOUT)
+        retry_delay = 1
+        while True:
+            try:
+                updates = await bot(get_updates, request_timeout=request_timeout)
+            except Exception as e:
+                log.warning("Помилка getUpdates: %s", e, extra={"bot_id": bot.id, "retry_in": retry_delay})
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, RETRY_DELAY_MAX)
+                continue
+            retry_delay = 1
+
+            for update in updates:
+                await self._enqueue(bot, update)
+                get_updates.offset = update.update_id + 1
+
+    def depths(self) -> list[int]:
+        return [q.qsize() for q in self.queues]
+
+    async def report_loop(self, interval: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            s = self.stats
+            processed = sum(w.processed for w in s.workers)
+            wait = sum(w.wait_seconds for w in s.workers)
+            log.info(
+                "Статистика оновлень",
+                extra={
+                    "received": s.received,
+                    "processed": processed,
+                    "failed": sum(w.failed for w in s.workers),
+                    "queue_depths": self.depths(),
+                    "queue_max_depths": [w.max_depth for w in s.workers],
+                    "avg_wait_seconds": round(wait / processed, 4) if processed else 0,
+                    "backpressure_waits": s.backpressure_waits,
+                    "backpressure_seconds": round(s.backpressure_seconds, 3),
+                    "collapsed": s.collapsed,
+                },
+            )
@@ -0,0 +1,137 @@
+"""
+Офлайн-перерозподіл користувачів між шардами після зміни DB_SHARDS.
+Запускати при зупиненому боті (і бажано після python backup.py create).
+
+    DB_SHARDS=4 python rebalance_shards.py --old-shards 2 --dry-run
+    DB_SHARDS=4 python rebalance_shards.py --old-shards 2
+
+Завдяки rendezvous-хешуванню переїжджає лише частина користувачів.
+Кожен tg_id переноситься однією транзакцією через ATTACH: його рядки
+users (по одному на бота), усі їхні events, events_archive і snoozes
+отримують нові локальні id у шарді призначення, а в старому шарді
+видаляються.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+from config import DB_SHARDS
+from db import init_db, shard_for_tg_id, shard_paths
+
+# Таблиці з даними користувача (колонка user_id → users.id).
+# snoozes.event_id після переносу лишається старим, але відкладення
+# спрацює: назва й час події в ньому скопійовані
+USER_TABLES = ("events", "events_archive", "snoozes")
+
+
+def plan_moves(old_count: int, new_count: int = DB_SHARDS) -> list[tuple[int, int, int]]:
+    """
+    [(tg_id, src_shard, dst_shard), ...] для всіх, хто не на своєму місці.
+    """
+    moves = []
+    for src, path in enumerate(shard_paths(max(old_count, new_count))):
+        if not os.path.exists(path):
+            continue
+        conn = sqlite3.connect(path)
+        try:
+            for (tg_id,) in conn.execute("SELECT DISTINCT tg_id FROM users"):
+                dst = shard_for_tg_id(tg_id, new_count)
+                if dst != src:
+                    moves.append((tg_id, src, dst))
+        finally:
+            conn.close()
+    return moves
+
+
+def _columns(conn, schema: str, table: str) -> list[str]:
+    return [
+        r[1] for r in conn.execute(f"PRAGMA {schema}.table_info({table})")
+        if r[1] != "id"
+    ]
+
+
+def move_user(tg_id: int, src_path: str, dst_path: str) -> int:
+    """
+    Переносить користувачів з цим tg_id (усіх ботів). Повертає кількість
+    перенесених подій.
+    """
+    conn = sqlite3.connect(dst_path)
+    conn.isolation_level = None
+    conn.execute("ATTACH DATABASE ? AS src", (src_path,))
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+
+        old_uids = [r[0] for r in conn.execute("SELECT id FROM src.users WHERE tg_id = ?", (tg_id,))]
+        if not old_uids:
+            conn.execute("ROLLBACK")
+            return 0
+
+        if conn.execute("SELECT 1 FROM main.users WHERE tg_id = ?", (tg_id,)).fetchone():
+            conn.execute("ROLLBACK")
+            raise RuntimeError(f"tg_id={tg_id} вже є в {dst_path}")
+
+        moved_events = 0
+        for old_uid in old_uids:
+            cols = _columns(conn, "main", "users")
+            col_list = ", ".join(cols)
+            conn.execute(
+                f"INSERT INTO main.users ({col_list}) SELECT {col_list} FROM src.users WHERE id = ?",
+                (old_uid,),
+            )
+            new_uid = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+
+            for table in USER_TABLES:
+                cols = [c for c in _columns(conn, "main", table) if c != "user_id"]
+                col_list = ", ".join(cols)
+                cur = conn.execute(
+                    f"""
+                    INSERT INTO main.{table} (user_id, {col_list})
+                    SELECT ?, {col_list} FROM src.{table} WHERE user_id = ?
+                    """,
+                    (new_uid, old_uid),
+                )
+                if table == "events":
+                    moved_events += cur.rowcount
+                conn.execute(f"DELETE FROM src.{table} WHERE user_id = ?", (old_uid,))
+
+            conn.execute("DELETE FROM src.users WHERE id = ?", (old_uid,))
+        conn.execute("COMMIT")
+        return moved_events
+    finally:
+        conn.execute("DETACH DATABASE src")
+        conn.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Перерозподіл користувачів між шардами")
+    parser.add_argument("--old-shards", type=int, required=True, help="скільки шардів було")
+    parser.add_argument("--dry-run", action="store_true", help="лише показати план")
+    args = parser.parse_args(argv)
+
+    moves = plan_moves(args.old_shards)
+    print(f"Шардів: {args.old_shards} → {DB_SHARDS}, користувачів до переносу: {len(moves)}")
+    if args.dry_run:
+        for tg_id, src, dst in moves:
+            print(f"  tg_id={tg_id}: {src} → {dst}")
+        return 0
+
+    # Створює файли нових шардів зі схемою
+    init_db()
+    paths = shard_paths(max(args.old_shards, DB_SHARDS))
+    failed = 0
+    for tg_id, src, dst in moves:
+        try:
+            n = move_user(tg_id, paths[src], paths[dst])
+            print(f"  tg_id={tg_id}: {src} → {dst}, подій: {n}")
+        except (RuntimeError, sqlite3.Error) as e:
+            failed += 1
+            print(f"  tg_id={tg_id}: помилка: {e}", file=sys.stderr)
+
+    for path in paths[DB_SHARDS:]:
+        print(f"Шард {path} більше не використовується — після перевірки його можна видалити.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""
+Програвання розкладу нагадувань у симульованому часі.
+
+Створює окрему тимчасову БД із синтетичними користувачами й подіями.
+Користувачі мають різні часові пояси, з DST і без. Подіями є дні
+народження (серед них 29.02) і разові події з «before». Далі запускає
+справжній reminder_loop на SimulatedClock: тік іде щохвилини розкладу,
+але без очікування. Хвилини, в які гарантовано нічого не настає
+(get_next_fire_at), проскакуються. --every-minute вимикає це і програє
+кожну хвилину.
+
+Бот — заглушка без мережі. Фактичні доставки беруться з delivery_log і
+звіряються з еталонною моделлю, написаною окремо від планувальника:
+  * кожне очікуване нагадування надіслане рівно один раз;
+  * нічого зайвого;
+  * затримка від fire_at — менше хвилини.
+
+    python simulate.py [--users 2000] [--events 5] [--days 365] \\
+        [--start 2028-01-01] [--shards 1] [--seed 1] [--db PATH] [--every-minute]
+
+Код повернення 1, якщо знайдено розбіжності.
+"""
+import argparse
+import asyncio
+import calendar
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from clock import SimulatedClock, SimulationFinished, set_clock
+
+TIMEZONES = ("Europe/Kyiv", "America/New_York", "Australia/Sydney", "Asia/Kolkata", "UTC")
+BIRTHDAY_SHARE = 0.4
+FEB_29_SHARE = 0.02
+BEFORE_MINUTES = (0, 0, 15, 60, 1440)
+# Прикладів кожної розбіжності у звіті
+REPORT_LIMIT = 10
+# reminder_loop тікає на початку кожної хвилини
+TICK_SECONDS = 60
+
+
+class SimBot:
+    """Bot без мережі: send_message лише рахує відправки."""
+
+    def __init__(self, bot_id: int):
+        self.id = bot_id
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent += 1
+
+
+# ======================== ЕТАЛОННА МОДЕЛЬ ============================
+
+def next_anniversary(dt: datetime) -> datetime:
+    """Та сама дата через рік, в UTC; 29.02 у невисокосний рік → 28.02."""
+    year = dt.year + 1
+    if (dt.month, dt.day) == (2, 29) and not calendar.isleap(year):
+        return dt.replace(year=year, day=28)
+    return dt.replace(year=year)
+
+
+def expected_reminders(events, lo: datetime, hi: datetime) -> set[tuple]:
+    """
+    Нагадування з fire_at у (lo, hi]: {(шард, event_id, kind, fire_at)}.
+    events — (шард, event_id, type, event_dt_utc, remind_before_minutes).
+    """
+    expected = set()
+    for shard, event_id, type_, dt, before in events:
+        if type_ == "birthday":
+            occurrence = dt
+            while occurrence - timedelta(days=30) <= hi:
+                for kind, days in (("30d", 30), ("7d", 7), ("1d", 1), ("main", 0)):
+                    fire_at = occurrence - timedelta(days=days)
+                    if lo < fire_at <= hi:
+                        expected.add((shard, event_id, kind, fire_at))
+                occurrence = next_anniversary(occurrence)
+            continue
+        candidates = [("main", dt)]
+        if before:
+            candidates.append(("before", dt - timedelta(minutes=before)))
+        for kind, fire_at in candidates:
+            if lo < fire_at <= hi:
+                expected.add((shard, event_id, kind, fire_at))
+    return expected
+
+
+# ======================== СИНТЕТИЧНА БД ============================
+
+def next_local_date(month: int, day: int, today: date) -> date:
+    """Найближча дата month/day, не раніша за today (29.02 — у високосний рік)."""
+    year = today.year
+    while True:
+        if day <= calendar.monthrange(year, month)[1]:
+            candidate = date(year, month, day)
+            if candidate >= today:
+                return candidate
+        year += 1
+
+
+def populate(rng: random.Random, users: int, events_per_user: int, start: datetime, end: datetime) -> list[tuple]:
+    """
+    Пише користувачів і події напряму, однією транзакцією на шард:
+    add_event комітить кожну подію, і на великій БД наповнення
+    тривало б довше за саме програвання. Тригери FTS спрацьовують
+    як завжди.
+    """
+    from bot import local_to_utc, utc_to_local
+    from db import DEFAULT_BOT_ID, get_connection, shard_for_tg_id, to_epoch
+
+    span = int((end - start).total_seconds())
+    conns = {}
+    events = []
+    for n in range(users):
+        tg_id = 10_000 + n
+        shard = shard_for_tg_id(tg_id)
+        conn = conns.get(shard) or conns.setdefault(shard, get_connection(shard))
+        tz = ZoneInfo(rng.choice(TIMEZONES))
+        today_local = utc_to_local(start, tz).date()
+        user_id = conn.execute(
+            "INSERT INTO users (bot_id, tg_id, timezone) VALUES (?, ?, ?)",
+            (DEFAULT_BOT_ID, tg_id, tz.key),
+        ).lastrowid
+        for i in range(events_per_user):
+            at = datetime.min.time().replace(hour=rng.randrange(24), minute=rng.randrange(60))
+            if rng.random() < BIRTHDAY_SHARE:
+                if rng.random() < FEB_29_SHARE:
+                    month, day = 2, 29
+                else:
+                    month = rng.randint(1, 12)
+                    day = rng.randint(1, calendar.monthrange(2027, month)[1])
+                dt_utc = local_to_utc(datetime.combine(next_local_date(month, day, today_local), at), tz)
+                type_, before = "birthday", 0
+            else:
+                # Разова подія десь у періоді, хвилина в хвилину, як їх вводять
+                dt_local = utc_to_local(start + timedelta(seconds=rng.randrange(span)), tz)
+                dt_utc = local_to_utc(dt_local.replace(second=0, microsecond=0), tz)
+                type_, before = rng.choice(("meeting", "other")), rng.choice(BEFORE_MINUTES)
+            if dt_utc <= start:
+                continue
+            event_id = conn.execute(
+                """
+                INSERT INTO events (
+                    user_id, title, type, category, event_datetime,
+                    remind_before_minutes, repeat_yearly, created_at
+                )
+                VALUES (?, ?, ?, 'other', ?, ?, ?, ?)
+                """,
+                (
+                    user_id, f"Подія {n}.{i}", type_, to_epoch(dt_utc),
+                    before, 1 if type_ == "birthday" else 0, to_epoch(start),
+                ),
+            ).lastrowid
+            events.append((shard, event_id, type_, dt_utc, before))
+    for conn in conns.values():
+        conn.commit()
+        conn.close()
+    return events
+
+
+def delivered_reminders(since: datetime) -> list[tuple]:
+    """Фактичні доставки з delivery_log: (шард, event_id, kind, fire_at, lag_s)."""
+    from db import from_epoch, get_delivery_records, shard_paths, use_shard
+
+    delivered = []
+    for shard in range(len(shard_paths())):
+        with use_shard(shard):
+            for row in get_delivery_records(since):
+                fire_at = from_epoch(row["scheduled_at"] // 1000)
+                lag = (row["acked_at"] - row["scheduled_at"]) / 1000
+                delivered.append((shard, row["event_id"], row["kind"], fire_at, lag))
+    return delivered
+
+
+# ======================== ПРОГРАВАННЯ ============================
+
+def make_fast_forward(start: datetime, shard_count: int):
+    """
+    Наступний тік (на сітці start + k·60 с), у якому може щось настати.
+    Тік у момент now бере fire_at з (now - 60, now].
+    """
+    from db import get_next_fire_at, use_shard
+
+    def fast_forward(now: datetime) -> datetime | None:
+        fire_ats = []
+        for shard in range(shard_count):
+            with use_shard(shard):
+                fire_at = get_next_fire_at(now - timedelta(seconds=TICK_SECONDS))
+            if fire_at is not None:
+                fire_ats.append(fire_at)
+        if not fire_ats:
+            return None
+        ticks = math.ceil((min(fire_ats) - start).total_seconds() / TICK_SECONDS)
+        return start + timedelta(seconds=ticks * TICK_SECONDS)
+
+    return fast_forward
+
+
+async def replay(bots: dict, shards: list[int]) -> None:
+    from bot import reminder_loop
+
+    try:
+        await reminder_loop(bots, shards)
+    except SimulationFinished:
+        pass
+
+
+def run(args) -> int:
+    from db import DEFAULT_BOT_ID, init_db, shard_paths
+
+    # Тіки — на межах хвилин, тож і сітка fast_forward від start теж
+    start = datetime.fromisoformat(args.start).replace(second=0, microsecond=0)
+    end = start + timedelta(days=args.days)
+    shard_count = len(shard_paths())
+    fast_forward = None if args.every_minute else make_fast_forward(start, shard_count)
+    clock = SimulatedClock(start, until=end, fast_forward=fast_forward)
+    set_clock(clock)
+    init_db()
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    events = populate(rng, args.users, args.events, start, end)
+    populate_seconds = time.perf_counter() - started
+
+    # Тіки — start, start+60, ..., end-60: покривають fire_at у (start-60, end-60]
+    last_tick = end - timedelta(seconds=60)
+    expected = expected_reminders(events, start - timedelta(seconds=60), last_tick)
+
+    bot = SimBot(DEFAULT_BOT_ID)
+    started = time.perf_counter()
+    asyncio.run(replay({bot.id: bot}, list(range(shard_count))))
+    replay_seconds = time.perf_counter() - started
+
+    delivered = delivered_reminders(start - timedelta(days=1))
+    counts = Counter(item[:4] for item in delivered)
+    missing = sorted(expected - set(counts), key=lambda r: r[3])
+    unexpected = sorted(set(counts) - expected, key=lambda r: r[3])
+    duplicates = sorted((key for key, n in counts.items() if n > 1), key=lambda r: r[3])
+    late = [item for item in delivered if not 0 <= item[4] < 60]
+    minutes = int((end - start).total_seconds()) // TICK_SECONDS
+
+    print(f"Період: {start:%Y-%m-%d %H:%M} — {end:%Y-%m-%d %H:%M} UTC, {shard_count} шард(ів)")
+    print(f"Тіків: {clock.sleeps} із {minutes} хвилин розкладу")
+    print(f"Користувачів: {args.users}, подій: {len(events)} (створення {populate_seconds:.1f} с)")
+    print(f"Програвання: {replay_seconds:.1f} с, {args.days / replay_seconds:.1f} дн/с, повідомлень: {bot.sent}")
+    by_kind = Counter(item[2] for item in expected)
+    print("Очікується:", len(expected), dict(sorted(by_kind.items())))
+    print(f"Доставлено: {len(delivered)}, макс. затримка {max((d[4] for d in delivered), default=0):.0f} с")
+
+    problems = (
+        ("Не доставлено", missing),
+        ("Зайві", unexpected),
+        ("Повторні", duplicates),
+        ("Затримка поза [0, 60) с", late),
+    )
+    failed = False
+    for label, rows in problems:
+        if not rows:
+            continue
+        failed = True
+        print(f"{label}: {len(rows)}")
+        for row in rows[:REPORT_LIMIT]:
+            print("   ", row)
+    print("Розбіжностей немає ✅" if not failed else "Є розбіжності ❌")
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Програвання розкладу нагадувань у симульованому часі")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=5, help="подій на користувача")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--start", default="2028-01-01", help="UTC; 2028 високосний — з 29.02")
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--every-minute", action="store_true", help="тік на кожну хвилину, без перескоків")
+    parser.add_argument("--db", help="шлях до БД симуляції (має не існувати); за замовчуванням — тимчасова")
+    args = parser.parse_args(argv)
+
+    if args.db and os.path.exists(args.db):
+        parser.error(f"{args.db} вже існує — симуляція пише лише в нову БД")
+    tmp_dir = None if args.db else tempfile.mkdtemp(prefix="simulate-")
+    # config читає оточення при імпорті, тож db і bot імпортуються вже після цього
+    os.environ["DB_PATH"] = args.db or os.path.join(tmp_dir, "simulate.db")
+    os.environ["DB_SHARDS"] = str(args.shards)
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ.setdefault("BOT_TOKEN", "1:simulate")
+    try:
+        return run(args)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
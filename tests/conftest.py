@@ -0,0 +1,16 @@
+"""
+Спільне для тестів: config читає оточення при імпорті, тож змінні
+ставляться до першого імпорту модулів бота, а БД — тимчасова.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="bot-tests-")
+os.environ.setdefault("BOT_TOKEN", "1:test")
+os.environ["DB_PATH"] = os.path.join(_tmp, "test.db")
+os.environ["DB_SHARDS"] = "1"
+os.environ.setdefault("TZ_GRID_PATH", os.path.join(_tmp, "tzgrid.bin"))
@@ -0,0 +1,163 @@
+from datetime import date, datetime, time
+
+import pytest
+
+from dtparse import parse_date, parse_datetime, parse_time
+
+# Понеділок, 19.10.2026 14:00 — від нього рахуються відносні форми
+NOW = datetime(2026, 10, 19, 14, 0)
+TODAY = NOW.date()
+
+
+def dt(*args) -> datetime:
+    return datetime(*args)
+
+
+DATETIME_CASES = [
+    # Числові формати
+    ("2026-11-22 18:00", dt(2026, 11, 22, 18, 0)),
+    ("2026/11/22 18:00", dt(2026, 11, 22, 18, 0)),
+    ("2026.11.22 18:00", dt(2026, 11, 22, 18, 0)),
+    ("22.11.2026 18:00", dt(2026, 11, 22, 18, 0)),
+    ("22-11-2026 18:00", dt(2026, 11, 22, 18, 0)),
+    ("22/11/2026 18:00", dt(2026, 11, 22, 18, 0)),
+    ("22.11.26 18:00", dt(2026, 11, 22, 18, 0)),
+    ("22.11 18:00", dt(2026, 11, 22, 18, 0)),
+    ("22/11 18:00", dt(2026, 11, 22, 18, 0)),
+    ("22.11", dt(2026, 11, 22, 9, 0)),
+    ("1.01 10:00", dt(2027, 1, 1, 10, 0)),
+    ("19.10 13:00", dt(2027, 10, 19, 13, 0)),
+    ("19.10 15:00", dt(2026, 10, 19, 15, 0)),
+    ("18:00", dt(2026, 10, 19, 18, 0)),
+    ("9,15", dt(2026, 10, 20, 9, 15)),
+    ("1830", dt(2026, 10, 19, 18, 30)),
+    ("13:59", dt(2026, 10, 20, 13, 59)),
+    ("18.30", dt(2026, 10, 19, 18, 30)),
+    ("9.05", dt(2027, 5, 9, 9, 0)),
+    # «о» / «в» перед H.MM — це час
+    ("о 9.05", dt(2026, 10, 20, 9, 5)),
+    ("в 9.05", dt(2026, 10, 20, 9, 5)),
+    ("у 9.05", dt(2026, 10, 20, 9, 5)),
+    ("об 11.30", dt(2026, 10, 20, 11, 30)),
+    ("о 23.59", dt(2026, 10, 19, 23, 59)),
+    ("о 18", dt(2026, 10, 19, 18, 0)),
+    ("о 9.05 завтра", dt(2026, 10, 20, 9, 5)),
+    ("на 9.05", dt(2027, 5, 9, 9, 0)),
+    ("22.11 о 9.05", dt(2026, 11, 22, 9, 5)),
+    # Відносні дні
+    ("сьогодні", dt(2026, 10, 19, 9, 0)),
+    ("сьогодні о 18", dt(2026, 10, 19, 18, 0)),
+    ("завтра", dt(2026, 10, 20, 9, 0)),
+    ("завтра о 18", dt(2026, 10, 20, 18, 0)),
+    ("Завтра о 18:30", dt(2026, 10, 20, 18, 30)),
+    ("завтра о 7 вечора", dt(2026, 10, 20, 19, 0)),
+    ("післязавтра о 10", dt(2026, 10, 21, 10, 0)),
+    # «через»
+    ("через 2 години", dt(2026, 10, 19, 16, 0)),
+    ("через годину", dt(2026, 10, 19, 15, 0)),
+    ("через півгодини", dt(2026, 10, 19, 14, 30)),
+    ("через 15 хв", dt(2026, 10, 19, 14, 15)),
+    ("через 15 хвилин", dt(2026, 10, 19, 14, 15)),
+    ("через 3 дні", dt(2026, 10, 22, 14, 0)),
+    ("через 3 дні о 10:00", dt(2026, 10, 22, 10, 0)),
+    ("через добу", dt(2026, 10, 20, 14, 0)),
+    ("через тиждень", dt(2026, 10, 26, 14, 0)),
+    ("через 2 тижні о 9", dt(2026, 11, 2, 9, 0)),
+    ("через 500 тижнів", dt(2036, 5, 19, 14, 0)),
+    # Дні тижня
+    ("в п'ятницю", dt(2026, 10, 23, 9, 0)),
+    ("в п’ятницю о 18", dt(2026, 10, 23, 18, 0)),
+    ("у пʼятницю о 18.30", dt(2026, 10, 23, 18, 30)),
+    ("в понеділок о 15", dt(2026, 10, 19, 15, 0)),
+    ("в понеділок о 10", dt(2026, 10, 26, 10, 0)),
+    ("наступного понеділка о 15", dt(2026, 10, 26, 15, 0)),
+    ("в неділю", dt(2026, 10, 25, 9, 0)),
+    ("у середу о 2 дня", dt(2026, 10, 21, 14, 0)),
+    ("в суботу опівдні", dt(2026, 10, 24, 12, 0)),
+    # Назви місяців
+    ("10 травня", dt(2027, 5, 10, 9, 0)),
+    ("10 травня о 8 ранку", dt(2027, 5, 10, 8, 0)),
+    ("25 грудня о 18:00", dt(2026, 12, 25, 18, 0)),
+    ("1 листопада 2027 о 12", dt(2027, 11, 1, 12, 0)),
+    # Частини доби
+    ("о 7 вечора", dt(2026, 10, 19, 19, 0)),
+    ("о 7 ранку", dt(2026, 10, 20, 7, 0)),
+    ("о 12 ночі", dt(2026, 10, 20, 0, 0)),
+    ("о 2 дня", dt(2026, 10, 20, 14, 0)),
+    ("опівдні", dt(2026, 10, 20, 12, 0)),
+    ("опівночі", dt(2026, 10, 20, 0, 0)),
+    # Не розбирається — краще перепитати
+    ("", None),
+    ("колись", None),
+    ("завтра о 25", None),
+    ("о 13 вечора", None),
+    ("вечора", None),
+    ("32.01.2027 10:00", None),
+    ("30.02 10:00", None),
+    ("29 лютого", None),
+    ("завтра в п'ятницю", None),
+    ("через 2 години о 10", None),
+    ("через 3 дні 22.11", None),
+    ("наступного о 10", None),
+    ("18:00 19:00", None),
+    ("12345", None),
+    # Завеликий зсув — не падіння, а None
+    ("через 9999999 днів", None),
+    ("через 99999999999999 хв", None),
+    ("через 11 років", None),
+    ("через 600 тижнів", None),
+    ("22.11.2026 22.11.2026", None),
+]
+
+
+@pytest.mark.parametrize("text, expected", DATETIME_CASES)
+def test_parse_datetime(text, expected):
+    assert parse_datetime(text, NOW) == expected
+
+
+TIME_CASES = [
+    ("18:00", time(18, 0)),
+    ("9:05", time(9, 5)),
+    ("18.30", time(18, 30)),
+    ("9,15", time(9, 15)),
+    ("0830", time(8, 30)),
+    ("8", time(8, 0)),
+    ("о 7 вечора", time(19, 0)),
+    ("о 9.05", time(9, 5)),
+    ("опівдні", time(12, 0)),
+    ("24:00", None),
+    ("18:60", None),
+    ("завтра о 18", None),
+    ("10 травня", None),
+    ("abc", None),
+]
+
+
+@pytest.mark.parametrize("text, expected", TIME_CASES)
+def test_parse_time(text, expected):
+    assert parse_time(text) == expected
+
+
+DATE_CASES = [
+    ("1999-05-10", date(1999, 5, 10)),
+    ("10.05.1999", date(1999, 5, 10)),
+    ("10/05/1999", date(1999, 5, 10)),
+    ("10 травня 1999", date(1999, 5, 10)),
+    ("29.02.2000", date(2000, 2, 29)),
+    # Дворядковий рік — у минулому
+    ("10.05.99", date(1999, 5, 10)),
+    ("10.05.05", date(2005, 5, 10)),
+    ("10.05.26", date(2026, 5, 10)),
+    ("10.05.27", date(1927, 5, 10)),
+    ("29.02.01", None),
+    ("10.05", None),
+    ("10 травня", None),
+    ("завтра", None),
+    ("10.05.1999 18:00", None),
+    ("31.04.1999", None),
+]
+
+
+@pytest.mark.parametrize("text, expected", DATE_CASES)
+def test_parse_date(text, expected):
+    assert parse_date(text, TODAY) == expected
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+from aiogram.types import Update
+
+from pipeline import IN_FLIGHT_TEXT, UpdatePipeline
+
+
+class FakeBot:
+    def __init__(self, token: str = "1:test"):
+        self.id = 1
+        self.answers: list[tuple[str, str]] = []
+        self.session = self
+
+    async def close(self):
+        pass
+
+    async def answer_callback_query(self, callback_query_id, text=None):
+        self.answers.append((callback_query_id, text))
+
+
+class SlowDispatcher:
+    """feed_update чекає, поки тест не відпустить обробку."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.fed: list[int] = []
+
+    async def feed_update(self, bot, update):
+        self.fed.append(update.update_id)
+        await asyncio.to_thread(self.release.wait)
+
+
+def callback_update(update_id: int, data: str, message_id: int = 10) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": f"cq{update_id}",
+            "from": {"id": 42, "is_bot": False, "first_name": "U"},
+            "chat_instance": "ci",
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": 0,
+                "chat": {"id": 42, "type": "private"},
+            },
+        },
+    })
+
+
+def test_duplicate_callback_is_collapsed_before_queue():
+    dp = SlowDispatcher()
+    pipeline = UpdatePipeline(dp, ["1:test"], workers=1, queue_size=10, bot_factory=FakeBot)
+    bot = FakeBot()
+
+    async def run():
+        await pipeline._enqueue(bot, callback_update(1, "menu_list"))
+        await pipeline._enqueue(bot, callback_update(2, "menu_list"))
+        # Інша кнопка чи інше повідомлення — не дублікат
+        await pipeline._enqueue(bot, callback_update(3, "menu_add"))
+        await pipeline._enqueue(bot, callback_update(4, "menu_list", message_id=11))
+        await asyncio.gather(*pipeline._answers)
+
+    asyncio.run(run())
+    assert pipeline.stats.collapsed == 1
+    assert pipeline.stats.received == 3
+    assert bot.answers == [("cq2", IN_FLIGHT_TEXT)]
+
+    # Після обробки та сама кнопка знову доходить до обробника
+    pipeline.start()
+    dp.release.set()
+    pipeline.stop()
+    assert dp.fed == [1, 3, 4]
+    assert not pipeline._in_flight
+
+    asyncio.run(pipeline._enqueue(bot, callback_update(5, "menu_list")))
+    assert pipeline.stats.received == 4
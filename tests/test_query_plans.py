@@ -0,0 +1,124 @@
+"""
+Плани запитів списків подій користувача (SQLite): кожен іде індексом
+idx_events_user_dt або idx_events_user_type_cat_dt і не сортує у
+тимчасовому B-дереві. SQL береться з самих методів сховища через
+trace callback, тож тест ламається разом із запитом, а не з копією.
+"""
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import db
+from db import SQLiteStorage
+
+USER_INDEXES = ("idx_events_user_dt", "idx_events_user_type_cat_dt")
+
+QUERIES = {
+    "get_user_events": lambda s, uid: s.get_user_events(uid),
+    "get_user_birthdays": lambda s, uid: s.get_user_birthdays(uid),
+    "get_user_events_by_category": lambda s, uid: s.get_user_events_by_category(uid, "work"),
+    "get_user_birthdays_by_category": lambda s, uid: s.get_user_birthdays_by_category(uid, "family"),
+}
+
+
+def _build_db(path: str, analyzed: bool, monkeypatch) -> None:
+    monkeypatch.setattr(db, "DB_PATH", path)
+    SQLiteStorage().init_db()
+    if not analyzed:
+        return
+    # Реалістичний розподіл: багато користувачів, у кожного кілька
+    # категорій і частка днів народження
+    rng = random.Random(1)
+    start = datetime(2031, 1, 1)
+    conn = db.get_connection()
+    conn.executemany(
+        "INSERT INTO users (bot_id, tg_id, username) VALUES (?, ?, 'u')",
+        [(db.DEFAULT_BOT_ID, tg_id) for tg_id in range(1, 301)],
+    )
+    conn.executemany(
+        """
+        INSERT INTO events (user_id, title, type, category, event_datetime, created_at)
+        VALUES (?, 'e', ?, ?, ?, 0)
+        """,
+        [
+            (
+                rng.randint(1, 300),
+                "birthday" if rng.random() < 0.3 else "event",
+                rng.choice(("work", "family", "health", "other")),
+                db.to_epoch(start + timedelta(minutes=rng.randint(0, 525_600))),
+            )
+            for _ in range(20_000)
+        ],
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+@pytest.fixture(scope="module")
+def databases(tmp_path_factory):
+    paths = {}
+    with pytest.MonkeyPatch.context() as mp:
+        for label, analyzed in (("без статистики", False), ("після ANALYZE", True)):
+            paths[label] = str(tmp_path_factory.mktemp("plans") / "plans.db")
+            _build_db(paths[label], analyzed, mp)
+    return paths
+
+
+@pytest.fixture(params=["без статистики", "після ANALYZE"])
+def storage(request, databases, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", databases[request.param])
+    return SQLiteStorage()
+
+
+def query_plan(monkeypatch, storage, call) -> list[str]:
+    """Виконує метод сховища і повертає EXPLAIN QUERY PLAN його SELECT."""
+    statements = []
+    connect = db.get_connection
+
+    def traced(shard=None):
+        conn = connect(shard)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(db, "get_connection", traced)
+    call(storage, 1)
+    monkeypatch.setattr(db, "get_connection", connect)
+
+    selects = [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 1, statements
+    conn = sqlite3.connect(db.DB_PATH)
+    try:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + selects[0])]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_user_lists_use_index_without_sort(monkeypatch, storage, name):
+    plan = query_plan(monkeypatch, storage, QUERIES[name])
+    assert any(index in step for step in plan for index in USER_INDEXES), plan
+    assert not any("USE TEMP B-TREE" in step for step in plan), plan
+    assert not any(step.startswith("SCAN events") for step in plan), plan
+
+
+def test_by_category_walks_user_dt_index(monkeypatch, storage):
+    """
+    Категорія без типу не дає пройти idx_events_user_type_cat_dt далі за
+    user_id (type стоїть між ними) — довелося б сортувати. Тому запит
+    іде idx_events_user_dt у порядку event_datetime, а category
+    перевіряється на кожному рядку користувача. Так і задумано: подій
+    у користувача небагато, а окремий індекс (user_id, category,
+    event_datetime) лише для цього списку не окупає запису.
+    """
+    plan = query_plan(monkeypatch, storage, QUERIES["get_user_events_by_category"])
+    assert plan == ["SEARCH events USING INDEX idx_events_user_dt (user_id=?)"]
+
+
+def test_birthdays_by_category_seeks_full_prefix(monkeypatch, storage):
+    plan = query_plan(monkeypatch, storage, QUERIES["get_user_birthdays_by_category"])
+    assert plan == [
+        "SEARCH events USING INDEX idx_events_user_type_cat_dt (user_id=? AND type=? AND category=?)"
+    ]
@@ -0,0 +1,354 @@
+"""
+Контракт Storage: ті самі сценарії проти SQLiteStorage і PostgresStorage.
+
+Postgres — лише з PG_DSN на одноразову базу (таблиці очищаються перед
+кожним тестом), інакше його варіанти пропускаються:
+
+    PG_DSN=postgresql://postgres@localhost/bot_test python -m pytest tests/test_storage.py
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import db
+from clock import utcnow
+from db import READ_BATCH_SIZE, SQLiteStorage, to_epoch, use_bot
+
+PG_DSN = os.environ.get("PG_DSN")
+
+# Хвилина, кратна 60 с, далеко від реального часу
+NOW = datetime(2031, 3, 10, 12, 0)
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def storage(request, tmp_path, monkeypatch):
+    if request.param == "sqlite":
+        monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "contract.db"))
+        s = SQLiteStorage()
+        s.init_db()
+        yield s
+        return
+
+    if not PG_DSN:
+        pytest.skip("PG_DSN не задано")
+    pytest.importorskip("asyncpg")
+    from db_postgres import PostgresStorage
+
+    s = PostgresStorage(PG_DSN, 1, 4)
+    s.init_db()
+    s._execute(
+        "TRUNCATE users, events, events_archive, delivery_log, snoozes, maintenance_log "
+        "RESTART IDENTITY CASCADE"
+    )
+    yield s
+    s._run(s._get_pool().close())
+
+
+def postgres_only(storage):
+    if isinstance(storage, SQLiteStorage):
+        pytest.skip("лише Postgres")
+
+
+def add(storage, user_id, title="Подія", at=NOW, **kwargs):
+    kwargs.setdefault("type_", "event")
+    kwargs.setdefault("category", "work")
+    return storage.add_event(user_id, title, event_dt_utc=at, **kwargs)
+
+
+def due(storage, now=NOW, lookahead=0):
+    return sorted(((r.row.id, r.kind) for r in storage.get_events_to_notify(now, lookahead)))
+
+
+# ======================== USERS ============================
+
+def test_users(storage):
+    uid = storage.get_or_create_user(100, "u")
+    assert storage.get_or_create_user(100, "u") == uid
+    with use_bot(db.DEFAULT_BOT_ID + 1):
+        assert storage.get_or_create_user(100, "u") != uid
+
+    storage.set_user_timezone(uid, "Europe/Kyiv")
+    storage.set_user_locale(uid, "uk")
+    assert storage.get_user_timezone(uid) == "Europe/Kyiv"
+    assert storage.get_user_locale(uid) == "uk"
+
+
+def test_deactivate_parks_events_and_reactivate_rolls_yearly(storage):
+    uid = storage.get_or_create_user(101, "u")
+    add(storage, uid, at=NOW)
+    past_birthday = (utcnow() - timedelta(days=3)).replace(microsecond=0)
+    bday = add(storage, uid, "ДР", at=past_birthday, type_="birthday", repeat_yearly=True)
+
+    assert storage.deactivate_user(101) == 2
+    assert storage.deactivate_user(101) == 0
+    assert due(storage) == []
+
+    assert storage.reactivate_user(uid) is True
+    assert storage.reactivate_user(uid) is False
+    moved = storage.get_event_by_id(uid, bday)
+    assert moved.event_dt > utcnow()
+    assert (moved.event_dt.month, moved.event_dt.day) == (past_birthday.month, past_birthday.day)
+    assert due(storage) != []
+
+
+# ======================== EVENTS ============================
+
+def test_reads_order_and_filters(storage):
+    uid = storage.get_or_create_user(102, "u")
+    later = add(storage, uid, "Пізніше", at=NOW + timedelta(days=2), category="home")
+    first = add(storage, uid, "Раніше", at=NOW + timedelta(days=1))
+    bday = add(storage, uid, "ДР", at=NOW + timedelta(days=3), type_="birthday", category="family")
+
+    assert [e.id for e in storage.get_user_events(uid)] == [first, later, bday]
+    assert [e.id for e in storage.get_user_events_by_category(uid, "home")] == [later]
+    assert [e.id for e in storage.get_user_birthdays(uid)] == [bday]
+    assert [e.id for e in storage.get_user_birthdays_by_category(uid, "family")] == [bday]
+    assert storage.get_user_birthdays_by_category(uid, "home") == []
+    assert storage.get_event_by_id(uid, first).title == "Раніше"
+    assert storage.get_event_by_id(uid + 1, first) is None
+
+
+def test_iter_user_events_crosses_batches(storage):
+    uid = storage.get_or_create_user(103, "u")
+    total = READ_BATCH_SIZE + 7
+    # Однаковий час у частини подій — keyset має йти ще й по id
+    for i in range(total):
+        add(storage, uid, f"e{i}", at=NOW + timedelta(minutes=i // 3))
+
+    rows = list(storage.iter_user_events(uid))
+    assert len(rows) == total
+    assert len({r.id for r in rows}) == total
+    assert [(r.event_datetime, r.id) for r in rows] == sorted((r.event_datetime, r.id) for r in rows)
+    assert len(list(storage.iter_events())) == total
+
+
+def test_search(storage):
+    uid = storage.get_or_create_user(104, "u")
+    add(storage, uid, "Зустріч з командою")
+    add(storage, uid, "Стоматолог")
+    found, more = storage.search_user_events(uid, "зустр")
+    assert [e.title for e in found] == ["Зустріч з командою"]
+    assert more is False
+
+
+def test_updates_and_bulk(storage):
+    uid = storage.get_or_create_user(105, "u")
+    a = add(storage, uid, "a", category="work")
+    b = add(storage, uid, "b", category="work")
+    c = add(storage, uid, "c", category="home")
+
+    storage.update_event_title(a, "A")
+    storage.update_event_remind_before(a, 15)
+    assert storage.get_event_by_id(uid, a).title == "A"
+    assert storage.get_event_by_id(uid, a).remind_before_minutes == 15
+
+    assert storage.move_events_category(uid, "work", "study") == 2
+    assert storage.delete_events_in_category(uid, "home") == 1
+    assert storage.shift_events(uid, 2, ZoneInfo("UTC")) == 2
+    assert storage.get_event_by_id(uid, b).event_dt == NOW + timedelta(days=2)
+    assert storage.delete_events(uid, [a, c, 10**9]) == 1
+    assert storage.delete_event(uid, b) is True
+    assert storage.get_user_events(uid) == []
+
+
+def test_shift_keeps_local_time_across_dst(storage):
+    # Київ переходить на літній час 30.03.2031: 12:00 EET → 12:00 EEST
+    uid = storage.get_or_create_user(110, "u")
+    kyiv = ZoneInfo("Europe/Kyiv")
+    a = add(storage, uid, "a", at=datetime(2031, 3, 28, 10, 0))
+    b = add(storage, uid, "b", at=datetime(2031, 3, 20, 10, 0))
+
+    assert storage.shift_events(uid, 7, kyiv) == 2
+    assert storage.get_event_by_id(uid, a).event_dt == datetime(2031, 4, 4, 9, 0)
+    assert storage.get_event_by_id(uid, b).event_dt == datetime(2031, 3, 27, 10, 0)
+
+    assert storage.shift_events(uid, -7, kyiv) == 2
+    assert storage.get_event_by_id(uid, a).event_dt == datetime(2031, 3, 28, 10, 0)
+
+
+# ======================== ПЛАНУВАЛЬНИК ============================
+
+def test_due_reminders_and_mark_notified(storage):
+    uid = storage.get_or_create_user(106, "u")
+    main = add(storage, uid, "main", at=NOW)
+    before = add(storage, uid, "before", at=NOW + timedelta(minutes=30), remind_before_minutes=30)
+    bday = add(storage, uid, "ДР", at=NOW + timedelta(days=7), type_="birthday", repeat_yearly=True)
+    add(storage, uid, "пізніше", at=NOW + timedelta(hours=5))
+
+    assert due(storage) == sorted([(main, "main"), (before, "before"), (bday, "7d")])
+
+    storage.mark_notified(main, "main", False)
+    storage.mark_notified(before, "before", False)
+    storage.mark_notified(bday, "7d", True)
+    assert due(storage, NOW + timedelta(seconds=59)) == []
+
+
+def test_window_starts_at_previous_tick(storage):
+    uid = storage.get_or_create_user(113, "u")
+    ids = [add(storage, uid, f"m{i}", at=NOW - timedelta(minutes=i)) for i in range(4)]
+
+    # Попередній тік був 3 хв тому: (since, now] підхоплює проміжок,
+    # а m3 (рівно since) належав попередньому тіку
+    found = sorted(r.row.id for r in storage.get_events_to_notify(NOW, 0, NOW - timedelta(minutes=3)))
+    assert found == sorted(ids[:3])
+
+
+def test_birthday_main_rolls_over_in_transaction(storage):
+    uid = storage.get_or_create_user(107, "u")
+    bday = add(storage, uid, "ДР", at=NOW, type_="birthday", repeat_yearly=True)
+    storage.mark_notified(bday, "7d", True)
+    storage.mark_notified(bday, "main", True)
+
+    row = storage.get_event_by_id(uid, bday)
+    assert row.event_dt == NOW.replace(year=NOW.year + 1)
+    assert (row.notified_7d, row.notified_main) == (0, 0)
+
+
+def test_next_fire_at(storage):
+    uid = storage.get_or_create_user(108, "u")
+    add(storage, uid, at=NOW + timedelta(hours=2), remind_before_minutes=60)
+    assert storage.get_next_fire_at(NOW) == NOW + timedelta(hours=1)
+    assert storage.get_next_fire_at(NOW + timedelta(hours=3)) is None
+
+
+def test_claim_lease(storage):
+    postgres_only(storage)
+    from db_postgres import CLAIM_SECONDS
+
+    uid = storage.get_or_create_user(109, "u")
+    eid = add(storage, uid, at=NOW)
+
+    assert due(storage) == [(eid, "main")]
+    # Оренда: поки вона триває, інший тік рядка не бачить
+    assert due(storage, NOW + timedelta(seconds=CLAIM_SECONDS - 1)) == []
+    # Не надіслане за час оренди повертається
+    assert due(storage, NOW + timedelta(seconds=CLAIM_SECONDS)) == [(eid, "main")]
+
+    # mark_notified знімає оренду
+    storage.mark_notified(eid, "before", False)
+    claimed = storage._fetchval("SELECT claimed_until FROM events WHERE id = $1", eid)
+    assert claimed == 0
+
+
+def test_claim_skip_locked_splits_rows_between_workers(storage):
+    postgres_only(storage)
+    uid = storage.get_or_create_user(110, "u")
+    ids = {add(storage, uid, f"e{i}", at=NOW) for i in range(200)}
+
+    results = [None] * 4
+    barrier = threading.Barrier(len(results))
+
+    def worker(i):
+        barrier.wait()
+        results[i] = [r.row.id for r in storage.get_events_to_notify(NOW)]
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(results))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    claimed = [eid for batch in results for eid in batch]
+    assert len(claimed) == len(set(claimed))
+    assert set(claimed) == ids
+
+
+def test_transaction_on_fresh_pool(storage):
+    """Перша операція нового сховища — транзакція: пул не створюється з loop'а."""
+    postgres_only(storage)
+    from db_postgres import PostgresStorage
+
+    fresh = PostgresStorage(PG_DSN, 1, 2)
+    done = threading.Event()
+
+    def run():
+        fresh.record_deliveries([(1, 1, "main", 1, 2, 3)])
+        done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    assert done.wait(10), "_transaction завис на створенні пулу"
+    fresh._run(fresh._get_pool().close())
+
+
+def test_transaction_rolls_back(storage):
+    postgres_only(storage)
+
+    async def fail(conn):
+        await conn.execute("INSERT INTO delivery_log (event_id, user_id, kind, scheduled_at, dequeued_at, acked_at) VALUES (1, 1, 'main', 1, 2, 3)")
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        storage._transaction(fail)
+    assert storage._fetchval("SELECT COUNT(*) FROM delivery_log") == 0
+
+
+# ======================== АРХІВ І ДОСТАВКИ ============================
+
+def test_archive(storage):
+    uid = storage.get_or_create_user(111, "u")
+    ids = [add(storage, uid, f"e{i}", at=NOW + timedelta(minutes=i)) for i in range(3)]
+    assert storage.archive_events(ids[:2], NOW) == 2
+    assert storage.archive_events(ids[:2], NOW) == 0
+    assert [e.id for e in storage.get_user_events(uid)] == [ids[2]]
+    archived = storage.get_user_archived_events(uid)
+    assert [e.id for e in archived] == [ids[1], ids[0]]
+    assert archived[0].archive_month == NOW.year * 100 + NOW.month
+    assert [e.id for e in storage.get_user_archived_events(uid, limit=1)] == [ids[1]]
+
+
+def test_delivery_log(storage):
+    ms = to_epoch(NOW) * 1000
+    storage.record_deliveries([(1, 1, "main", ms, ms + 10, ms + 20), (2, 1, "before", ms, ms + 10, ms + 30)])
+    rows = storage.get_delivery_records(NOW)
+    assert [(r["event_id"], r["kind"]) for r in rows] == [(1, "main"), (2, "before")]
+
+
+# ======================== SNOOZE ============================
+
+def test_snooze_from_events_and_archive(storage):
+    uid = storage.get_or_create_user(112, "u")
+    live = add(storage, uid, "live")
+    gone = add(storage, uid, "gone")
+    storage.archive_events([gone], NOW)
+    fire_at = NOW + timedelta(minutes=10)
+
+    s = storage.snooze_event(uid, live, fire_at)
+    assert (s["event_id"], s["title"], s["fire_at"], s["tg_id"]) == (live, "live", to_epoch(fire_at), 112)
+    assert storage.snooze_event(uid, gone, fire_at)["title"] == "gone"
+    assert storage.snooze_event(uid, 10**9, fire_at) is None
+    assert storage.snooze_event(uid + 1, live, fire_at) is None
+
+    # Повторне відкладення оновлює час, а не додає рядок
+    later = fire_at + timedelta(hours=1)
+    storage.snooze_event(uid, live, later)
+    snoozes = storage.get_snoozes()
+    assert sorted((s["event_id"], s["fire_at"]) for s in snoozes) == sorted(
+        [(live, to_epoch(later)), (gone, to_epoch(fire_at))]
+    )
+
+    assert storage.delete_snooze(uid, live, fire_at) is False
+    assert storage.delete_snooze(uid, live, later) is True
+
+    storage.deactivate_user(112)
+    assert storage.get_snoozes() == []
+
+
+# ======================== ОБСЛУГОВУВАННЯ ============================
+
+def test_run_maintenance(storage):
+    old = to_epoch(utcnow() - timedelta(days=db.DELIVERY_LOG_RETENTION_DAYS + 1)) * 1000
+    fresh = to_epoch(utcnow()) * 1000
+    storage.record_deliveries([(1, 1, "main", old, old, old), (2, 1, "main", fresh, fresh, fresh)])
+
+    stats = storage.run_maintenance(5.0)
+    assert set(stats) == {
+        "started_at", "duration_ms", "file_size", "page_count", "freelist_count",
+        "free_ratio", "pages_vacuumed", "wal_frames", "wal_checkpointed", "analyzed",
+    }
+    for key, value in stats.items():
+        assert type(value) is (float if key == "free_ratio" else int), key
+    assert stats["analyzed"] == 1
+    assert [r["event_id"] for r in storage.get_delivery_records(datetime(1970, 1, 1))] == [2]
@@ -0,0 +1,37 @@
+"""
+Варіанти поясів без сітки кордонів (tzlocate.timezone_suggestions): лише
+опорні точки zone1970.tab системної tzdata. Без неї тести пропускаються.
+"""
+import pytest
+
+import tzlocate
+
+pytestmark = pytest.mark.skipif(not tzlocate.load_reference_points(), reason="немає zone1970.tab")
+
+# місто, координати, мають бути серед варіантів, не має бути
+CASES = [
+    ("Одеса", (46.48, 30.72), {"Europe/Kyiv", "Europe/Chisinau"}, {"Europe/Simferopol", "Europe/Bucharest"}),
+    ("Львів", (49.84, 24.03), {"Europe/Kyiv", "Europe/Warsaw"}, set()),
+    ("Харків", (49.99, 36.23), {"Europe/Kyiv"}, {"Europe/Simferopol"}),
+    ("Сімферополь", (44.95, 34.10), {"Europe/Moscow", "Europe/Kyiv"}, {"Europe/Simferopol"}),
+    ("Копенгаген", (55.68, 12.57), {"Europe/Berlin"}, set()),
+    ("Сідней", (-33.87, 151.21), {"Australia/Sydney"}, set()),
+]
+
+
+@pytest.mark.parametrize("city, point, present, absent", CASES, ids=[case[0] for case in CASES])
+def test_suggestions(city, point, present, absent):
+    zones = tzlocate.timezone_suggestions(*point)
+    assert present <= set(zones), zones
+    assert not absent & set(zones), zones
+
+
+@pytest.mark.parametrize("point", [(46.48, 30.72), (49.84, 24.03), (40.71, -74.01)])
+def test_one_zone_per_clock(point):
+    year = tzlocate.utcnow().year
+    zones = tzlocate.timezone_suggestions(*point)
+    assert len({tzlocate._clock_signature(zone, year) for zone in zones}) == len(zones)
+
+
+def test_outside_range():
+    assert tzlocate.timezone_suggestions(91, 0) == []
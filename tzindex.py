@@ -0,0 +1,229 @@
+"""
+Індекс часових поясів для ручного вводу в /timezone.
+
+Будується один раз при імпорті з zoneinfo.available_timezones(),
+аліасів міст і країн (українською й англійською) і, якщо є,
+zone.tab / iso3166.tab з системної tzdata (країна → її пояси).
+
+match_timezones() шукає без звернень до диска:
+  1. точний ключ IANA або аліас;
+  2. префікс назви чи будь-якого її слова («kyi», «new y», «льв»);
+  3. нечіткий збіг для одруківок (difflib).
+«UTC+3» / «GMT-5» перетворюється на Etc/GMT∓N.
+"""
+import difflib
+import os
+import re
+import zoneinfo
+from bisect import bisect_left
+
+MAX_MATCHES = 6
+FUZZY_CUTOFF = 0.75
+
+_SKIP_KEYS = {"Factory", "localtime", "posixrules"}
+
+# Аліас → ключ IANA. Ключі — у нормалізованому вигляді (див. _norm)
+ALIASES = {
+    # Україна
+    "київ": "Europe/Kyiv", "киев": "Europe/Kyiv", "kiev": "Europe/Kyiv", "kyiv": "Europe/Kyiv",
+    "львів": "Europe/Kyiv", "lviv": "Europe/Kyiv", "харків": "Europe/Kyiv", "kharkiv": "Europe/Kyiv",
+    "одеса": "Europe/Kyiv", "odesa": "Europe/Kyiv", "odessa": "Europe/Kyiv",
+    "дніпро": "Europe/Kyiv", "dnipro": "Europe/Kyiv", "запоріжжя": "Europe/Kyiv",
+    "вінниця": "Europe/Kyiv", "івано франківськ": "Europe/Kyiv", "ужгород": "Europe/Kyiv",
+    "україна": "Europe/Kyiv", "ukraine": "Europe/Kyiv",
+    "сімферополь": "Europe/Simferopol",
+    # Європа
+    "таллінн": "Europe/Tallinn", "таллін": "Europe/Tallinn", "естонія": "Europe/Tallinn",
+    "варшава": "Europe/Warsaw", "краків": "Europe/Warsaw", "вроцлав": "Europe/Warsaw", "польща": "Europe/Warsaw",
+    "берлін": "Europe/Berlin", "мюнхен": "Europe/Berlin", "німеччина": "Europe/Berlin",
+    "лондон": "Europe/London", "британія": "Europe/London", "англія": "Europe/London", "uk": "Europe/London",
+    "дублін": "Europe/Dublin", "ірландія": "Europe/Dublin",
+    "париж": "Europe/Paris", "франція": "Europe/Paris",
+    "прага": "Europe/Prague", "чехія": "Europe/Prague",
+    "братислава": "Europe/Bratislava", "словаччина": "Europe/Bratislava",
+    "відень": "Europe/Vienna", "австрія": "Europe/Vienna",
+    "рим": "Europe/Rome", "мілан": "Europe/Rome", "італія": "Europe/Rome",
+    "мадрид": "Europe/Madrid", "барселона": "Europe/Madrid", "іспанія": "Europe/Madrid",
+    "лісабон": "Europe/Lisbon", "португалія": "Europe/Lisbon",
+    "амстердам": "Europe/Amsterdam", "нідерланди": "Europe/Amsterdam",
+    "брюссель": "Europe/Brussels", "бельгія": "Europe/Brussels",
+    "цюрих": "Europe/Zurich", "женева": "Europe/Zurich", "швейцарія": "Europe/Zurich",
+    "вільнюс": "Europe/Vilnius", "литва": "Europe/Vilnius",
+    "рига": "Europe/Riga", "латвія": "Europe/Riga",
+    "гельсінкі": "Europe/Helsinki", "фінляндія": "Europe/Helsinki",
+    "стокгольм": "Europe/Stockholm", "швеція": "Europe/Stockholm",
+    "осло": "Europe/Oslo", "норвегія": "Europe/Oslo",
+    "копенгаген": "Europe/Copenhagen", "данія": "Europe/Copenhagen",
+    "будапешт": "Europe/Budapest", "угорщина": "Europe/Budapest",
+    "бухарест": "Europe/Bucharest", "румунія": "Europe/Bucharest",
+    "кишинів": "Europe/Chisinau", "молдова": "Europe/Chisinau",
+    "софія": "Europe/Sofia", "болгарія": "Europe/Sofia",
+    "афіни": "Europe/Athens", "греція": "Europe/Athens",
+    "стамбул": "Europe/Istanbul", "туреччина": "Europe/Istanbul",
+    # Азія
+    "тбілісі": "Asia/Tbilisi", "грузія": "Asia/Tbilisi",
+    "єреван": "Asia/Yerevan", "вірменія": "Asia/Yerevan",
+    "баку": "Asia/Baku", "азербайджан": "Asia/Baku",
+    "тель авів": "Asia/Jerusalem", "tel aviv": "Asia/Jerusalem", "єрусалим": "Asia/Jerusalem",
+    "ізраїль": "Asia/Jerusalem",
+    "дубай": "Asia/Dubai", "оае": "Asia/Dubai",
+    "токіо": "Asia/Tokyo", "японія": "Asia/Tokyo",
+    "сеул": "Asia/Seoul", "корея": "Asia/Seoul",
+    "пекін": "Asia/Shanghai", "beijing": "Asia/Shanghai", "китай": "Asia/Shanghai",
+    "бангкок": "Asia/Bangkok", "таїланд": "Asia/Bangkok",
+    "делі": "Asia/Kolkata", "delhi": "Asia/Kolkata", "індія": "Asia/Kolkata",
+    # Америка, Океанія
+    "нью йорк": "America/New_York", "чикаго": "America/Chicago",
+    "лос анджелес": "America/Los_Angeles", "сан франциско": "America/Los_Angeles",
+    "san francisco": "America/Los_Angeles",
+    "торонто": "America/Toronto", "ванкувер": "America/Vancouver",
+    "сідней": "Australia/Sydney", "мельбурн": "Australia/Melbourne",
+}
+
+_OFFSET_RE = re.compile(r"^(?:utc|gmt)?([+-])(\d{1,2})(?::?00)?$")
+
+
+def _norm(text: str) -> str:
+    text = text.lower().replace("’", "'").replace("ʼ", "'")
+    return " ".join(re.findall(r"[\w']+", text.replace("_", " ")))
+
+
+def _tab_path(name: str) -> str | None:
+    for base in zoneinfo.TZPATH:
+        path = os.path.join(base, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _read_country_zones() -> dict[str, list[str]]:
+    """Назва країни англійською (нормалізована) → пояси з zone.tab."""
+    iso_path, zone_path = _tab_path("iso3166.tab"), _tab_path("zone.tab")
+    if not iso_path or not zone_path:
+        return {}
+
+    names = {}
+    with open(iso_path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or "\t" not in line:
+                continue
+            code, name = line.rstrip("\n").split("\t")[:2]
+            names[code] = _norm(name)
+
+    result: dict[str, list[str]] = {}
+    with open(zone_path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 3 and parts[0] in names:
+                result.setdefault(names[parts[0]], []).append(parts[2])
+    return result
+
+
+class TimezoneIndex:
+    def __init__(self):
+        keys = sorted(
+            k for k in zoneinfo.available_timezones()
+            if k not in _SKIP_KEYS and not k.startswith(("posix/", "right/"))
+        )
+        self.keys = set(keys)
+        self._by_lower = {k.lower(): k for k in keys}
+
+        # Ім'я для пошуку → пояси. Для ключа: «europe kyiv» і «kyiv»
+        names: dict[str, list[str]] = {}
+
+        def add(name: str, key: str):
+            if key not in self.keys:
+                return
+            bucket = names.setdefault(name, [])
+            if key not in bucket:
+                bucket.append(key)
+
+        for key in keys:
+            add(_norm(key), key)
+            add(_norm(key.rsplit("/", 1)[-1]), key)
+        for country, zones in _read_country_zones().items():
+            for key in zones:
+                add(country, key)
+        # Аліас перекриває збіги з ключів: «kiev» → лише Europe/Kyiv,
+        # а не ще й застарілий Europe/Kiev
+        for alias, key in ALIASES.items():
+            if key in self.keys:
+                names[_norm(alias)] = [key]
+
+        self._names = names
+        self._sorted = sorted(names)
+        # Префікс окремого слова: «york» → «new york», «america new york»
+        words = set()
+        for name in names:
+            for i, ch in enumerate(name):
+                if ch == " ":
+                    words.add((name[i + 1:], name))
+        self._word_suffixes = sorted(words)
+
+    def _prefix(self, q: str) -> list[str]:
+        found: list[str] = []
+        i = bisect_left(self._sorted, q)
+        while i < len(self._sorted) and self._sorted[i].startswith(q):
+            found.append(self._sorted[i])
+            i += 1
+        i = bisect_left(self._word_suffixes, (q, ""))
+        while i < len(self._word_suffixes) and self._word_suffixes[i][0].startswith(q):
+            found.append(self._word_suffixes[i][1])
+            i += 1
+        return found
+
+    def match(self, text: str, limit: int = MAX_MATCHES) -> tuple[list[str], bool]:
+        """
+        (ключі IANA, exact). exact=True — запит однозначно вказує на
+        перший пояс (точний ключ або аліас з одним поясом).
+        """
+        raw = text.strip()
+        if raw in self.keys:
+            return [raw], True
+        if raw.lower() in self._by_lower:
+            return [self._by_lower[raw.lower()]], True
+
+        m = _OFFSET_RE.match(raw.lower().replace(" ", ""))
+        if m is not None:
+            hours = int(m.group(2))
+            if hours == 0:
+                return ["Etc/UTC"], True
+            # Знак у Etc/GMT інвертований: UTC+3 = Etc/GMT-3
+            key = f"Etc/GMT{'-' if m.group(1) == '+' else '+'}{hours}"
+            if key in self.keys:
+                return [key], True
+
+        q = _norm(raw)
+        if not q:
+            return [], False
+
+        exact = self._names.get(q)
+        if exact:
+            return exact[:limit], len(exact) == 1
+
+        result: list[str] = []
+
+        def extend(names):
+            for name in names:
+                for key in self._names[name]:
+                    if key not in result:
+                        result.append(key)
+                        if len(result) >= limit:
+                            return True
+            return False
+
+        # Коротші назви першими: «kyiv» перед «kyiv ...»
+        extend(sorted(self._prefix(q), key=len))
+        if result:
+            return result, False
+        extend(difflib.get_close_matches(q, self._sorted, n=limit, cutoff=FUZZY_CUTOFF))
+        return result, False
+
+
+TZ_INDEX = TimezoneIndex()
+
+
+def match_timezones(text: str, limit: int = MAX_MATCHES) -> tuple[list[str], bool]:
+    return TZ_INDEX.match(text, limit)
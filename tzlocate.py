@@ -0,0 +1,331 @@
+"""
+Офлайн-визначення часового поясу за координатами (Telegram location).
+
+Основне джерело — компактний растровий файл TZ_GRID_PATH: сітка
+клітинок cell_deg×cell_deg, у кожній індекс поясу (uint16). Файл
+відкривається через mmap при першому запиті, пошук — одне
+struct.unpack_from, без мережі й без розбору полігонів під час роботи.
+
+Формат (little-endian):
+    b"TZG1", cell_deg: f32, cols: u32, rows: u32, zones: u32,
+    далі `zones` рядків назв через b"\\0",
+    далі rows*cols u16 (рядок 0 — широта 90°, стовпець 0 — довгота -180°).
+    0xFFFF — клітинка без поясу (море).
+
+Збирається офлайн з кордонів timezone-boundary-builder:
+    python tzlocate.py build combined.json [--cell 0.1]
+
+Якщо файлу немає або клітинка порожня, точної відповіді немає: найближче
+місто з zone1970.tab системної tzdata біля кордонів часто з сусідньої
+країни (Львів → Europe/Warsaw, Ужгород → Europe/Budapest, Одеса →
+Europe/Chisinau). Тому timezone_suggestions дає лише варіанти на вибір —
+по одному на кожен різний годинник серед найближчих поясів, а
+зберігати пояс без підтвердження користувача можна тільки з сітки
+(grid_timezone_at). Пояси точок, спільних для кількох країн,
+згортаються до канонічних поясів цих країн з zone1970.tab.
+"""
+import argparse
+import functools
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import zoneinfo
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from clock import utcnow
+from config import TZ_GRID_PATH
+
+MAGIC = b"TZG1"
+HEADER = struct.Struct("<4sfIII")
+NO_ZONE = 0xFFFF
+DEFAULT_CELL_DEG = 0.25
+# Скільки найближчих поясів переглядати, добираючи варіанти з різним зміщенням
+NEARBY_SCAN = 12
+
+log = logging.getLogger("tzlocate")
+
+
+# ======================== zone1970.tab ============================
+
+def _parse_coord(raw: str, deg_digits: int) -> float:
+    sign = -1 if raw[0] == "-" else 1
+    digits = raw[1:]
+    deg = int(digits[:deg_digits])
+    minutes = int(digits[deg_digits:deg_digits + 2])
+    seconds = int(digits[deg_digits + 2:] or 0)
+    return sign * (deg + minutes / 60 + seconds / 3600)
+
+
+def _split_coords(raw: str) -> tuple[float, float]:
+    # ±DDMM±DDDMM або ±DDMMSS±DDDMMSS
+    cut = max(raw.rfind("+"), raw.rfind("-"))
+    return _parse_coord(raw[:cut], 2), _parse_coord(raw[cut:], 3)
+
+
+def load_reference_points() -> list[tuple[float, float, str, tuple[str, ...]]]:
+    """(широта, довгота, пояс, країни) головних міст кожного поясу; перша країна — основна."""
+    for base in zoneinfo.TZPATH:
+        path = os.path.join(base, "zone1970.tab")
+        if os.path.exists(path):
+            break
+    else:
+        return []
+
+    points = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 3:
+                lat, lon = _split_coords(parts[1])
+                points.append((lat, lon, parts[2], tuple(parts[0].split(","))))
+    return points
+
+
+def _nearest(points, lat: float, lon: float, limit: int = 1) -> list[tuple]:
+    """Найближчі опорні точки, від ближчої до дальшої."""
+    cos_lat = math.cos(math.radians(lat))
+
+    def distance(point) -> float:
+        d_lon = abs(lon - point[1])
+        if d_lon > 180:
+            d_lon = 360 - d_lon
+        return (lat - point[0]) ** 2 + (d_lon * cos_lat) ** 2
+
+    return sorted(points, key=distance)[:limit]
+
+
+# ======================== ПОШУК ============================
+
+class TimezoneGrid:
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.cell, self.cols, self.rows, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: не файл сітки поясів")
+        pos = HEADER.size
+        zones = []
+        for _ in range(count):
+            end = self._mm.find(b"\0", pos)
+            zones.append(self._mm[pos:end].decode("ascii"))
+            pos = end + 1
+        self.zones = zones
+        self._cells_at = pos
+
+    def lookup(self, lat: float, lon: float) -> str | None:
+        row = min(int((90 - lat) / self.cell), self.rows - 1)
+        col = min(int((lon + 180) / self.cell), self.cols - 1)
+        (idx,) = struct.unpack_from("<H", self._mm, self._cells_at + 2 * (row * self.cols + col))
+        return None if idx == NO_ZONE else self.zones[idx]
+
+
+_grid: TimezoneGrid | None = None
+_grid_checked = False
+_points: list | None = None
+_load_lock = threading.Lock()
+
+
+def _load() -> None:
+    global _grid, _grid_checked, _points
+    with _load_lock:
+        if _grid_checked:
+            return
+        if os.path.exists(TZ_GRID_PATH):
+            try:
+                _grid = TimezoneGrid(TZ_GRID_PATH)
+            except (OSError, ValueError, struct.error):
+                log.exception("Не вдалося відкрити сітку поясів", extra={"path": TZ_GRID_PATH})
+        _points = load_reference_points()
+        _grid_checked = True
+
+
+def grid_timezone_at(lat: float, lon: float) -> str | None:
+    """Пояс із сітки кордонів; None — сітки немає, клітинка порожня або поза межами."""
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    if not _grid_checked:
+        _load()
+    if _grid is None:
+        return None
+    return _grid.lookup(lat, lon)
+
+
+@functools.lru_cache(maxsize=512)
+def _clock_signature(zone: str, year: int) -> tuple:
+    """
+    Зміщення поясу щогодини протягом року: пояси з однаковим підписом
+    показують той самий час завжди, включно з моментами переходу на
+    літній час (Europe/Kyiv і Europe/Chisinau переводять годинник у різні
+    години — підписи різні).
+    """
+    tz = zoneinfo.ZoneInfo(zone)
+    start = datetime(year, 1, 1, tzinfo=timezone.utc)
+    hour = timedelta(hours=1)
+    return tuple((start + i * hour).astimezone(tz).utcoffset() for i in range(366 * 24))
+
+
+def _country_zones(country: str) -> list[str]:
+    """
+    Пояси країни з zone1970.tab у порядку файлу; рядки, де країна основна,
+    йдуть раніше (для UA — Europe/Kyiv, а не Europe/Simferopol з «RU,UA»).
+    """
+    own = [zone for _, _, zone, countries in _points if countries[0] == country]
+    return own + [zone for _, _, zone, countries in _points if country in countries[1:]]
+
+
+@functools.lru_cache(maxsize=256)
+def _canonical_zone(country: str, zone: str, year: int) -> str:
+    """Перший пояс країни з тим самим годинником, що й zone."""
+    signature = _clock_signature(zone, year)
+    for candidate in _country_zones(country):
+        if _clock_signature(candidate, year) == signature:
+            return candidate
+    return zone
+
+
+@functools.lru_cache(maxsize=256)
+def _main_zone(country: str, year: int) -> str:
+    """Канонічний пояс годинника, який тримає найбільше поясів країни."""
+    canonical, counts = {}, Counter()
+    for zone in _country_zones(country):
+        signature = _clock_signature(zone, year)
+        canonical.setdefault(signature, zone)
+        counts[signature] += 1
+    return canonical[max(counts, key=counts.__getitem__)]
+
+
+def timezone_suggestions(lat: float, lon: float, limit: int = 4) -> list[str]:
+    """
+    Варіанти для вибору, коли сітка відповіді не дала: найближчі пояси,
+    по одному на кожен різний годинник (сусідні пояси з тими самими
+    правилами — зайвий вибір, нагадування в них приходять однаково).
+    Точка, спільна для кількох країн (Europe/Simferopol — «RU,UA»),
+    дає канонічний пояс основної країни з тим самим годинником і головні
+    пояси решти: сусідній Europe/Bucharest тоді не витісняє Europe/Kyiv.
+    """
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return []
+    if not _grid_checked:
+        _load()
+    year = utcnow().year
+    suggestions, signatures = [], set()
+    for _, _, zone, countries in _nearest(_points, lat, lon, NEARBY_SCAN):
+        candidates = [zone]
+        if len(countries) > 1:
+            candidates = [_canonical_zone(countries[0], zone, year)]
+            candidates += [_main_zone(country, year) for country in countries[1:]]
+        for candidate in candidates:
+            signature = _clock_signature(candidate, year)
+            if signature not in signatures:
+                signatures.add(signature)
+                suggestions.append(candidate)
+                if len(suggestions) == limit:
+                    return suggestions
+    return suggestions
+
+
+def timezone_at(lat: float, lon: float) -> str | None:
+    """Пояс із сітки, інакше найближчий (лише здогад — див. опис модуля)."""
+    zone = grid_timezone_at(lat, lon)
+    if zone is not None:
+        return zone
+    suggestions = timezone_suggestions(lat, lon, limit=1)
+    return suggestions[0] if suggestions else None
+
+
+# ======================== ЗБІРКА СІТКИ ============================
+
+def _polygons(geometry: dict):
+    # Кожен полігон — [зовнішнє кільце, дірки...]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    return [geometry["coordinates"]]
+
+
+def _in_ring(ring, x: float, y: float) -> bool:
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[j][0], ring[j][1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def _rasterize_geojson(path: str, cell: float, cols: int, rows: int, zones: list[str], cells) -> None:
+    with open(path, encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    index = {}
+    for feature in features:
+        zone = feature["properties"]["tzid"]
+        zone_idx = index.setdefault(zone, len(zones))
+        if zone_idx == len(zones):
+            zones.append(zone)
+        for polygon in _polygons(feature["geometry"]):
+            outer, holes = polygon[0], polygon[1:]
+            xs = [p[0] for p in outer]
+            ys = [p[1] for p in outer]
+            c0 = max(int((min(xs) + 180) / cell), 0)
+            c1 = min(int((max(xs) + 180) / cell), cols - 1)
+            r0 = max(int((90 - max(ys)) / cell), 0)
+            r1 = min(int((90 - min(ys)) / cell), rows - 1)
+            for r in range(r0, r1 + 1):
+                y = 90 - (r + 0.5) * cell
+                for c in range(c0, c1 + 1):
+                    x = -180 + (c + 0.5) * cell
+                    if _in_ring(outer, x, y) and not any(_in_ring(h, x, y) for h in holes):
+                        cells[r * cols + c] = zone_idx
+
+
+def build_grid(geojson: str, out_path: str, cell: float = DEFAULT_CELL_DEG) -> int:
+    cols = int(round(360 / cell))
+    rows = int(round(180 / cell))
+    cells = array("H", [NO_ZONE]) * (rows * cols)
+    zones: list[str] = []
+    _rasterize_geojson(geojson, cell, cols, rows, zones, cells)
+
+    if sys.byteorder != "little":
+        cells.byteswap()
+    part = out_path + ".part"
+    with open(part, "wb") as f:
+        f.write(HEADER.pack(MAGIC, cell, cols, rows, len(zones)))
+        for zone in zones:
+            f.write(zone.encode("ascii") + b"\0")
+        cells.tofile(f)
+    os.replace(part, out_path)
+    return len(zones)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Сітка часових поясів для tzlocate")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="зібрати файл сітки")
+    p_build.add_argument("geojson", help="timezone-boundary-builder combined.json")
+    p_build.add_argument("--cell", type=float, default=DEFAULT_CELL_DEG, help="розмір клітинки, градуси")
+    p_build.add_argument("--out", default=TZ_GRID_PATH)
+    p_lookup = sub.add_parser("lookup", help="пояс за координатами")
+    p_lookup.add_argument("lat", type=float)
+    p_lookup.add_argument("lon", type=float)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build_grid(args.geojson, args.out, args.cell)
+        print(f"{args.out}: {count} поясів, {os.path.getsize(args.out)} Б")
+    elif args.command == "lookup":
+        print(timezone_at(args.lat, args.lon))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())